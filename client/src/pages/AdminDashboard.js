@@ -3,13 +3,54 @@
 import { useState, useEffect, useContext } from "react"
 import { Routes, Route, Link, useNavigate, useLocation } from "react-router-dom"
 import { AuthContext } from "../context/AuthContext"
+import { fetchTripsPage } from "../utils/fetchTrips"
+import { subscribeToTrips, upsertTrip } from "../utils/tripStream"
+
+// How often the trips summary re-reads /api/stats while the page is open
+const STATS_REFRESH_MS = 60000
+
+// Fetch counts and summaries from /api/stats; empty dates fall back to the server's default range
+const fetchStats = async (token, from, to) => {
+  const params = new URLSearchParams()
+  if (from) params.set("from", from)
+  if (to) params.set("to", to)
+
+  const query = params.toString()
+  const response = await fetch(query ? `/api/stats?${query}` : "/api/stats", {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  })
+
+  const data = await response.json()
+
+  if (!response.ok) {
+    throw new Error(data.error || "Failed to fetch stats")
+  }
+
+  return data
+}
+
+// Status and pickup date filters are applied by /api/trips; the search term stays client-side
+const tripFilters = (status, dateFrom, dateTo) => ({
+  status: status !== "all" ? status : "",
+  pickup_from: dateFrom ? `${dateFrom}T00:00:00` : "",
+  pickup_to: dateTo ? `${dateTo}T23:59:59.999999` : "",
+})
+
+const formatPercent = (ratio) => `${(ratio * 100).toFixed(1)}%`
 
 // Admin Dashboard Components
 const TripsManagement = ({ token }) => {
   const [trips, setTrips] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [tripsVersion, setTripsVersion] = useState(0)
   const [filteredTrips, setFilteredTrips] = useState([])
+  const [stats, setStats] = useState(null)
+  const [statsVersion, setStatsVersion] = useState(0)
   const [drivers, setDrivers] = useState([])
   const [vehicles, setVehicles] = useState([])
+  const [assignmentOptionsLoaded, setAssignmentOptionsLoaded] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState("")
   const [selectedTrip, setSelectedTrip] = useState(null)
@@ -24,62 +65,111 @@ const TripsManagement = ({ token }) => {
     dateTo: "",
   })
 
+  const { status, dateFrom, dateTo } = filters
+
+  // Load the first page of trips whenever the server-side filters change
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        // Fetch all trips
-        const tripsResponse = await fetch("/api/trips", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        })
+    let ignore = false
+
+    fetchTripsPage(token, tripFilters(status, dateFrom, dateTo))
+      .then((page) => {
+        if (ignore) return
+        setTrips(page.trips)
+        setNextCursor(page.nextCursor)
+      })
+      .catch((err) => {
+        console.error("Error fetching trips:", err)
+        if (!ignore) setError(err.message)
+      })
+      .finally(() => {
+        if (!ignore) setLoading(false)
+      })
 
-        if (!tripsResponse.ok) {
-          const errorData = await tripsResponse.json()
-          throw new Error(errorData.error || "Failed to fetch trips")
-        }
+    return () => {
+      ignore = true
+    }
+  }, [token, status, dateFrom, dateTo, tripsVersion])
 
-        const tripsData = await tripsResponse.json()
-        setTrips(tripsData)
-        setFilteredTrips(sortTrips(tripsData))
+  // Counts and summaries come from /api/stats instead of the loaded pages
+  useEffect(() => {
+    let ignore = false
 
-        // Fetch all drivers
-        const usersResponse = await fetch("/api/users", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        })
+    fetchStats(token, dateFrom, dateTo)
+      .then((data) => {
+        if (!ignore) setStats(data)
+      })
+      .catch((err) => {
+        if (!ignore) setError(err.message)
+      })
 
-        if (!usersResponse.ok) {
-          throw new Error("Failed to fetch users")
-        }
+    return () => {
+      ignore = true
+    }
+  }, [token, dateFrom, dateTo, statsVersion])
 
-        const usersData = await usersResponse.json()
-        setDrivers(usersData.filter((user) => user.role === "driver"))
+  useEffect(() => {
+    const timer = setInterval(() => setStatsVersion((version) => version + 1), STATS_REFRESH_MS)
+    return () => clearInterval(timer)
+  }, [])
 
-        // Fetch all vehicles
-        const vehiclesResponse = await fetch("/api/vehicles", {
+  // Patch trips from the server's change stream instead of refetching
+  useEffect(() => {
+    return subscribeToTrips(token, {
+      onUpsert: (trip) => setTrips((prev) => upsertTrip(prev, trip)),
+      onDelete: (tripId) => setTrips((prev) => prev.filter((trip) => trip.id !== tripId)),
+      onReset: () => {
+        setTripsVersion((version) => version + 1)
+        setStatsVersion((version) => version + 1)
+      },
+    })
+  }, [token])
+
+  // Append the next page of trips on demand
+  const loadMoreTrips = async () => {
+    try {
+      const page = await fetchTripsPage(token, { ...tripFilters(status, dateFrom, dateTo), cursor: nextCursor })
+      setTrips((prev) => prev.concat(page.trips.filter((trip) => !prev.some((known) => known.id === trip.id))))
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
+  // Drivers and vehicles are only needed once an admin starts assigning a trip
+  const openAssignment = async (trip) => {
+    setSelectedTrip(trip)
+    if (assignmentOptionsLoaded) return
+
+    try {
+      const [usersResponse, vehiclesResponse] = await Promise.all([
+        fetch("/api/users", {
           headers: {
             Authorization: `Bearer ${token}`,
           },
-        })
-
-        if (!vehiclesResponse.ok) {
-          throw new Error("Failed to fetch vehicles")
-        }
-
-        const vehiclesData = await vehiclesResponse.json()
-        setVehicles(vehiclesData)
-      } catch (err) {
-        console.error("Error fetching data:", err)
-        setError(err.message)
-      } finally {
-        setLoading(false)
+        }),
+        fetch("/api/vehicles", {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }),
+      ])
+
+      if (!usersResponse.ok) {
+        throw new Error("Failed to fetch users")
       }
-    }
 
-    fetchData()
-  }, [token])
+      if (!vehiclesResponse.ok) {
+        throw new Error("Failed to fetch vehicles")
+      }
+
+      const usersData = await usersResponse.json()
+      setDrivers(usersData.filter((user) => user.role === "driver"))
+      setVehicles(await vehiclesResponse.json())
+      setAssignmentOptionsLoaded(true)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
 
   // Sort trips: unassigned pending trips first, then by creation date (newest first)
   const sortTrips = (tripsToSort) => {
@@ -125,16 +215,15 @@ const TripsManagement = ({ token }) => {
       )
     }
 
-    // Filter by date range
+    // Filter by pickup date range, matching the server-side filter for streamed trips
     if (filters.dateFrom) {
-      const fromDate = new Date(filters.dateFrom)
-      result = result.filter((trip) => new Date(trip.created_at) >= fromDate)
+      const fromDate = new Date(`${filters.dateFrom}T00:00:00`)
+      result = result.filter((trip) => new Date(trip.pickup_time) >= fromDate)
     }
 
     if (filters.dateTo) {
-      const toDate = new Date(filters.dateTo)
-      toDate.setHours(23, 59, 59, 999) // End of day
-      result = result.filter((trip) => new Date(trip.created_at) <= toDate)
+      const toDate = new Date(`${filters.dateTo}T23:59:59.999`)
+      result = result.filter((trip) => new Date(trip.pickup_time) <= toDate)
     }
 
     // Sort the filtered results
@@ -218,6 +307,7 @@ const TripsManagement = ({ token }) => {
 
       // Remove trip from state
       setTrips((prev) => prev.filter((trip) => trip.id !== tripId))
+      setStatsVersion((version) => version + 1)
     } catch (err) {
       setError(err.message)
     }
@@ -238,6 +328,52 @@ const TripsManagement = ({ token }) => {
 
       {error && <div className="error-message">{error}</div>}
 
+      {stats && (
+        <div className="report-summary">
+          <h3>
+            Summary ({stats.from} to {stats.to})
+          </h3>
+          <div className="summary-stats">
+            <div className="stat-card">
+              <div className="stat-value">{stats.trips.total}</div>
+              <div className="stat-label">Total Trips</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{stats.trips.pending}</div>
+              <div className="stat-label">Pending</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{stats.trips.in_progress}</div>
+              <div className="stat-label">In Progress</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{stats.trips.completed}</div>
+              <div className="stat-label">Completed</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{stats.trips.cancelled}</div>
+              <div className="stat-label">Cancelled</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">
+                {stats.completion.average_minutes === null ? "-" : stats.completion.average_minutes}
+              </div>
+              <div className="stat-label">Avg. Completion (min)</div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{formatPercent(stats.drivers.utilization)}</div>
+              <div className="stat-label">
+                Driver Utilization ({stats.drivers.active}/{stats.drivers.total} active)
+              </div>
+            </div>
+            <div className="stat-card">
+              <div className="stat-value">{stats.vehicles.by_status.available || 0}</div>
+              <div className="stat-label">Vehicles Available ({stats.vehicles.total} total)</div>
+            </div>
+          </div>
+        </div>
+      )}
+
       {/* Filter section */}
       <div className="filter-container">
         <div className="filter-group">
@@ -264,12 +400,12 @@ const TripsManagement = ({ token }) => {
         </div>
 
         <div className="filter-group">
-          <label htmlFor="dateFrom">From:</label>
+          <label htmlFor="dateFrom">Pickup From:</label>
           <input type="date" id="dateFrom" name="dateFrom" value={filters.dateFrom} onChange={handleFilterChange} />
         </div>
 
         <div className="filter-group">
-          <label htmlFor="dateTo">To:</label>
+          <label htmlFor="dateTo">Pickup To:</label>
           <input type="date" id="dateTo" name="dateTo" value={filters.dateTo} onChange={handleFilterChange} />
         </div>
 
@@ -375,7 +511,7 @@ const TripsManagement = ({ token }) => {
                 <td>
                   <div className="table-actions">
                     {trip.status === "pending" && !trip.driver && (
-                      <button className="action-button small" onClick={() => setSelectedTrip(trip)}>
+                      <button className="action-button small" onClick={() => openAssignment(trip)}>
                         Assign
                       </button>
                     )}
@@ -389,6 +525,12 @@ const TripsManagement = ({ token }) => {
           </tbody>
         </table>
       </div>
+
+      {nextCursor && (
+        <button className="action-button" onClick={loadMoreTrips}>
+          Load More Trips
+        </button>
+      )}
     </div>
   )
 }
@@ -403,7 +545,140 @@ const VehiclesManagement = ({ token }) => {
 }
 
 const ReportsManagement = ({ token }) => {
-  // Existing code...
+  const [range, setRange] = useState({ from: "", to: "" })
+  const [report, setReport] = useState(null)
+  const [loading, setLoading] = useState(true)
+  const [error, setError] = useState("")
+
+  useEffect(() => {
+    let ignore = false
+
+    fetchStats(token, range.from, range.to)
+      .then((data) => {
+        if (ignore) return
+        setReport(data)
+        setError("")
+      })
+      .catch((err) => {
+        if (!ignore) setError(err.message)
+      })
+      .finally(() => {
+        if (!ignore) setLoading(false)
+      })
+
+    return () => {
+      ignore = true
+    }
+  }, [token, range.from, range.to])
+
+  const handleRangeChange = (e) => {
+    const { name, value } = e.target
+    setRange((prev) => ({ ...prev, [name]: value }))
+  }
+
+  if (loading) {
+    return <div className="loading">Loading...</div>
+  }
+
+  return (
+    <div className="admin-section">
+      <h2>Reports & Billing</h2>
+
+      {error && <div className="error-message">{error}</div>}
+
+      <div className="filter-container">
+        <div className="filter-group">
+          <label htmlFor="from">From:</label>
+          <input type="date" id="from" name="from" value={range.from} onChange={handleRangeChange} />
+        </div>
+
+        <div className="filter-group">
+          <label htmlFor="to">To:</label>
+          <input type="date" id="to" name="to" value={range.to} onChange={handleRangeChange} />
+        </div>
+      </div>
+
+      {report && (
+        <div className="report-container">
+          <div className="report-summary">
+            <h3>
+              Summary ({report.from} to {report.to})
+            </h3>
+            <div className="summary-stats">
+              <div className="stat-card">
+                <div className="stat-value">{report.trips.total}</div>
+                <div className="stat-label">Total Trips</div>
+              </div>
+              <div className="stat-card">
+                <div className="stat-value">{report.trips.completed}</div>
+                <div className="stat-label">Completed</div>
+              </div>
+              <div className="stat-card">
+                <div className="stat-value">{report.drivers.busy_hours}</div>
+                <div className="stat-label">Driver Hours</div>
+              </div>
+              <div className="stat-card">
+                <div className="stat-value">{formatPercent(report.vehicles.utilization)}</div>
+                <div className="stat-label">Vehicle Utilization</div>
+              </div>
+            </div>
+          </div>
+
+          <div className="report-by-company">
+            <h3>Trips by Company</h3>
+            <table className="data-table">
+              <thead>
+                <tr>
+                  <th>Company</th>
+                  <th>Total</th>
+                  <th>Completed</th>
+                  <th>Cancelled</th>
+                </tr>
+              </thead>
+              <tbody>
+                {report.by_company.map((row) => (
+                  <tr key={row.company_id}>
+                    <td>{row.company || `Company #${row.company_id}`}</td>
+                    <td>{row.total}</td>
+                    <td>{row.completed}</td>
+                    <td>{row.cancelled}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+
+          <div className="report-trips">
+            <h3>Trips per Day</h3>
+            <table className="data-table">
+              <thead>
+                <tr>
+                  <th>Date</th>
+                  <th>Total</th>
+                  <th>Pending</th>
+                  <th>In Progress</th>
+                  <th>Completed</th>
+                  <th>Cancelled</th>
+                </tr>
+              </thead>
+              <tbody>
+                {report.per_day.map((row) => (
+                  <tr key={row.date}>
+                    <td>{row.date}</td>
+                    <td>{row.total}</td>
+                    <td>{row.pending}</td>
+                    <td>{row.in_progress}</td>
+                    <td>{row.completed}</td>
+                    <td>{row.cancelled}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
+    </div>
+  )
 }
 
 const AdminDashboard = () => {
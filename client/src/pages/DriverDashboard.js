@@ -2,10 +2,13 @@
 
 import { useState, useEffect, useContext } from "react"
 import { AuthContext } from "../context/AuthContext"
+import { fetchTripsPage } from "../utils/fetchTrips"
+import { subscribeToTrips, upsertTrip } from "../utils/tripStream"
 
 const DriverDashboard = () => {
   const { user, token } = useContext(AuthContext)
   const [trips, setTrips] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState("")
   const [assignedVehicles, setAssignedVehicles] = useState([])
@@ -14,19 +17,9 @@ const DriverDashboard = () => {
     const fetchData = async () => {
       try {
         // Fetch trips assigned to the driver
-        const tripsResponse = await fetch("/api/trips", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        })
-
-        if (!tripsResponse.ok) {
-          const errorData = await tripsResponse.json()
-          throw new Error(errorData.error || "Failed to fetch trips")
-        }
-
-        const tripsData = await tripsResponse.json()
-        setTrips(tripsData)
+        const page = await fetchTripsPage(token)
+        setTrips(page.trips)
+        setNextCursor(page.nextCursor)
 
         // Fetch driver's assigned vehicles
         if (user && user.vehicles) {
@@ -43,6 +36,21 @@ const DriverDashboard = () => {
     fetchData()
   }, [token, user])
 
+  // Patch trips from the server's change stream instead of refetching
+  useEffect(() => {
+    return subscribeToTrips(token, {
+      onUpsert: (trip) => setTrips((prev) => upsertTrip(prev, trip)),
+      onDelete: (tripId) => setTrips((prev) => prev.filter((trip) => trip.id !== tripId)),
+      onReset: () =>
+        fetchTripsPage(token)
+          .then((page) => {
+            setTrips(page.trips)
+            setNextCursor(page.nextCursor)
+          })
+          .catch((err) => setError(err.message)),
+    })
+  }, [token])
+
   const updateTripStatus = async (tripId, newStatus) => {
     try {
       const response = await fetch(`/api/trips/${tripId}`, {
@@ -67,6 +75,17 @@ const DriverDashboard = () => {
     }
   }
 
+  // Append the next page of trips on demand
+  const loadMoreTrips = async () => {
+    try {
+      const page = await fetchTripsPage(token, { cursor: nextCursor })
+      setTrips((prev) => prev.concat(page.trips.filter((trip) => !prev.some((known) => known.id === trip.id))))
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
   const formatDateTime = (dateTimeStr) => {
     const date = new Date(dateTimeStr)
     return date.toLocaleString()
@@ -168,6 +187,11 @@ const DriverDashboard = () => {
             ))}
           </div>
         )}
+        {nextCursor && (
+          <button className="action-button" onClick={loadMoreTrips}>
+            Load More Trips
+          </button>
+        )}
       </div>
     </div>
   )
@@ -2,10 +2,13 @@
 
 import { useState, useEffect, useContext } from "react"
 import { AuthContext } from "../context/AuthContext"
+import { fetchTripsPage } from "../utils/fetchTrips"
+import { subscribeToTrips, upsertTrip } from "../utils/tripStream"
 
 const EmployeeDashboard = () => {
   const { user, token } = useContext(AuthContext)
   const [trips, setTrips] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState("")
   const [showNewTripForm, setShowNewTripForm] = useState(false)
@@ -21,19 +24,9 @@ const EmployeeDashboard = () => {
     const fetchData = async () => {
       try {
         // Fetch trips
-        const tripsResponse = await fetch("/api/trips", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        })
-
-        if (!tripsResponse.ok) {
-          const errorData = await tripsResponse.json()
-          throw new Error(errorData.error || "Failed to fetch trips")
-        }
-
-        const tripsData = await tripsResponse.json()
-        setTrips(tripsData)
+        const page = await fetchTripsPage(token)
+        setTrips(page.trips)
+        setNextCursor(page.nextCursor)
 
         // Set company ID for new trip form if user has companies
         if (user && user.companies && user.companies.length > 0) {
@@ -53,6 +46,21 @@ const EmployeeDashboard = () => {
     fetchData()
   }, [token, user])
 
+  // Patch trips from the server's change stream instead of refetching
+  useEffect(() => {
+    return subscribeToTrips(token, {
+      onUpsert: (trip) => setTrips((prev) => upsertTrip(prev, trip)),
+      onDelete: (tripId) => setTrips((prev) => prev.filter((trip) => trip.id !== tripId)),
+      onReset: () =>
+        fetchTripsPage(token)
+          .then((page) => {
+            setTrips(page.trips)
+            setNextCursor(page.nextCursor)
+          })
+          .catch((err) => setError(err.message)),
+    })
+  }, [token])
+
   const handleTripFormChange = (e) => {
     const { name, value } = e.target
     setTripFormData((prev) => ({ ...prev, [name]: value }))
@@ -119,6 +127,17 @@ const EmployeeDashboard = () => {
     }
   }
 
+  // Append the next page of trips on demand
+  const loadMoreTrips = async () => {
+    try {
+      const page = await fetchTripsPage(token, { cursor: nextCursor })
+      setTrips((prev) => prev.concat(page.trips.filter((trip) => !prev.some((known) => known.id === trip.id))))
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
   const formatDateTime = (dateTimeStr) => {
     const date = new Date(dateTimeStr)
     return date.toLocaleString()
@@ -248,6 +267,11 @@ const EmployeeDashboard = () => {
             ))}
           </div>
         )}
+        {nextCursor && (
+          <button className="action-button" onClick={loadMoreTrips}>
+            Load More Trips
+          </button>
+        )}
       </div>
     </div>
   )
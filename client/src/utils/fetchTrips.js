@@ -0,0 +1,25 @@
+// Fetch one page of /api/trips; pass the returned nextCursor back in to load the next page
+export const fetchTripsPage = async (token, { cursor, ...filters } = {}) => {
+  const params = new URLSearchParams()
+  Object.entries(filters).forEach(([name, value]) => {
+    if (value) params.set(name, value)
+  })
+  if (cursor) params.set("cursor", cursor)
+
+  const query = params.toString()
+  const response = await fetch(query ? `/api/trips?${query}` : "/api/trips", {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  })
+
+  if (!response.ok) {
+    const errorData = await response.json()
+    throw new Error(errorData.error || "Failed to fetch trips")
+  }
+
+  return {
+    trips: await response.json(),
+    nextCursor: response.headers.get("X-Next-Cursor"),
+  }
+}
@@ -0,0 +1,72 @@
+// How long to wait before asking for a new stream token after a failure
+const RECONNECT_DELAY_MS = 3000
+
+// Subscribe to /api/trips/stream; returns a function that closes the stream.
+// EventSource can't send an Authorization header, so each connection trades the
+// access token for a short-lived stream token, which is all that goes in the URL.
+// The browser resends the last event id on its own reconnects; once it gives up
+// (the stream token has expired by then) a new token resumes from that id.
+export const subscribeToTrips = (token, { onUpsert, onDelete, onReset }) => {
+  let source = null
+  let retry = null
+  let closed = false
+  let lastEventId = null
+
+  const track = (handler) => (event) => {
+    if (event.lastEventId) lastEventId = event.lastEventId
+    handler(event)
+  }
+
+  const reconnect = () => {
+    if (!closed) retry = setTimeout(connect, RECONNECT_DELAY_MS)
+  }
+
+  const connect = async () => {
+    try {
+      const response = await fetch("/api/trips/stream/token", {
+        method: "POST",
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      })
+
+      if (!response.ok) {
+        throw new Error("Failed to open the trip stream")
+      }
+
+      const { stream_token } = await response.json()
+      if (closed) return
+
+      const params = new URLSearchParams({ jwt: stream_token })
+      if (lastEventId) params.set("last_event_id", lastEventId)
+      source = new EventSource(`/api/trips/stream?${params}`)
+    } catch (err) {
+      reconnect()
+      return
+    }
+
+    const upsert = track((event) => onUpsert(JSON.parse(event.data)))
+    source.addEventListener("trip.created", upsert)
+    source.addEventListener("trip.updated", upsert)
+    source.addEventListener("trip.deleted", track((event) => onDelete(JSON.parse(event.data).id)))
+    // The server no longer has the events we missed, so reload the list
+    source.addEventListener("reset", track(() => onReset()))
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) reconnect()
+    }
+  }
+
+  connect()
+
+  return () => {
+    closed = true
+    clearTimeout(retry)
+    if (source) source.close()
+  }
+}
+
+// Replace a trip in the list, or add it to the front when it's new
+export const upsertTrip = (trips, trip) =>
+  trips.some((existing) => existing.id === trip.id)
+    ? trips.map((existing) => (existing.id === trip.id ? trip : existing))
+    : [trip, ...trips]
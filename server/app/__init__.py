@@ -4,22 +4,24 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
-from datetime import timedelta
 import os
 
+from app.config import config
+from app import database
+
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cabrix.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+app.config.from_object(config[os.environ.get('FLASK_CONFIG', 'default')])
+
+# Engine options and SQLite pragmas for the configured database
+database.configure(app.config)
 
 # Initialize extensions
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag', 'Server-Timing', 'X-Sync-Token'])
 
 # Import routes after initializing app to avoid circular imports
-from app import routes, models
+from app import routes, models, commands
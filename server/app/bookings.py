@@ -0,0 +1,133 @@
+import bisect
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from app import app, db
+from app.models import Trip
+
+# Trips that hold their driver and vehicle for [pickup_time, pickup_time +
+# DISPATCH_TRIP_MINUTES), the same window dispatch plans with
+BOOKED = ['pending', 'in_progress']
+
+
+class Intervals:
+    """[start, end) windows of one driver or vehicle, sorted by start, with their trip ids.
+
+    Windows may overlap (bookings made before these checks existed), so a
+    lookup reaches back by the longest window seen: a bisect to the first
+    window that could overlap, then a walk over the ones that do.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.windows = []  # (start, end, trip_id), in the order of starts
+        self.start_of = {}
+        self.longest = timedelta(0)
+
+    def add(self, start, end, trip_id):
+        self.remove(trip_id)
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.windows.insert(i, (start, end, trip_id))
+        self.start_of[trip_id] = start
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, trip_id):
+        start = self.start_of.pop(trip_id, None)
+        if start is None:
+            return
+        i = bisect.bisect_left(self.starts, start)
+        while self.windows[i][2] != trip_id:
+            i += 1
+        del self.starts[i], self.windows[i]
+
+    def overlapping(self, start, end, ignore=None):
+        """Windows that overlap [start, end), other than trip `ignore`'s."""
+        i = bisect.bisect_right(self.starts, start - self.longest)
+        found = []
+        while i < len(self.windows) and self.windows[i][0] < end:
+            window = self.windows[i]
+            if window[1] > start and window[2] != ignore:
+                found.append(window)
+            i += 1
+        return found
+
+    def gaps(self, start, end):
+        """Free [from, to) stretches between `start` and `end`."""
+        free = []
+        cursor = start
+        for window_start, window_end, _ in self.overlapping(start, end):
+            if window_start > cursor:
+                free.append((cursor, window_start))
+            cursor = max(cursor, window_end)
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+
+class Bookings:
+    """Booked windows of some drivers and vehicles around a stretch of time.
+
+    Loaded with one range query per kind, on the (driver_id, status,
+    pickup_time) and (vehicle_id, status, pickup_time) indexes. Checks
+    against it are bisects; `book` keeps it current while a batch of
+    assignments is checked, so two rows of one request can't collide.
+    """
+
+    def __init__(self, driver_ids=(), vehicle_ids=(), start=None, end=None):
+        self.duration = timedelta(minutes=app.config['DISPATCH_TRIP_MINUTES'])
+        self.drivers = defaultdict(Intervals)
+        self.vehicles = defaultdict(Intervals)
+        for column, ids, index in [(Trip.driver_id, set(driver_ids) - {None}, self.drivers),
+                                   (Trip.vehicle_id, set(vehicle_ids) - {None}, self.vehicles)]:
+            if not ids or start is None:
+                continue
+            # What the database holds, not the caller's unflushed changes
+            with db.session.no_autoflush:
+                rows = db.session.query(Trip.id, Trip.pickup_time, column).filter(
+                    column.in_(ids),
+                    Trip.status.in_(BOOKED),
+                    Trip.pickup_time > start - self.duration,
+                    Trip.pickup_time < end
+                ).order_by(Trip.pickup_time).all()  # so each add lands at the end
+            for trip_id, pickup_time, resource_id in rows:
+                index[resource_id].add(pickup_time, pickup_time + self.duration, trip_id)
+
+    @classmethod
+    def around(cls, trips, driver_ids=(), vehicle_ids=()):
+        """Bookings covering every window the given trips could take."""
+        times = [trip.pickup_time for trip in trips if trip.pickup_time is not None]
+        if not times:
+            return cls()
+        duration = timedelta(minutes=app.config['DISPATCH_TRIP_MINUTES'])
+        return cls(driver_ids, vehicle_ids, min(times), max(times) + duration)
+
+    def conflict(self, trip_id, pickup_time, driver_id=None, vehicle_id=None):
+        """An error message if the driver or vehicle is booked over this pickup, else None."""
+        end = pickup_time + self.duration
+        for kind, resource_id, index in [('Driver', driver_id, self.drivers), ('Vehicle', vehicle_id, self.vehicles)]:
+            if resource_id is None:
+                continue
+            overlapping = index[resource_id].overlapping(pickup_time, end, ignore=trip_id)
+            if overlapping:
+                other_start, _, other_id = overlapping[0]
+                return f'{kind} is already booked for trip {other_id} at {other_start.isoformat()}'
+        return None
+
+    def book(self, trip_id, pickup_time, driver_id, vehicle_id, previous=(None, None)):
+        """Move trip `trip_id` from its `previous` (driver, vehicle) windows to these."""
+        for resource_id, index in zip(previous, (self.drivers, self.vehicles)):
+            if resource_id is not None:
+                index[resource_id].remove(trip_id)
+        for resource_id, index in [(driver_id, self.drivers), (vehicle_id, self.vehicles)]:
+            if resource_id is not None and pickup_time is not None:
+                index[resource_id].add(pickup_time, pickup_time + self.duration, trip_id)
+
+
+def free_slots(driver_id, day):
+    """Booked windows and free stretches of a driver's day (UTC midnight to midnight)."""
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    bookings = Bookings([driver_id], (), start, end)
+    intervals = bookings.drivers[driver_id]
+    return intervals.overlapping(start, end), intervals.gaps(start, end)
@@ -0,0 +1,238 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import db
+from app.models import Company, User, Vehicle, Trip, user_company
+from app.trip_events import record_many as record_trip_events
+from app.gazetteer import trip_coordinates
+from app.bookings import BOOKED, Bookings
+
+# Status changes a trip may make, shared by PUT and PATCH /api/trips
+TRANSITIONS = {
+    'pending': ['in_progress', 'cancelled'],
+    'in_progress': ['completed'],
+    'completed': [],
+    'cancelled': []
+}
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+def parse_rows(request, max_rows):
+    """Read trip rows from a JSON array or an NDJSON body (one object per line)."""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = []
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise BulkPayloadError(f'Invalid JSON on line {line_number}')
+            if len(rows) > max_rows:
+                raise BulkPayloadError(f'Too many rows, the limit is {max_rows}')
+    else:
+        rows = request.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get('trips')
+        if not isinstance(rows, list):
+            raise BulkPayloadError('Expected a JSON array of trips or an NDJSON body')
+        if len(rows) > max_rows:
+            raise BulkPayloadError(f'Too many rows, the limit is {max_rows}')
+
+    if not rows:
+        raise BulkPayloadError('No trips provided')
+    return rows
+
+
+def validate_rows(rows, user_id, role):
+    """Validate every row up front.
+
+    Returns (values, results): insertable column dicts for valid rows and a
+    per-row result list in input order. Passengers and companies referenced
+    anywhere in the batch are resolved with one query each.
+    """
+    passenger_ids = {user_id}
+    company_ids = set()
+    for row in rows:
+        if isinstance(row, dict):
+            if isinstance(row.get('passenger_id'), int):
+                passenger_ids.add(row['passenger_id'])
+            if isinstance(row.get('company_id'), int):
+                company_ids.add(row['company_id'])
+
+    known_passengers = {id for (id,) in db.session.query(User.id).filter(User.id.in_(passenger_ids))}
+    known_companies = {id for (id,) in db.session.query(Company.id).filter(Company.id.in_(company_ids))}
+
+    # Each passenger's first company, used when a row doesn't name one
+    default_company = {}
+    memberships = db.session.query(user_company.c.user_id, user_company.c.company_id).filter(
+        user_company.c.user_id.in_(passenger_ids)
+    )
+    for member_id, company_id in memberships:
+        default_company.setdefault(member_id, company_id)
+
+    values = []
+    results = []
+    for index, row in enumerate(rows):
+        error, trip = _validate_row(row, user_id, role, known_passengers, known_companies, default_company)
+        if error:
+            results.append({'index': index, 'ok': False, 'error': error})
+        else:
+            values.append(trip)
+            results.append({'index': index, 'ok': True})
+    return values, results
+
+
+def _validate_row(row, user_id, role, known_passengers, known_companies, default_company):
+    if not isinstance(row, dict):
+        return 'Trip must be a JSON object', None
+
+    for field in ['pickup_location', 'dropoff_location', 'pickup_time']:
+        if field not in row:
+            return f'Missing required field: {field}', None
+
+    for field in ['pickup_location', 'dropoff_location']:
+        if not isinstance(row[field], str) or not row[field]:
+            return f'Invalid {field}', None
+
+    try:
+        pickup_time = datetime.fromisoformat(row['pickup_time'].replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return 'Invalid pickup time format', None
+
+    passenger_id = row.get('passenger_id', user_id)
+    if passenger_id != user_id and role != 'admin':
+        return 'Only admins can book trips for other passengers', None
+    if passenger_id not in known_passengers:
+        return 'Passenger not found', None
+
+    company_id = row.get('company_id')
+    if company_id:
+        if company_id not in known_companies:
+            return 'Company not found', None
+    else:
+        company_id = default_company.get(passenger_id)
+        if not company_id:
+            return 'User has no associated company', None
+
+    return None, {
+        'pickup_location': row['pickup_location'],
+        'dropoff_location': row['dropoff_location'],
+        'pickup_time': pickup_time,
+        'status': 'pending',
+        'passenger_id': passenger_id,
+        'company_id': company_id,
+        'notes': row.get('notes', ''),
+        'created_at': datetime.utcnow(),
+        **trip_coordinates(row['pickup_location'], row['dropoff_location']),
+    }
+
+
+def insert_trips(values, chunk_size):
+    """Insert validated rows in executemany chunks; the caller owns the transaction."""
+    ids = []
+    statement = insert(Trip).returning(Trip.id, sort_by_parameter_order=True)
+    for start in range(0, len(values), chunk_size):
+        ids.extend(db.session.scalars(statement, values[start:start + chunk_size]))
+    return ids
+
+
+def apply_updates(rows, user_id, role):
+    """Apply many trip updates to the session, checking each like update_trip.
+
+    Rows carry an id and any of status, driver_id, vehicle_id and notes.
+    The trips, drivers and vehicles named anywhere in the batch are loaded
+    with one query each. Rows apply in order, so a later row sees earlier
+    changes to the same trip, and can't book a driver or vehicle over a
+    trip an earlier row assigned them. A row that fails leaves its trip
+    untouched.
+    Returns a result per row; the caller commits, or rolls back when any
+    row failed.
+    """
+    trip_ids, driver_ids, vehicle_ids = set(), set(), set()
+    for row in rows:
+        if isinstance(row, dict):
+            for ids, field in [(trip_ids, 'id'), (driver_ids, 'driver_id'), (vehicle_ids, 'vehicle_id')]:
+                if isinstance(row.get(field), int):
+                    ids.add(row[field])
+
+    trips = {trip.id: trip for trip in Trip.query.filter(Trip.id.in_(trip_ids))}
+    drivers = {id: role for id, role in db.session.query(User.id, User.role).filter(User.id.in_(driver_ids))}
+    vehicles = {id for (id,) in db.session.query(Vehicle.id).filter(Vehicle.id.in_(vehicle_ids))}
+    # Windows of every driver and vehicle the batch assigns, kept current as rows apply
+    bookings = Bookings.around(trips.values(), drivers, vehicles)
+
+    results = []
+    events = []
+    for index, row in enumerate(rows):
+        error, changes = _validate_update(row, user_id, role, trips, drivers, vehicles)
+        trip = trips.get(row['id']) if not error else None
+        if trip and changes.get('status', trip.status) in BOOKED and trip.pickup_time is not None:
+            error = bookings.conflict(trip.id, trip.pickup_time, changes.get('driver_id'), changes.get('vehicle_id'))
+        if error:
+            results.append({'index': index, 'id': row.get('id') if isinstance(row, dict) else None,
+                            'ok': False, 'error': error})
+            continue
+        previous_driver_id, previous_vehicle_id = trip.driver_id, trip.vehicle_id
+        for field, value in changes.items():
+            setattr(trip, field, value)
+        booked = trip.status in BOOKED
+        bookings.book(trip.id, trip.pickup_time, trip.driver_id if booked else None,
+                      trip.vehicle_id if booked else None, previous=(previous_driver_id, previous_vehicle_id))
+        events.append({'trip_id': trip.id, 'passenger_id': trip.passenger_id, 'driver_id': trip.driver_id,
+                       'previous_driver_id': previous_driver_id if previous_driver_id != trip.driver_id else None})
+        results.append({'index': index, 'id': trip.id, 'ok': True, 'status': trip.status})
+    record_trip_events(events, 'updated')
+    return results
+
+
+def _validate_update(row, user_id, role, trips, drivers, vehicles):
+    if not isinstance(row, dict):
+        return 'Trip update must be a JSON object', None
+    if not isinstance(row.get('id'), int):
+        return 'Missing required field: id', None
+
+    trip = trips.get(row['id'])
+    if not trip:
+        return 'Trip not found', None
+    if role != 'admin' and trip.passenger_id != user_id and trip.driver_id != user_id:
+        return 'Unauthorized', None
+
+    changes = {}
+    if 'status' in row:
+        status = row['status']
+        if status not in TRANSITIONS.get(trip.status, []):
+            return f'Invalid status transition from {trip.status} to {status}', None
+        if status in ['in_progress', 'completed'] and role not in ['admin', 'driver']:
+            action = 'start' if status == 'in_progress' else 'complete'
+            return f'Only drivers or admins can {action} trips', None
+        changes['status'] = status
+        if status == 'completed':
+            changes['completed_at'] = datetime.utcnow()
+
+    for field, found, missing in [('driver_id', drivers, 'Driver not found'),
+                                  ('vehicle_id', vehicles, 'Vehicle not found')]:
+        if field not in row:
+            continue
+        if role != 'admin':
+            return f'Only admins can change {field}', None
+        if not isinstance(row[field], int) or row[field] not in found:
+            return missing, None
+        changes[field] = row[field]
+    if 'driver_id' in changes and drivers[changes['driver_id']] != 'driver':
+        return 'User is not a driver', None
+
+    if 'notes' in row:
+        if row['notes'] is not None and not isinstance(row['notes'], str):
+            return 'Invalid notes', None
+        changes['notes'] = row['notes']
+
+    if not changes:
+        return 'Nothing to update', None
+    return None, changes
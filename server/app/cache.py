@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+
+from app import app
+from app.versions import read_versions, digest
+
+
+class LRUCache:
+    """In-process LRU with a per-entry TTL; the default backend."""
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedCache:
+    """Backend shared by every worker, over a Redis-style client.
+
+    The client needs get, set(ex=), delete and scan_iter(match=), which
+    redis-py provides; LocalClient is a stand-in with the same surface.
+    """
+
+    def __init__(self, client, ttl=300, prefix='cabrix:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+
+class LocalClient:
+    """Dict-backed stand-in for a Redis client (development and benchmarks)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                self._data.pop(key, None)
+                return None
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        prefix = match.rstrip('*')
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+
+def make_backend(config):
+    backend = config['RESPONSE_CACHE_BACKEND']
+    ttl = config['RESPONSE_CACHE_TTL']
+    if backend == 'memory':
+        return LRUCache(config['RESPONSE_CACHE_MAX_ENTRIES'], ttl)
+    if backend == 'local':
+        return SharedCache(LocalClient(), ttl)
+    if backend == 'redis':
+        import redis
+        return SharedCache(redis.Redis.from_url(config['RESPONSE_CACHE_URL']), ttl)
+    if backend == 'none':
+        return None
+    raise ValueError(f'Unknown RESPONSE_CACHE_BACKEND: {backend}')
+
+
+class ResponseCache:
+    """Read-through cache of serialized JSON bodies, one namespace per resource.
+
+    Keys combine the namespace, the URL and the change counters behind the
+    payload. Nested rows that change elsewhere (a trip under a vehicle) can
+    never be served stale. The write routes of a resource also drop its
+    namespace outright so dead entries don't wait for the TTL.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._configured = False
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    @property
+    def backend(self):
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    self._backend = make_backend(app.config)
+                    self._configured = True
+        return self._backend
+
+    def cached(self, namespace, scopes_for):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None:
+                    return view(*args, **kwargs)
+
+                current_user = get_jwt_identity()
+                scopes = scopes_for(current_user.get('id'), current_user.get('role'), **kwargs)
+                key = f'{namespace}:{digest(request.full_path, read_versions(scopes))}'
+
+                body = backend.get(key)
+                if body is not None:
+                    self.hits[namespace] += 1
+                    response = make_response(body)
+                    response.mimetype = 'application/json'
+                    return response
+
+                self.misses[namespace] += 1
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json':
+                    backend.set(key, response.get_data())
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces):
+        backend = self.backend
+        if backend is not None:
+            for namespace in namespaces:
+                backend.delete_prefix(f'{namespace}:')
+
+    def stats(self):
+        backend = self.backend
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            'backend': app.config['RESPONSE_CACHE_BACKEND'],
+            'entries': len(backend) if backend is not None else 0,
+            'namespaces': {
+                namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace]}
+                for namespace in namespaces
+            },
+        }
+
+
+response_cache = ResponseCache()
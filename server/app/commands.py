@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import select, update
+
+from app import app, db, eta, stats, sync
+from app.models import Trip, TripStat
+from app.gazetteer import locate
+from app.dispatch import dispatch
+from app.pooling import pool
+from app.trip_events import prune
+from app.scheduling import materialize_due
+from app.synthetic import Layout, generate, offsets
+from app.versions import SCOPES, ALL_TENANTS, bump
+
+
+@app.cli.command('materialize-schedules')
+@click.option('--horizon-days', type=int, default=None, help='How far ahead to write concrete trips.')
+def materialize_schedules_command(horizon_days):
+    """Write concrete trips for recurring schedules up to the rolling horizon."""
+    created = materialize_due(horizon_days=horizon_days or app.config['SCHEDULE_HORIZON_DAYS'])
+    click.echo(f'Created {created} trips')
+
+
+@app.cli.command('dispatch')
+@click.option('--from', 'pickup_from', type=click.DateTime(), default=None, help='Window start (UTC), defaults to now.')
+@click.option('--to', 'pickup_to', type=click.DateTime(), default=None, help='Window end (UTC), defaults to a day later.')
+@click.option('--dry-run', is_flag=True, help='Compute assignments without saving them.')
+def dispatch_command(pickup_from, pickup_to, dry_run):
+    """Assign drivers and vehicles to pending trips in a time window."""
+    window_start = pickup_from or datetime.utcnow()
+    window_end = pickup_to or window_start + timedelta(days=1)
+    result = dispatch(window_start, window_end,
+                      trip_minutes=app.config['DISPATCH_TRIP_MINUTES'],
+                      wave_minutes=app.config['DISPATCH_WAVE_MINUTES'],
+                      dry_run=dry_run)
+    for assignment in result['assigned']:
+        click.echo(f'trip {assignment["trip_id"]}: driver {assignment["driver_id"]}, vehicle {assignment["vehicle_id"]}')
+    click.echo(f'Assigned {len(result["assigned"])} trips, {len(result["unassigned"])} left unassigned '
+               f'in {result["elapsed_ms"]} ms{" (dry run)" if dry_run else ""}')
+
+
+@app.cli.command('pool-trips')
+@click.option('--from', 'pickup_from', type=click.DateTime(), default=None, help='Window start (UTC), defaults to now.')
+@click.option('--to', 'pickup_to', type=click.DateTime(), default=None, help='Window end (UTC), defaults to a day later.')
+@click.option('--max-seats', type=int, default=None, help='Seats per ride, defaults to the biggest vehicle in service.')
+@click.option('--dry-run', is_flag=True, help='Compute rides without saving them.')
+def pool_trips_command(pickup_from, pickup_to, max_seats, dry_run):
+    """Pool pending trips on the same route and time window into shared rides."""
+    window_start = pickup_from or datetime.utcnow()
+    window_end = pickup_to or window_start + timedelta(days=1)
+    result = pool(window_start, window_end,
+                  window_minutes=app.config['POOLING_WINDOW_MINUTES'],
+                  max_seats=max_seats,
+                  dry_run=dry_run)
+    for ride in result['rides']:
+        click.echo(f'ride {ride["ride_id"] or "-"}: {ride["seats"]} seats, '
+                   f'{ride["pickup_location"]} -> {ride["dropoff_location"]} at {ride["pickup_time"]}')
+    click.echo(f'Pooled {result["vehicles_before"]} trips into {result["vehicles_after"]} vehicles '
+               f'in {result["elapsed_ms"]} ms{" (dry run)" if dry_run else ""}')
+
+
+@app.cli.command('prune-trip-events')
+@click.option('--hours', type=int, default=None, help='Keep events from the last N hours.')
+def prune_trip_events_command(hours):
+    """Drop trip change events older than the retention window."""
+    hours = hours if hours is not None else app.config['TRIP_EVENTS_RETENTION_HOURS']
+    deleted = prune(datetime.utcnow() - timedelta(hours=hours))
+    click.echo(f'Deleted {deleted} trip events')
+
+
+@app.cli.command('prune-trip-tombstones')
+@click.option('--days', type=int, default=None, help='Keep tombstones from the last N days.')
+def prune_trip_tombstones_command(days):
+    """Forget deleted trips older than the sync window; older sync tokens then get 410."""
+    days = days if days is not None else app.config['SYNC_TOMBSTONE_RETENTION_DAYS']
+    deleted = sync.prune(datetime.utcnow() - timedelta(days=days))
+    click.echo(f'Deleted {deleted} trip tombstones')
+
+
+@app.cli.command('generate-data')
+@click.option('--seed', type=int, default=42, show_default=True, help='Same seed and scale, same rows.')
+@click.option('--companies', type=int, default=100, show_default=True)
+@click.option('--users', type=int, default=10000, show_default=True)
+@click.option('--trips', type=int, default=1000000, show_default=True)
+@click.option('--start', type=click.DateTime(), default='2025-01-01', show_default=True,
+              help='Trips are spread around this date: earlier ones done, later ones pending.')
+@click.option('--days', type=int, default=365, show_default=True)
+@click.option('--chunk-size', type=int, default=10000, show_default=True)
+@click.option('--append', is_flag=True, help='Add to the existing rows instead of recreating every table.')
+def generate_data_command(seed, companies, users, trips, start, days, chunk_size, append):
+    """Bulk-load a deterministic synthetic dataset (every password is password123)."""
+    started = time.perf_counter()
+    if not append:
+        db.drop_all()
+        db.create_all()
+
+    conn = db.session.connection()
+    layout = Layout(companies, users, trips, offsets(conn) if append else None)
+    counts = generate(conn, layout, seed=seed, start=start, days=days,
+                      rounds=app.config['BCRYPT_LOG_ROUNDS'], chunk_size=chunk_size)
+    # Core inserts skip the session listeners: retire every ETag at once and recount the stats
+    bump(list(SCOPES.values()) + [ALL_TENANTS])
+    if stats.enabled():
+        stats.rebuild()
+    db.session.commit()
+
+    click.echo(', '.join(f'{count} {table}' for table, count in counts.items())
+               + f' {"appended" if append else "generated"} in {time.perf_counter() - started:.1f} s')
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recount the trip_stats counters from the trips table (run once after turning on STATS_COUNTERS)."""
+    started = time.perf_counter()
+    stats.rebuild()
+    db.session.commit()
+    click.echo(f'{TripStat.query.count()} counter rows rebuilt in {time.perf_counter() - started:.1f} s')
+
+
+@app.cli.command('geocode-trips')
+def geocode_trips_command():
+    """Fill in coordinates for trips whose locations are in the gazetteer but have none yet."""
+    started = time.perf_counter()
+    updated = 0
+    for end in ['pickup', 'dropoff']:
+        name, lat, lng = (getattr(Trip, f'{end}_{column}') for column in ['location', 'lat', 'lng'])
+        for (location,) in db.session.execute(select(name).where(lat.is_(None)).distinct()).all():
+            point = locate(location)
+            if point:
+                # Coordinates are derived data: leave updated_at, and so delta sync, alone
+                updated += db.session.execute(
+                    update(Trip).where(name == location, lat.is_(None))
+                    .values({lat: point[0], lng: point[1], Trip.updated_at: Trip.updated_at})
+                    .execution_options(stats_counted=True)  # coordinates aren't counted
+                ).rowcount
+    db.session.commit()
+    click.echo(f'Geocoded {updated} trip locations in {time.perf_counter() - started:.1f} s')
+
+
+@app.cli.command('build-eta-matrix')
+def build_eta_matrix_command():
+    """Solve the road graph ahead of time so workers only map the matrix file."""
+    started = time.perf_counter()
+    path = eta.build()
+    click.echo(f'{len(eta.read_graph()[0])} places, matrix at {path} in {time.perf_counter() - started:.1f} s')
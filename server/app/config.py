@@ -1,10 +1,100 @@
 import os
+from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite:///cabrix.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev-jwt-secret')
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key')
+    # Identities are {'id', 'role'} dicts, which flask-jwt-extended 4.7+
+    # rejects as token subjects unless this is off
+    JWT_VERIFY_SUB = False
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+
+    # Password hashing: bcrypt cost and the worker pool that runs it
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', os.cpu_count() or 1))
+    BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', 8 * BCRYPT_POOL_SIZE or 1))
+    BCRYPT_QUEUE_TIMEOUT = float(os.environ.get('BCRYPT_QUEUE_TIMEOUT', 5))
+
+    # Trip lists and bulk writes
+    TRIPS_PAGE_SIZE = int(os.environ.get('TRIPS_PAGE_SIZE', 50))
+    TRIPS_MAX_PAGE_SIZE = int(os.environ.get('TRIPS_MAX_PAGE_SIZE', 200))
+    TRIPS_BULK_MAX_ROWS = int(os.environ.get('TRIPS_BULK_MAX_ROWS', 20000))
+    TRIPS_BULK_CHUNK_SIZE = int(os.environ.get('TRIPS_BULK_CHUNK_SIZE', 1000))
+
+    # Recurring schedules, dispatch and pooling
+    SCHEDULE_HORIZON_DAYS = int(os.environ.get('SCHEDULE_HORIZON_DAYS', 14))
+    SCHEDULE_PROJECTION_MAX_DAYS = int(os.environ.get('SCHEDULE_PROJECTION_MAX_DAYS', 90))
+    DISPATCH_TRIP_MINUTES = int(os.environ.get('DISPATCH_TRIP_MINUTES', 60))
+    DISPATCH_WAVE_MINUTES = int(os.environ.get('DISPATCH_WAVE_MINUTES', 5))
+    POOLING_WINDOW_MINUTES = int(os.environ.get('POOLING_WINDOW_MINUTES', 10))
+
+    # Trip change stream (SSE) and the event log behind it
+    TRIP_EVENTS_POLL_SECONDS = int(os.environ.get('TRIP_EVENTS_POLL_SECONDS', 2))
+    TRIP_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('TRIP_EVENTS_HEARTBEAT_SECONDS', 15))
+    TRIP_EVENTS_MAX_STREAM_SECONDS = int(os.environ.get('TRIP_EVENTS_MAX_STREAM_SECONDS', 300))
+    TRIP_EVENTS_BATCH_SIZE = int(os.environ.get('TRIP_EVENTS_BATCH_SIZE', 500))
+    TRIP_EVENTS_RETENTION_HOURS = int(os.environ.get('TRIP_EVENTS_RETENTION_HOURS', 24))
+    # Lifetime of the query-string tokens that open the stream; checked on connect only
+    TRIP_STREAM_TOKEN_SECONDS = int(os.environ.get('TRIP_STREAM_TOKEN_SECONDS', 60))
+
+    # Response and membership caches
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')  # 'memory', 'redis', 'local' or 'none'
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    MEMBERSHIP_CACHE_MAX_ENTRIES = int(os.environ.get('MEMBERSHIP_CACHE_MAX_ENTRIES', 10000))
+    MEMBERSHIP_CACHE_TTL = int(os.environ.get('MEMBERSHIP_CACHE_TTL', 60))
+    MEMBERSHIP_IN_TOKEN = os.environ.get('MEMBERSHIP_IN_TOKEN', '1').lower() in ['1', 'true', 'yes']
+
+    # Dashboard stats: counter table on or off, and the default range in days
+    STATS_COUNTERS = os.environ.get('STATS_COUNTERS', '0').lower() in ['1', 'true', 'yes']
+    STATS_DEFAULT_DAYS = int(os.environ.get('STATS_DEFAULT_DAYS', 30))
+
+    # Delta sync: how far tokens trail behind now, and how long deletions are remembered
+    SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', 5))
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 7))
+
+    # Driver positions: grid cell size (0.01 degrees is about 1.1 km), how long a
+    # report counts as current and how often each worker reads new reports
+    GEO_GRID_DEGREES = float(os.environ.get('GEO_GRID_DEGREES', 0.01))
+    DRIVER_LOCATION_TTL_MINUTES = int(os.environ.get('DRIVER_LOCATION_TTL_MINUTES', 10))
+    DRIVER_LOCATION_REFRESH_SECONDS = float(os.environ.get('DRIVER_LOCATION_REFRESH_SECONDS', 1))
+    NEAREST_DRIVERS_MAX = int(os.environ.get('NEAREST_DRIVERS_MAX', 50))
+    NEAREST_DRIVERS_RADIUS_KM = float(os.environ.get('NEAREST_DRIVERS_RADIUS_KM', 50))
+
+    # ETA: where the travel-time matrix file goes (the temp directory by default)
+    # and how points off the road graph reach it
+    ETA_MATRIX_DIR = os.environ.get('ETA_MATRIX_DIR', '')
+    ETA_ACCESS_SPEED_KMH = float(os.environ.get('ETA_ACCESS_SPEED_KMH', 20))
+    ETA_DETOUR_FACTOR = float(os.environ.get('ETA_DETOUR_FACTOR', 1.3))
+
+    # Observability
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '0').lower() in ['1', 'true', 'yes']
+
+    # SQLite: WAL lets readers run alongside the single writer, and writers
+    # wait up to the busy timeout for the lock instead of failing at once
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    # Connection pool for server databases (PostgreSQL, MySQL)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ['1', 'true', 'yes']
+
+    # Production server (gunicorn.conf.py). Every open trip stream holds a
+    # thread, so size WEB_THREADS for the dashboards each worker serves
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5555')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -12,8 +102,20 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
 
+class TestingConfig(Config):
+    TESTING = True
+    JWT_SECRET_KEY = 'test-secret-key-long-enough-for-hs256'
+    # Fast hashes in-process, no shared cache, and counters on so tests cover them
+    BCRYPT_LOG_ROUNDS = 4
+    BCRYPT_POOL_SIZE = 0
+    BCRYPT_MAX_PENDING = 1
+    RESPONSE_CACHE_BACKEND = 'none'
+    # Dashboard stats: counter table on or off, and the default range in days
+    STATS_COUNTERS = True
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
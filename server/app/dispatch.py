@@ -0,0 +1,383 @@
+import bisect
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from app import db
+from app.models import User, Vehicle, Trip, SharedRide, driver_vehicle
+from app.trip_events import record_many as record_trip_events
+
+# Cost weights: spread work across drivers first, then keep drivers
+# chaining trips instead of idling, then keep big vehicles free
+LOAD_WEIGHT = 60
+IDLE_CAP_MINUTES = 120
+INFEASIBLE = 10 ** 9
+
+
+class BusyCalendar:
+    """Sorted, non-overlapping [start, end) windows for one driver or vehicle."""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def is_free(self, start, end):
+        i = bisect.bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def add(self, start, end):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+    def last_end_before(self, moment):
+        i = bisect.bisect_right(self.starts, moment)
+        return self.ends[i - 1] if i else None
+
+
+def hungarian(cost):
+    """Minimum-cost assignment for an n x m matrix with n <= m (Kuhn-Munkres).
+
+    Returns, for each row, the column it is assigned to. Columns already on
+    the alternating tree are tracked in a list and the pending slack is
+    shifted lazily, so each step only scans the columns still free.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float('inf')
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        free = list(range(1, m + 1))
+        used = [0]
+        # minv[j] - shift is the real slack of free column j
+        shift = 0
+        while True:
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            base = shift - u[i0]
+            delta = inf
+            j1 = 0
+            for j in free:
+                cur = row[j - 1] - v[j] + base
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                    if cur < delta:
+                        delta = cur
+                        j1 = j
+                elif minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            delta -= shift
+            for j in used:
+                u[p[j]] += delta
+                v[j] -= delta
+            shift += delta
+            free.remove(j1)
+            used.append(j1)
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def _form_crews(drivers, driver_vehicles, vehicle_ok):
+    """Pair free drivers with free linked vehicles, maximising the number of crews.
+
+    Kuhn's augmenting paths (iterative, so long chains of shared vehicles
+    can't hit the recursion limit): a driver takes a shared vehicle only if
+    the driver holding it can be re-seated in another one.
+    """
+    vehicle_owner = {}
+    driver_seat = {}
+
+    def seat(root):
+        seen = set()
+        came_from = {}
+        stack = [(root, iter(driver_vehicles.get(root, ())))]
+        while stack:
+            driver, vehicles = stack[-1]
+            for vehicle in vehicles:
+                if vehicle in seen or not vehicle_ok(vehicle):
+                    continue
+                seen.add(vehicle)
+                came_from[vehicle] = driver
+                owner = vehicle_owner.get(vehicle)
+                if owner is None:
+                    # Flip the alternating path back to the root
+                    while True:
+                        driver = came_from[vehicle]
+                        previous = driver_seat.get(driver)
+                        vehicle_owner[vehicle] = driver
+                        driver_seat[driver] = vehicle
+                        if driver == root:
+                            return
+                        vehicle = previous
+                stack.append((owner, iter(driver_vehicles.get(owner, ()))))
+                break
+            else:
+                stack.pop()
+
+    for driver in drivers:
+        seat(driver)
+    return list(driver_seat.items())
+
+
+def plan(trips, driver_vehicles, capacities, driver_busy, vehicle_busy,
+         trip_minutes=60, wave_minutes=5, spare_crews=50):
+    """Assign (driver, vehicle) crews to trips.
+
+    `trips` is a list of (trip_id, pickup_time, seats). Trips are cut into
+    waves whose pickups fall within `wave_minutes` of each other; since a
+    wave is shorter than a trip, every trip in a wave overlaps every other,
+    so each crew can take at most one of them. Per wave, free drivers are
+    paired with free linked vehicles, then trips are matched to crews with
+    the Hungarian algorithm over a cost matrix that marks crews still busy
+    at a trip's pickup as infeasible. The busy calendars are updated in place.
+    Returns ({trip_id: (driver_id, vehicle_id)}, [unassigned trip_ids]).
+    """
+    duration = timedelta(minutes=trip_minutes)
+    wave_width = timedelta(minutes=min(wave_minutes, trip_minutes))
+    loads = defaultdict(int)
+    assignments = {}
+    unassigned = []
+
+    trips = sorted(trips, key=lambda trip: (trip[1], trip[0]))
+    start = 0
+    while start < len(trips):
+        end = start
+        while end < len(trips) and trips[end][1] < trips[start][1] + wave_width:
+            end += 1
+        wave = trips[start:end]
+        start = end
+
+        last_start = wave[-1][1]
+        last_end = last_start + duration
+
+        # Crews are formed from drivers and vehicles free for at least the
+        # wave's last pickup; per-trip feasibility is checked in the cost matrix
+        drivers = sorted(
+            (driver for driver in driver_vehicles if driver_busy[driver].is_free(last_start, last_end)),
+            key=lambda driver: (loads[driver], driver)
+        )
+        crews = _form_crews(
+            drivers, driver_vehicles,
+            lambda vehicle: vehicle in capacities and vehicle_busy[vehicle].is_free(last_start, last_end)
+        )
+
+        # Every crew is free over the last trip's window, so a trip in this
+        # wave fits a crew exactly when the crew's previous job has ended by
+        # its pickup; that lets feasibility be read off one timestamp per crew
+        first_start = wave[0][1]
+        ready = {}
+        previous = {}
+        for crew in crews:
+            driver, vehicle = crew
+            driver_end = driver_busy[driver].last_end_before(last_start)
+            vehicle_end = vehicle_busy[vehicle].last_end_before(last_start)
+            ready[crew] = max(driver_end or first_start, vehicle_end or first_start)
+            previous[crew] = driver_end
+
+        # Keep the crews that are ready earliest and least loaded
+        crews.sort(key=lambda crew: (ready[crew], loads[crew[0]], capacities[crew[1]], crew))
+        crews = crews[:len(wave) + spare_crews]
+
+        if not crews:
+            unassigned.extend(trip[0] for trip in wave)
+            continue
+
+        columns = [
+            (ready[crew], previous[crew], capacities[crew[1]], loads[crew[0]] * LOAD_WEIGHT)
+            for crew in crews
+        ]
+        cost = []
+        for trip_id, pickup_time, seats in wave:
+            row = []
+            for crew_ready, previous_end, capacity, load_cost in columns:
+                if capacity < seats or crew_ready > pickup_time:
+                    row.append(INFEASIBLE)
+                    continue
+                idle = IDLE_CAP_MINUTES
+                if previous_end is not None:
+                    idle = min(IDLE_CAP_MINUTES, (pickup_time - previous_end).total_seconds() // 60)
+                row.append(load_cost + idle + capacity - seats)
+            cost.append(row)
+
+        # Hungarian needs rows <= columns; with more trips than crews solve it transposed
+        if len(wave) <= len(crews):
+            pairs = list(enumerate(hungarian(cost)))
+        else:
+            transposed = [list(column) for column in zip(*cost)]
+            pairs = [(row, column) for column, row in enumerate(hungarian(transposed))]
+
+        matched = set()
+        for row, column in pairs:
+            if cost[row][column] >= INFEASIBLE:
+                continue
+            trip_id, pickup_time, seats = wave[row]
+            driver, vehicle = crews[column]
+            assignments[trip_id] = (driver, vehicle)
+            driver_busy[driver].add(pickup_time, pickup_time + duration)
+            vehicle_busy[vehicle].add(pickup_time, pickup_time + duration)
+            loads[driver] += 1
+            matched.add(trip_id)
+        unassigned.extend(trip[0] for trip in wave if trip[0] not in matched)
+
+    return assignments, unassigned
+
+
+def staff(trips, vehicle_drivers, driver_busy, trip_minutes=60):
+    """Find drivers for trips that already hold a vehicle, which they keep.
+
+    `trips` is a list of (trip_id, pickup_time, vehicle_id). In pickup
+    order, each trip takes the least loaded driver linked to its vehicle
+    who is free for the whole trip. The busy calendars are updated in place.
+    Returns ({trip_id: (driver_id, vehicle_id)}, [unassigned trip_ids]).
+    """
+    duration = timedelta(minutes=trip_minutes)
+    loads = defaultdict(int)
+    assignments = {}
+    unassigned = []
+    for trip_id, pickup_time, vehicle_id in sorted(trips, key=lambda trip: (trip[1], trip[0])):
+        free = [driver for driver in vehicle_drivers.get(vehicle_id, ())
+                if driver_busy[driver].is_free(pickup_time, pickup_time + duration)]
+        if not free:
+            unassigned.append(trip_id)
+            continue
+        driver = min(free, key=lambda driver: (loads[driver], driver))
+        driver_busy[driver].add(pickup_time, pickup_time + duration)
+        loads[driver] += 1
+        assignments[trip_id] = (driver, vehicle_id)
+    return assignments, unassigned
+
+
+def dispatch(window_start, window_end, trip_minutes=60, wave_minutes=5, dry_run=False):
+    """Assign drivers and vehicles to every unassigned pending trip in the window.
+
+    A trip an admin already gave a vehicle keeps it and only gets a driver
+    linked to that vehicle.
+    """
+    started = time.perf_counter()
+    duration = timedelta(minutes=trip_minutes)
+
+    # A shared ride goes out as one job, keyed by its first trip, that
+    # needs a vehicle with a seat per pooled trip
+    members = defaultdict(list)
+    rides = {}
+    trips = []
+    held = []
+    passengers = {}
+    pending = db.session.query(
+        Trip.id, Trip.pickup_time, Trip.shared_ride_id, Trip.passenger_id, Trip.vehicle_id
+    ).filter(
+        Trip.status == 'pending',
+        Trip.driver_id.is_(None),
+        Trip.pickup_time >= window_start,
+        Trip.pickup_time < window_end
+    ).order_by(Trip.pickup_time, Trip.id)
+    for trip_id, pickup_time, ride_id, passenger_id, vehicle_id in pending:
+        passengers[trip_id] = passenger_id
+        if vehicle_id is not None:
+            held.append((trip_id, pickup_time, vehicle_id))
+        elif ride_id is None:
+            trips.append((trip_id, pickup_time, 1))
+            members[trip_id].append(trip_id)
+        elif ride_id in rides:
+            members[rides[ride_id]].append(trip_id)
+        else:
+            rides[ride_id] = trip_id
+            trips.append((trip_id, pickup_time, None))
+            members[trip_id].append(trip_id)
+    trips = [(trip_id, pickup_time, seats or len(members[trip_id])) for trip_id, pickup_time, seats in trips]
+
+    capacities = dict(
+        db.session.query(Vehicle.id, Vehicle.capacity).filter(
+            (Vehicle.status != 'maintenance') | Vehicle.status.is_(None)
+        )
+    )
+
+    driver_vehicles = defaultdict(list)
+    vehicle_drivers = defaultdict(list)
+    links = db.session.execute(
+        select(driver_vehicle.c.user_id, driver_vehicle.c.vehicle_id)
+        .join(User, User.id == driver_vehicle.c.user_id)
+        .where(User.role == 'driver')
+    )
+    for driver_id, vehicle_id in links:
+        driver_vehicles[driver_id].append(vehicle_id)
+        vehicle_drivers[vehicle_id].append(driver_id)
+
+    # Trips already holding a driver or vehicle block those windows
+    driver_busy = defaultdict(BusyCalendar)
+    vehicle_busy = defaultdict(BusyCalendar)
+    committed = db.session.query(Trip.pickup_time, Trip.driver_id, Trip.vehicle_id).filter(
+        Trip.status.in_(['pending', 'in_progress']),
+        (Trip.driver_id.isnot(None)) | (Trip.vehicle_id.isnot(None)),
+        Trip.pickup_time >= window_start - duration,
+        Trip.pickup_time < window_end + duration
+    ).order_by(Trip.pickup_time)
+    for pickup_time, driver_id, vehicle_id in committed:
+        if driver_id:
+            driver_busy[driver_id].add(pickup_time, pickup_time + duration)
+        if vehicle_id:
+            vehicle_busy[vehicle_id].add(pickup_time, pickup_time + duration)
+
+    # Trips holding a vehicle go first: their vehicle is already booked, only a driver is open
+    held_assignments, held_unassigned = staff(held, vehicle_drivers, driver_busy, trip_minutes=trip_minutes)
+    assignments, unassigned = plan(trips, driver_vehicles, capacities, driver_busy, vehicle_busy,
+                                   trip_minutes=trip_minutes, wave_minutes=wave_minutes)
+
+    assignments = {
+        trip_id: crew
+        for job_id, crew in assignments.items()
+        for trip_id in members[job_id]
+    }
+    unassigned = [trip_id for job_id in unassigned for trip_id in members[job_id]]
+    assignments.update(held_assignments)
+    unassigned.extend(held_unassigned)
+
+    if assignments and not dry_run:
+        db.session.execute(update(Trip), [
+            {'id': trip_id, 'driver_id': driver_id, 'vehicle_id': vehicle_id}
+            for trip_id, (driver_id, vehicle_id) in assignments.items()
+        ])
+        if rides:
+            db.session.execute(update(SharedRide), [
+                {'id': ride_id, 'driver_id': assignments[job_id][0], 'vehicle_id': assignments[job_id][1]}
+                for ride_id, job_id in rides.items() if job_id in assignments
+            ])
+        record_trip_events([
+            {'trip_id': trip_id, 'passenger_id': passengers[trip_id], 'driver_id': driver_id}
+            for trip_id, (driver_id, vehicle_id) in assignments.items()
+        ], 'updated')
+        db.session.commit()
+
+    return {
+        'dry_run': dry_run,
+        'assigned': [
+            {'trip_id': trip_id, 'driver_id': driver_id, 'vehicle_id': vehicle_id}
+            for trip_id, (driver_id, vehicle_id) in sorted(assignments.items())
+        ],
+        'unassigned': sorted(unassigned),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
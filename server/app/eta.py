@@ -0,0 +1,157 @@
+import csv
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from app import app
+from app.gazetteer import PATH as GAZETTEER_PATH, normalize, locate
+
+# Travel times over the offline road graph in roads.csv, whose nodes are
+# gazetteer places. Fastest routes between every pair of places are solved
+# once (Floyd-Warshall, vectorized) and saved as a .npy file named after
+# the inputs' hash; workers memory-map it, so startup reads no more than
+# the pages queries touch and every worker shares them.
+#
+# Points off the graph are snapped to their nearest place, with the
+# straight-line leg to it stretched by ETA_DETOUR_FACTOR and driven at
+# ETA_ACCESS_SPEED_KMH.
+ROADS_PATH = os.path.join(os.path.dirname(__file__), 'roads.csv')
+EARTH_RADIUS_KM = 6371.0
+
+
+class Matrix:
+    """Fastest-route minutes and their kilometres between every pair of graph places."""
+
+    def __init__(self, names, coordinates, minutes, km):
+        self.names = names
+        self.coordinates = coordinates  # (n, 2) degrees
+        self.minutes = minutes
+        self.km = km
+
+    def snap(self, points):
+        """Nearest place for each (lat, lng) row of `points`, and the straight-line km to it."""
+        points = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        places = np.radians(self.coordinates)
+        distances = _haversine(points[:, None, 0], points[:, None, 1], places[None, :, 0], places[None, :, 1])
+        nearest = distances.argmin(axis=1)
+        return nearest, distances[np.arange(len(points)), nearest]
+
+    def estimate(self, origins, destinations, pairwise=True):
+        """Road km and minutes from origins to destinations, each a sequence of (lat, lng).
+
+        pairwise=True pairs them up row by row; False scores every origin
+        against every destination and returns (origins, destinations)
+        arrays. Unreachable pairs come back as inf.
+        """
+        origin_nodes, origin_km = self.snap(origins)
+        destination_nodes, destination_km = self.snap(destinations)
+        if not pairwise:
+            origin_nodes, origin_km = origin_nodes[:, None], origin_km[:, None]
+            destination_nodes, destination_km = destination_nodes[None, :], destination_km[None, :]
+
+        detour = app.config['ETA_DETOUR_FACTOR']
+        access_km = (origin_km + destination_km) * detour
+        km = self.km[origin_nodes, destination_nodes] + access_km
+        minutes = self.minutes[origin_nodes, destination_nodes] + access_km / app.config['ETA_ACCESS_SPEED_KMH'] * 60
+
+        # Both ends by the same place: the direct line beats going through it
+        same = origin_nodes == destination_nodes
+        if same.any():
+            o = np.radians(np.asarray(origins, dtype=np.float64).reshape(-1, 2))
+            d = np.radians(np.asarray(destinations, dtype=np.float64).reshape(-1, 2))
+            if not pairwise:
+                o, d = o[:, None, :], d[None, :, :]
+            direct = _haversine(o[..., 0], o[..., 1], d[..., 0], d[..., 1]) * detour
+            km = np.where(same, np.minimum(km, direct), km)
+            minutes = np.where(same, np.minimum(minutes, direct / app.config['ETA_ACCESS_SPEED_KMH'] * 60), minutes)
+        return km, minutes
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def read_graph(path=ROADS_PATH):
+    """(place names, (n, 2) coordinates, minutes, km) adjacency arrays from a roads file."""
+    names, index, edges = [], {}, []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            ends = []
+            for name in (row['from'], row['to']):
+                key = normalize(name)
+                if key not in index:
+                    if locate(name) is None:
+                        raise ValueError(f'Road end {name!r} is not in the gazetteer')
+                    index[key] = len(names)
+                    names.append(name)
+                ends.append(index[key])
+            km = float(row['km'])
+            edges.append((ends[0], ends[1], km, km / float(row['speed_kmh']) * 60))
+
+    n = len(names)
+    minutes = np.full((n, n), np.inf)
+    km = np.full((n, n), np.inf)
+    np.fill_diagonal(minutes, 0)
+    np.fill_diagonal(km, 0)
+    for a, b, length, duration in edges:
+        # Roads run both ways; keep the faster of parallel roads
+        for i, j in ((a, b), (b, a)):
+            if duration < minutes[i, j]:
+                minutes[i, j], km[i, j] = duration, length
+    coordinates = np.array([locate(name) for name in names], dtype=np.float64)
+    return names, coordinates, minutes, km
+
+
+def solve(minutes, km):
+    """All-pairs fastest routes (Floyd-Warshall), one vectorized pass per intermediate place."""
+    minutes, km = minutes.copy(), km.copy()
+    for k in range(len(minutes)):
+        via = minutes[:, k, None] + minutes[None, k, :]
+        faster = via < minutes
+        minutes = np.where(faster, via, minutes)
+        km = np.where(faster, km[:, k, None] + km[None, k, :], km)
+    return minutes, km
+
+
+def _cache_path(roads_path):
+    digest = hashlib.sha1()
+    for path in (roads_path, GAZETTEER_PATH):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    directory = app.config['ETA_MATRIX_DIR'] or tempfile.gettempdir()
+    return os.path.join(directory, f'eta-matrix-{digest.hexdigest()[:16]}.npy')
+
+
+def build(roads_path=ROADS_PATH, graph=None):
+    """Solve the road graph and write its matrix file (if missing); returns the path."""
+    path = _cache_path(roads_path)
+    if not os.path.exists(path):
+        _, _, minutes, km = graph or read_graph(roads_path)
+        minutes, km = solve(minutes, km)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so a worker never maps half a file
+        partial = f'{path}.{os.getpid()}.tmp'
+        with open(partial, 'wb') as f:
+            np.save(f, np.stack([minutes, km]).astype(np.float32))
+        os.replace(partial, path)
+    return path
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def matrix():
+    """The shared Matrix, mapped from its file on first use (built first if needed)."""
+    global _matrix
+    if _matrix is None:
+        with _lock:
+            if _matrix is None:
+                graph = read_graph()
+                stacked = np.load(build(graph=graph), mmap_mode='r')
+                _matrix = Matrix(graph[0], graph[1], stacked[0], stacked[1])
+    return _matrix
@@ -0,0 +1,59 @@
+import csv
+import os
+import re
+
+from sqlalchemy import event, inspect
+
+from app.models import Trip
+
+# Offline place names and coordinates, seeded from the pickup and dropoff
+# lists in seed.py. Trips get their coordinates from here when they are
+# written, so nothing calls out to a geocoding service.
+PATH = os.path.join(os.path.dirname(__file__), 'gazetteer.csv')
+
+
+def normalize(name):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', name.lower()).split())
+
+
+def _load(path):
+    places = {}
+    first_parts = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            places[normalize(row['name'])] = point
+            first_parts.setdefault(normalize(row['name'].split(',')[0]), []).append(point)
+    # "Westlands" alone finds "Westlands, Nairobi" as long as only one place starts that way
+    for name, points in first_parts.items():
+        if len(points) == 1:
+            places.setdefault(name, points[0])
+    return places
+
+
+PLACES = _load(PATH)
+
+
+def locate(name):
+    """(latitude, longitude) of a place name, or None if it isn't in the gazetteer."""
+    if not isinstance(name, str):
+        return None
+    return PLACES.get(normalize(name))
+
+
+def trip_coordinates(pickup_location, dropoff_location):
+    """Coordinate columns for a trip row written outside the ORM."""
+    pickup = locate(pickup_location) or (None, None)
+    dropoff = locate(dropoff_location) or (None, None)
+    return {'pickup_lat': pickup[0], 'pickup_lng': pickup[1], 'dropoff_lat': dropoff[0], 'dropoff_lng': dropoff[1]}
+
+
+@event.listens_for(Trip, 'before_insert')
+@event.listens_for(Trip, 'before_update')
+def _geocode(mapper, connection, target):
+    state = inspect(target)
+    for end in ['pickup', 'dropoff']:
+        if not state.has_identity or state.attrs[f'{end}_location'].history.has_changes():
+            point = locate(getattr(target, f'{end}_location')) or (None, None)
+            setattr(target, f'{end}_lat', point[0])
+            setattr(target, f'{end}_lng', point[1])
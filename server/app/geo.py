@@ -0,0 +1,187 @@
+import heapq
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import app, db
+from app.models import DriverLocation
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance between two points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Points bucketed into square cells of `cell_degrees` for nearest-neighbour search.
+
+    A query scans rings of cells outward from the one it falls in and
+    stops once the next ring is further away than the k-th best match, so
+    it reads a handful of cells however many points there are.
+    """
+
+    def __init__(self, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.points = {}  # key -> (lat, lng, cell, payload)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def add(self, key, lat, lng, payload=None):
+        self.remove(key)
+        cell = self._cell(lat, lng)
+        self.points[key] = (lat, lng, cell, payload)
+        self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is not None:
+            members = self.cells[point[2]]
+            members.discard(key)
+            if not members:
+                del self.cells[point[2]]
+
+    def nearest(self, lat, lng, k=1, max_km=None, accept=None):
+        """Up to k (distance_km, key, payload) tuples, closest first.
+
+        `accept(key, payload)` filters candidates, e.g. on availability.
+        """
+        row, col = self._cell(lat, lng)
+        best = []  # max-heap of (-distance, key, payload)
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 >= len(self.cells):
+                # The rings cover more cells than are occupied: finish with a scan of the rest
+                self._scan(lat, lng, k, max_km, accept, best, self._outside(row, col, ring))
+                break
+            self._scan(lat, lng, k, max_km, accept, best, self._ring(row, col, ring))
+            # Anything unseen is at least `ring` cells away, measured along
+            # the narrower (longitude) side at the furthest latitude reached
+            edge_lat = min(90.0, abs(lat) + (ring + 1) * self.cell_degrees)
+            reach = ring * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+            if len(best) == k and reach >= -best[0][0]:
+                break
+            if max_km is not None and reach > max_km:
+                break
+            ring += 1
+        return sorted((-negative, key, payload) for negative, key, payload in best)
+
+    def _ring(self, row, col, ring):
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    def _outside(self, row, col, ring):
+        # Occupied cells not in rings 0..ring-1
+        for cell in self.cells:
+            if max(abs(cell[0] - row), abs(cell[1] - col)) >= ring:
+                yield cell
+
+    def _scan(self, lat, lng, k, max_km, accept, best, cells):
+        points = self.points
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                point_lat, point_lng, _, payload = points[key]
+                if accept is not None and not accept(key, payload):
+                    continue
+                distance = distance_km(lat, lng, point_lat, point_lng)
+                if max_km is not None and distance > max_km:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, key, payload))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, key, payload))
+
+
+# Drivers' last reported positions, in memory per worker. Reports go to
+# driver_locations first; each worker folds in the rows reported since it
+# last looked, at most once every DRIVER_LOCATION_REFRESH_SECONDS.
+_drivers = None
+_synced_until = None
+_refreshed_at = 0.0
+_lock = threading.Lock()
+# Rows can commit a little after their reported_at; read back this far
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _index():
+    global _drivers
+    if _drivers is None:
+        _drivers = GridIndex(app.config['GEO_GRID_DEGREES'])
+    return _drivers
+
+
+def _fold(rows):
+    global _synced_until
+    drivers = _index()
+    for row in rows:
+        drivers.add(row.driver_id, row.latitude, row.longitude, (row.available, row.reported_at))
+        if _synced_until is None or row.reported_at > _synced_until:
+            _synced_until = row.reported_at
+
+
+def refresh(force=False):
+    """Load the positions reported since the last refresh into this worker's index."""
+    global _refreshed_at
+    with _lock:
+        now = time.monotonic()
+        if not force and now - _refreshed_at < app.config['DRIVER_LOCATION_REFRESH_SECONDS']:
+            return
+        query = select(DriverLocation.driver_id, DriverLocation.latitude, DriverLocation.longitude,
+                       DriverLocation.available, DriverLocation.reported_at)
+        if _synced_until is not None:
+            query = query.where(DriverLocation.reported_at >= _synced_until - SYNC_OVERLAP)
+        _fold(db.session.execute(query))
+        _refreshed_at = now
+
+
+def report(driver_id, latitude, longitude, available=True):
+    """Record a driver's position in the caller's transaction and in this worker's index."""
+    reported_at = datetime.utcnow()
+    values = {'driver_id': driver_id, 'latitude': latitude, 'longitude': longitude,
+              'available': available, 'reported_at': reported_at}
+    table = DriverLocation.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert_ = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert_(table).values(values)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.driver_id],
+            set_={name: statement.excluded[name] for name in values if name != 'driver_id'}
+        ))
+    else:
+        location = db.session.get(DriverLocation, driver_id) or DriverLocation(driver_id=driver_id)
+        for name, value in values.items():
+            setattr(location, name, value)
+        db.session.add(location)
+    with _lock:
+        _index().add(driver_id, latitude, longitude, (available, reported_at))
+    return values
+
+
+def nearest_drivers(latitude, longitude, limit, max_km):
+    """Closest available drivers that reported within DRIVER_LOCATION_TTL_MINUTES."""
+    refresh()
+    fresh_after = datetime.utcnow() - timedelta(minutes=app.config['DRIVER_LOCATION_TTL_MINUTES'])
+    with _lock:
+        return _index().nearest(latitude, longitude, k=limit, max_km=max_km,
+                                accept=lambda key, payload: payload[0] and payload[1] >= fresh_after)
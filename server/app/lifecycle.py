@@ -0,0 +1,48 @@
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app import app, db, passwords
+from app.models import User, Company, Vehicle, Trip, SharedRide
+from app.loaders import TRIP_LOADERS, USER_LOADERS, COMPANY_LOADERS, VEHICLE_LOADERS, RIDE_LOADERS
+from app.serializers import trip_serializer, user_serializer, company_serializer, vehicle_serializer, ride_serializer
+
+HOT_PATHS = [
+    (Trip, TRIP_LOADERS, trip_serializer),
+    (User, USER_LOADERS, user_serializer),
+    (Company, COMPANY_LOADERS, company_serializer),
+    (Vehicle, VEHICLE_LOADERS, vehicle_serializer),
+    (SharedRide, RIDE_LOADERS, ride_serializer),
+]
+
+
+def compile_plans():
+    """Configure the mappers and compile the serializer plans of the hot endpoints.
+
+    Nested plans are compiled when a row reaches them, so one row of each
+    model is loaded the way its endpoint loads it and serialized. Safe to
+    run before forking: the connection it used is discarded.
+    """
+    configure_mappers()
+    with app.app_context():
+        for model, loaders, serializer in HOT_PATHS:
+            row = model.query.options(*loaders).first()
+            if row is not None:
+                serializer(row)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def connect():
+    """Open this process's first pooled connection, dropping any inherited one."""
+    with app.app_context():
+        db.engine.dispose(close=False)
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+
+
+def close():
+    """Release this process's connections and password hashing pool."""
+    passwords.shutdown()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
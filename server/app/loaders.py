@@ -0,0 +1,37 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import User, Company, Vehicle, Trip, SharedRide
+
+# Loader options per endpoint, mirroring exactly what the serializers walk.
+# Many-to-one links are joined into the main SELECT; collections are fetched
+# with one IN query per relationship instead of one lazy SELECT per row.
+
+TRIP_LOADERS = (
+    joinedload(Trip.company),
+    joinedload(Trip.vehicle),
+    joinedload(Trip.driver).selectinload(User.trips_as_passenger),
+    joinedload(Trip.passenger).selectinload(User.trips_as_driver),
+)
+
+USER_LOADERS = (
+    selectinload(User.companies).selectinload(Company.trips),
+    selectinload(User.vehicles).selectinload(Vehicle.trips),
+    selectinload(User.trips_as_driver).joinedload(Trip.passenger).selectinload(User.trips_as_driver),
+    selectinload(User.trips_as_passenger).joinedload(Trip.driver).selectinload(User.trips_as_passenger),
+)
+
+COMPANY_LOADERS = (
+    selectinload(Company.trips),
+    selectinload(Company.users),
+)
+
+VEHICLE_LOADERS = (
+    selectinload(Vehicle.drivers),
+    selectinload(Vehicle.trips),
+)
+
+RIDE_LOADERS = (
+    joinedload(SharedRide.driver),
+    joinedload(SharedRide.vehicle),
+    selectinload(SharedRide.trips).joinedload(Trip.passenger),
+)
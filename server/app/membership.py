@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import select
+
+from app import app, db
+# Module import: app.cache imports app.versions, which imports this module
+from app import cache
+from app.models import User, user_company
+
+Membership = namedtuple('Membership', ['role', 'company_ids'])
+
+_cache = None
+
+
+def _shared():
+    # Process-wide and bounded; built lazily so config overrides apply
+    global _cache
+    if _cache is None:
+        _cache = cache.LRUCache(app.config['MEMBERSHIP_CACHE_MAX_ENTRIES'], app.config['MEMBERSHIP_CACHE_TTL'])
+    return _cache
+
+
+@app.before_request
+def _forget_memberships():
+    g.pop('memberships', None)
+
+
+def _request_memo():
+    return g.setdefault('memberships', {}) if has_request_context() else {}
+
+
+def remember(user_id, role, company_ids):
+    membership = Membership(role, tuple(sorted(company_ids)))
+    _shared().set(user_id, membership)
+    _request_memo()[user_id] = membership
+    return membership
+
+
+def get_membership(user_id):
+    """Role and company ids for `user_id`, or None if there is no such user.
+
+    Looked up in the request, then in the process cache, and only then in
+    the database with a single query over users and user_company.
+    """
+    memo = _request_memo()
+    if user_id in memo:
+        return memo[user_id]
+
+    membership = _shared().get(user_id)
+    if membership is None:
+        rows = db.session.execute(
+            select(User.role, user_company.c.company_id)
+            .outerjoin(user_company, user_company.c.user_id == User.id)
+            .where(User.id == user_id)
+        ).all()
+        if not rows:
+            return None
+        return remember(user_id, rows[0].role, [row.company_id for row in rows if row.company_id is not None])
+
+    memo[user_id] = membership
+    return membership
+
+
+def cached_role(user_id):
+    """Role of `user_id` if the caller's token or a cached membership says, else None.
+
+    Never queries, so write hooks can use it on every flush.
+    """
+    if has_request_context():
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            # No token was checked for this request (login, registration)
+            identity = None
+        if identity and identity.get('id') == user_id:
+            return identity.get('role')
+    membership = _request_memo().get(user_id) or _shared().get(user_id)
+    return membership.role if membership else None
+
+
+def current_membership(identity):
+    """Membership of the caller, read from the token claims when login put it there."""
+    claims = get_jwt()
+    if 'company_ids' in claims:
+        return Membership(identity.get('role'), tuple(claims['company_ids']))
+    return get_membership(identity.get('id'))
+
+
+def token_claims(company_ids):
+    if not app.config['MEMBERSHIP_IN_TOKEN']:
+        return {}
+    return {'company_ids': sorted(company_ids)}
+
+
+def invalidate(*user_ids):
+    memo = _request_memo()
+    for user_id in user_ids:
+        _shared().delete(user_id)
+        memo.pop(user_id, None)
@@ -0,0 +1,82 @@
+import os
+import time
+
+from flask import g, request, has_request_context
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from app import app
+
+# Under gunicorn every worker writes its samples to files in
+# PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) and a scrape of any
+# worker merges them; without it the metrics live in this process only
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to build the response, by route and status',
+    ['method', 'route', 'status'],
+)
+QUERIES = Counter('db_queries_total', 'SQL statements executed, by route', ['route'])
+POOL_OPEN = Gauge('db_pool_connections', 'Open pooled database connections', multiprocess_mode='livesum')
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Pooled connections in use', multiprocess_mode='livesum')
+BCRYPT_SECONDS = Histogram(
+    'bcrypt_duration_seconds', 'Password hash and check time, including any wait for the pool',
+    ['operation'], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else '<unmatched>'
+
+
+@app.before_request
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        REQUEST_SECONDS.labels(request.method, _route(), response.status_code).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    QUERIES.labels(_route() if has_request_context() else '<none>').inc()
+
+
+@event.listens_for(Pool, 'connect')
+def _connection_opened(dbapi_connection, connection_record):
+    POOL_OPEN.inc()
+
+
+@event.listens_for(Pool, 'close')
+def _connection_closed(dbapi_connection, connection_record):
+    POOL_OPEN.dec()
+
+
+@event.listens_for(Pool, 'checkout')
+def _checked_out(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(Pool, 'checkin')
+def _checked_in(dbapi_connection, connection_record):
+    POOL_CHECKED_OUT.dec()
+
+
+def render():
+    """Prometheus text exposition of every worker's metrics."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
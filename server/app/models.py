@@ -1,4 +1,5 @@
-from app import db, bcrypt
+from app import db
+from app.passwords import hash_password, check_password, needs_rehash
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime
@@ -45,10 +46,13 @@ class User(db.Model, SerializerMixin):
     
     @password_hash.setter
     def password_hash(self, password):
-        self._password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self._password_hash = hash_password(password)
     
     def authenticate(self, password):
-        return bcrypt.check_password_hash(self._password_hash, password)
+        return check_password(self._password_hash, password)
+    
+    def password_needs_rehash(self):
+        return needs_rehash(self._password_hash)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -107,13 +111,21 @@ class Trip(db.Model, SerializerMixin):
     status = db.Column(db.String(20), default='pending')  # 'pending', 'in_progress', 'completed', 'cancelled'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Delta sync key
     notes = db.Column(db.Text)
+    # Resolved from the locations by app/gazetteer.py; null for places it doesn't know
+    pickup_lat = db.Column(db.Float)
+    pickup_lng = db.Column(db.Float)
+    dropoff_lat = db.Column(db.Float)
+    dropoff_lng = db.Column(db.Float)
     
     # Foreign keys
     passenger_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     driver_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id'))
+    schedule_id = db.Column(db.Integer, db.ForeignKey('trip_schedules.id'))
+    shared_ride_id = db.Column(db.Integer, db.ForeignKey('shared_rides.id'))
     
     # Relationships
     passenger = db.relationship('User', foreign_keys=[passenger_id], back_populates='trips_as_passenger')
@@ -121,6 +133,23 @@ class Trip(db.Model, SerializerMixin):
     company = db.relationship('Company', back_populates='trips')
     vehicle = db.relationship('Vehicle', back_populates='trips')
     
+    # Indexes matching the trip listing access paths: admin keyset pages on
+    # (pickup_time, id), drivers and employees page through their own trips,
+    # and dashboards slice by company and status
+    __table_args__ = (
+        db.Index('ix_trips_pickup_time_id', 'pickup_time', 'id'),
+        db.Index('ix_trips_driver_status_pickup', 'driver_id', 'status', 'pickup_time'),
+        # Double-booking checks read a vehicle's booked windows the same way
+        db.Index('ix_trips_vehicle_status_pickup', 'vehicle_id', 'status', 'pickup_time'),
+        db.Index('ix_trips_passenger_pickup', 'passenger_id', 'pickup_time'),
+        db.Index('ix_trips_company_status_pickup', 'company_id', 'status', 'pickup_time'),
+        # One concrete trip per schedule occurrence keeps materialization idempotent
+        db.UniqueConstraint('schedule_id', 'pickup_time', name='uq_trips_schedule_pickup'),
+        db.Index('ix_trips_shared_ride_id', 'shared_ride_id'),
+        # ?since= delta sync reads changes in (updated_at, id) order
+        db.Index('ix_trips_updated_at_id', 'updated_at', 'id'),
+    )
+    
     # Serialization configuration
     serialize_rules = ('-passenger.trips_as_passenger', '-driver.trips_as_driver', 
                   '-company.trips', '-vehicle.trips', '-passenger.companies',
@@ -129,3 +158,141 @@ class Trip(db.Model, SerializerMixin):
     
     def __repr__(self):
         return f'<Trip {self.id}>'
+
+class TripSchedule(db.Model, SerializerMixin):
+    __tablename__ = 'trip_schedules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pickup_location = db.Column(db.String(200), nullable=False)
+    dropoff_location = db.Column(db.String(200), nullable=False)
+    recurrence = db.Column(db.String(100), nullable=False)  # e.g. 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR'
+    pickup_clock = db.Column(db.Time, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    notes = db.Column(db.Text)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    materialized_until = db.Column(db.DateTime)  # Concrete trips exist for every occurrence up to here
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign keys
+    passenger_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_trip_schedules_active_materialized', 'active', 'materialized_until'),
+    )
+    
+    def __repr__(self):
+        return f'<TripSchedule {self.id}>'
+
+class SharedRide(db.Model, SerializerMixin):
+    __tablename__ = 'shared_rides'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pickup_location = db.Column(db.String(200), nullable=False)
+    dropoff_location = db.Column(db.String(200), nullable=False)
+    pickup_time = db.Column(db.DateTime, nullable=False)  # Earliest pickup among the pooled trips
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign keys
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    driver_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id'))
+    
+    # Relationships
+    trips = db.relationship('Trip', order_by='Trip.pickup_time')
+    driver = db.relationship('User')
+    vehicle = db.relationship('Vehicle')
+    
+    __table_args__ = (
+        db.Index('ix_shared_rides_driver_pickup', 'driver_id', 'pickup_time'),
+    )
+    
+    # Serialization configuration: the manifest lists each passenger once
+    serialize_rules = ('-trips.driver', '-trips.company', '-trips.vehicle',
+                  '-trips.passenger.trips_as_passenger', '-trips.passenger.trips_as_driver',
+                  '-trips.passenger.companies', '-trips.passenger.vehicles',
+                  '-driver.trips_as_passenger', '-driver.trips_as_driver',
+                  '-driver.companies', '-driver.vehicles',
+                  '-vehicle.drivers', '-vehicle.trips')
+    
+    def __repr__(self):
+        return f'<SharedRide {self.id}>'
+
+class TripEvent(db.Model):
+    __tablename__ = 'trip_events'
+    
+    # The id doubles as the SSE event id clients resume from
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, nullable=False)  # No foreign key: deletions are logged too
+    action = db.Column(db.String(20), nullable=False)  # 'created', 'updated', 'deleted'
+    passenger_id = db.Column(db.Integer)
+    driver_id = db.Column(db.Integer)
+    previous_driver_id = db.Column(db.Integer)  # Set when a trip moves away from a driver
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_trip_events_created_at', 'created_at'),
+        # Never hand out an id again after pruning, or resumed clients would skip events
+        {'sqlite_autoincrement': True},
+    )
+    
+    def __repr__(self):
+        return f'<TripEvent {self.id} {self.action} trip {self.trip_id}>'
+
+class TripTombstone(db.Model):
+    __tablename__ = 'trip_tombstones'
+    
+    # A trip leaving someone's view: deleted, or moved away from a driver.
+    # Delta sync hands these out as deleted ids; see app/sync.py
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, nullable=False)  # No foreign key: the trip may be gone
+    reason = db.Column(db.String(20), nullable=False)  # 'deleted' or 'reassigned'
+    passenger_id = db.Column(db.Integer)
+    driver_id = db.Column(db.Integer)
+    removed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_trip_tombstones_removed_at', 'removed_at'),
+    )
+    
+    def __repr__(self):
+        return f'<TripTombstone trip {self.trip_id} {self.reason}>'
+
+class DriverLocation(db.Model):
+    __tablename__ = 'driver_locations'
+    
+    # Last position each driver reported; app/geo.py keeps a grid of them in memory
+    driver_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    available = db.Column(db.Boolean, nullable=False, default=True)
+    reported_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<DriverLocation {self.driver_id} {self.latitude},{self.longitude}>'
+
+class TripStat(db.Model):
+    __tablename__ = 'trip_stats'
+    
+    # Running totals of trips per company, pickup day and status, kept by
+    # app/stats.py when STATS_COUNTERS is on
+    company_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    trips = db.Column(db.Integer, nullable=False, default=0)
+    completed_trips = db.Column(db.Integer, nullable=False, default=0)  # Completed with a completed_at
+    completion_seconds = db.Column(db.Float, nullable=False, default=0)  # Their pickup-to-completion time
+    
+    def __repr__(self):
+        return f'<TripStat {self.company_id} {self.day} {self.status}={self.trips}>'
+
+class ChangeVersion(db.Model):
+    __tablename__ = 'change_versions'
+    
+    # 'trips', 'users', ... or a tenant slice such as 'trips:passenger:12'
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ChangeVersion {self.scope}={self.version}>'
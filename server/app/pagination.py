@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(pickup_time, id):
+    # Opaque to clients: base64 of the last row's (pickup_time, id) key
+    payload = json.dumps([pickup_time.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        pickup_time, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(pickup_time), int(id)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def keyset_page(query, time_column, id_column, limit, cursor=None, descending=True):
+    """Return one page of `query` ordered on (time_column, id_column) plus the next cursor.
+
+    The cursor predicate compares against the last key seen, expanded as
+    `time < t OR (time = t AND id < i)` (flipped when ascending) rather than
+    a row-value `(time, id) < (t, i)`, which not every backend plans as an
+    index range. Either way each page starts where the last one ended, so
+    depth costs nothing.
+    """
+    if cursor:
+        last_time, last_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                time_column < last_time,
+                and_(time_column == last_time, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                time_column > last_time,
+                and_(time_column == last_time, id_column > last_id)
+            ))
+
+    if descending:
+        query = query.order_by(time_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(time_column.asc(), id_column.asc())
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
@@ -0,0 +1,84 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app import app, bcrypt
+from app.timing import timed
+from app.metrics import BCRYPT_SECONDS
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# Pool workers run these; they only touch the Flask-Bcrypt extension so the
+# hash format, prefix and long-password handling match the in-process path
+def _generate(password, rounds):
+    return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def _check(pw_hash, password):
+    return bcrypt.check_password_hash(pw_hash, password)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+def _get_pool():
+    # Created lazily so every pre-forked server worker gets its own pool
+    global _pool, _slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _slots = threading.BoundedSemaphore(app.config['BCRYPT_MAX_PENDING'])
+                # Not fork: server workers run threads, and a forked child can
+                # inherit a lock some other thread was holding
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=app.config['BCRYPT_POOL_SIZE'],
+                                            mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def _run(fn, *args):
+    if not app.config['BCRYPT_POOL_SIZE']:
+        return fn(*args)
+
+    pool = _get_pool()
+    # Shed load instead of queueing unbounded work behind a login storm
+    if not _slots.acquire(timeout=app.config['BCRYPT_QUEUE_TIMEOUT']):
+        raise PasswordHasherBusy('Too many password operations in flight')
+    try:
+        return pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    with timed('bcrypt'), BCRYPT_SECONDS.labels('hash').time():
+        return _run(_generate, password, app.config['BCRYPT_LOG_ROUNDS'])
+
+
+def check_password(pw_hash, password):
+    with timed('bcrypt'), BCRYPT_SECONDS.labels('check').time():
+        return _run(_check, pw_hash, password)
+
+
+def hash_rounds(pw_hash):
+    # bcrypt hashes look like $2b$12$<salt+digest>
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(pw_hash):
+    return hash_rounds(pw_hash) != app.config['BCRYPT_LOG_ROUNDS']
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
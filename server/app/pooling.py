@@ -0,0 +1,123 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, update
+
+from app import db
+from app.models import Trip, Vehicle, SharedRide
+from app.trip_events import record_many as record_trip_events
+
+
+def pack(trips, window_minutes, max_seats):
+    """Group trips that can share a vehicle.
+
+    `trips` is a list of (trip_id, pickup_time, route), where trips can only
+    share a ride when their route keys are equal. Per route, trips are swept
+    in pickup order: a ride keeps taking the next trip while that pickup is
+    within `window_minutes` of the ride's first one and a seat is left.
+    Filling greedily from the earliest pickup never needs more rides than
+    any other grouping. Returns one list of trip ids per vehicle, single
+    trips included.
+    """
+    window = timedelta(minutes=window_minutes)
+    routes = defaultdict(list)
+    for trip_id, pickup_time, route in trips:
+        routes[route].append((pickup_time, trip_id))
+
+    groups = []
+    for route_trips in routes.values():
+        route_trips.sort()
+        group = []
+        first_pickup = None
+        for pickup_time, trip_id in route_trips:
+            if group and (len(group) >= max_seats or pickup_time - first_pickup > window):
+                groups.append(group)
+                group = []
+            if not group:
+                first_pickup = pickup_time
+            group.append(trip_id)
+        if group:
+            groups.append(group)
+    return groups
+
+
+def pool(window_start, window_end, window_minutes=10, max_seats=None, dry_run=False):
+    """Pool unassigned pending trips in the window into shared rides.
+
+    Trips pool only with trips of the same company on the same pickup and
+    dropoff location. Rides are capped at the biggest vehicle in service
+    unless `max_seats` is given.
+    """
+    started = time.perf_counter()
+
+    if max_seats is None:
+        max_seats = db.session.query(func.max(Vehicle.capacity)).filter(
+            (Vehicle.status != 'maintenance') | Vehicle.status.is_(None)
+        ).scalar() or 1
+
+    rows = db.session.query(
+        Trip.id, Trip.pickup_time, Trip.company_id, Trip.pickup_location, Trip.dropoff_location, Trip.passenger_id
+    ).filter(
+        Trip.status == 'pending',
+        Trip.driver_id.is_(None),
+        Trip.vehicle_id.is_(None),
+        Trip.shared_ride_id.is_(None),
+        Trip.pickup_time >= window_start,
+        Trip.pickup_time < window_end
+    ).all()
+    by_id = {row.id: row for row in rows}
+
+    groups = pack(
+        [(row.id, row.pickup_time, (row.company_id, row.pickup_location, row.dropoff_location)) for row in rows],
+        window_minutes, max_seats
+    )
+    shared = sorted((group for group in groups if len(group) > 1), key=lambda group: group[0])
+
+    rides = [{
+        'ride_id': None,
+        'pickup_location': by_id[group[0]].pickup_location,
+        'dropoff_location': by_id[group[0]].dropoff_location,
+        'pickup_time': by_id[group[0]].pickup_time,
+        'company_id': by_id[group[0]].company_id,
+        'trip_ids': group,
+        'seats': len(group),
+    } for group in shared]
+
+    if rides and not dry_run:
+        created_at = datetime.utcnow()
+        ride_ids = db.session.scalars(
+            insert(SharedRide).returning(SharedRide.id, sort_by_parameter_order=True),
+            [{
+                'pickup_location': ride['pickup_location'],
+                'dropoff_location': ride['dropoff_location'],
+                'pickup_time': ride['pickup_time'],
+                'company_id': ride['company_id'],
+                'created_at': created_at,
+            } for ride in rides]
+        ).all()
+        db.session.execute(update(Trip), [
+            {'id': trip_id, 'shared_ride_id': ride_id}
+            for ride, ride_id in zip(rides, ride_ids)
+            for trip_id in ride['trip_ids']
+        ])
+        # Pooled trips are still unassigned, so only their passengers hear about it
+        record_trip_events([
+            {'trip_id': trip_id, 'passenger_id': by_id[trip_id].passenger_id}
+            for ride in rides for trip_id in ride['trip_ids']
+        ], 'updated')
+        db.session.commit()
+        for ride, ride_id in zip(rides, ride_ids):
+            ride['ride_id'] = ride_id
+
+    for ride in rides:
+        ride['pickup_time'] = ride['pickup_time'].strftime(SharedRide.datetime_format)
+
+    return {
+        'dry_run': dry_run,
+        'trips': len(rows),
+        'vehicles_before': len(rows),
+        'vehicles_after': len(groups),
+        'rides': rides,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,41 @@
+from functools import wraps
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+def query_budget(limit):
+    """Fail the request if the view issues more than `limit` SQL statements.
+
+    Only enforced when ENFORCE_QUERY_BUDGETS is set (it defaults to
+    app.testing), so a reintroduced N+1 fails under the test client
+    while production pays nothing for the check.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not app.config.get('ENFORCE_QUERY_BUDGETS', app.testing):
+                return view(*args, **kwargs)
+
+            g.query_count = 0
+            response = view(*args, **kwargs)
+            if g.query_count > limit:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__} issued {g.query_count} queries, budget is {limit}'
+                )
+            return response
+        return wrapper
+    return decorator
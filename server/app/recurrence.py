@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+
+class InvalidRecurrence(ValueError):
+    pass
+
+
+class RecurrenceRule:
+    """The subset of RFC 5545 RRULE that commute schedules need.
+
+    Supports FREQ=DAILY|WEEKLY, INTERVAL and BYDAY, e.g.
+    'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR' or 'FREQ=DAILY;INTERVAL=2'.
+    """
+
+    def __init__(self, freq, interval=1, byday=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = byday
+
+    @classmethod
+    def parse(cls, text):
+        if not isinstance(text, str) or not text:
+            raise InvalidRecurrence('Recurrence rule is required')
+
+        parts = {}
+        for part in text.upper().split(';'):
+            key, sep, value = part.partition('=')
+            if not sep or not value:
+                raise InvalidRecurrence(f'Invalid recurrence part: {part}')
+            parts[key] = value
+
+        freq = parts.pop('FREQ', None)
+        if freq not in ['DAILY', 'WEEKLY']:
+            raise InvalidRecurrence('FREQ must be DAILY or WEEKLY')
+
+        try:
+            interval = int(parts.pop('INTERVAL', 1))
+        except ValueError:
+            raise InvalidRecurrence('INTERVAL must be a number')
+        if interval < 1:
+            raise InvalidRecurrence('INTERVAL must be at least 1')
+
+        byday = None
+        if 'BYDAY' in parts:
+            days = parts.pop('BYDAY').split(',')
+            if any(day not in WEEKDAYS for day in days):
+                raise InvalidRecurrence('BYDAY must list days as MO,TU,WE,TH,FR,SA,SU')
+            byday = {WEEKDAYS.index(day) for day in days}
+
+        if parts:
+            raise InvalidRecurrence(f'Unsupported recurrence parts: {", ".join(sorted(parts))}')
+
+        return cls(freq, interval, byday)
+
+    def dates(self, start_date, from_date, to_date):
+        """Yield matching dates in [from_date, to_date], anchored at start_date."""
+        day = max(start_date, from_date)
+        week_anchor = start_date - timedelta(days=start_date.weekday())
+        byday = self.byday if self.byday is not None else {start_date.weekday()}
+
+        while day <= to_date:
+            if self.freq == 'DAILY':
+                matches = (day - start_date).days % self.interval == 0
+                matches = matches and (self.byday is None or day.weekday() in self.byday)
+            else:
+                weeks = (day - week_anchor).days // 7
+                matches = weeks % self.interval == 0 and day.weekday() in byday
+            if matches:
+                yield day
+            day += timedelta(days=1)
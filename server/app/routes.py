@@ -1,8 +1,32 @@
-from flask import request, jsonify, make_response
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app import app, db
-from app.models import User, Company, Vehicle, Trip
-from datetime import datetime
+from flask import request, jsonify, make_response, url_for, Response, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity, get_jwt_request_location
+from sqlalchemy import or_, update
+from sqlalchemy.orm import joinedload
+from app import app, db, jwt
+from app.models import User, Company, Vehicle, Trip, TripSchedule, SharedRide, DriverLocation
+from app.pagination import keyset_page, encode_cursor, decode_cursor, InvalidCursor
+from app.serializers import user_serializer, company_serializer, vehicle_serializer, trip_serializer, schedule_serializer, ride_serializer
+from app.loaders import TRIP_LOADERS, USER_LOADERS, COMPANY_LOADERS, VEHICLE_LOADERS, RIDE_LOADERS
+from app.query_budget import query_budget
+from app.cache import response_cache
+from app.membership import current_membership, remember as remember_membership, invalidate as invalidate_membership, token_claims as membership_claims
+from app.versions import etag, trip_list_scopes, trip_scopes, user_scopes, vehicle_scopes, company_list_scopes, company_scopes
+from app.passwords import PasswordHasherBusy
+from app.bulk_trips import parse_rows, validate_rows, insert_trips, apply_updates, BulkPayloadError, TRANSITIONS as TRIP_TRANSITIONS
+from app.recurrence import RecurrenceRule, InvalidRecurrence
+from app.scheduling import materialize, materialize_due, project, projected_trip
+from app.dispatch import dispatch
+from app.pooling import pool
+from app.trip_events import record as record_trip_event, record_many as record_trip_events, stream as stream_trip_events
+from app.metrics import CONTENT_TYPE_LATEST, render as render_metrics
+from app import stats
+from app import geo, eta
+from app.gazetteer import locate
+from app.sync import changes as sync_changes, initial_token as initial_sync_token, SyncTokenExpired
+from app.bookings import BOOKED, Bookings, free_slots
+from datetime import datetime, date, time, timedelta
+from itertools import islice
+import numpy as np
 
 # Authentication routes
 @app.route('/api/login', methods=['POST'])
@@ -12,33 +36,46 @@ def login():
     if not data or not data.get('email') or not data.get('password'):
         return make_response(jsonify({'error': 'Missing email or password'}), 400)
     
-    user = User.query.filter_by(email=data.get('email')).first()
+    user = User.query.options(joinedload(User.companies)).filter_by(email=data.get('email')).first()
     
     if not user or not user.authenticate(data.get('password')):
         return make_response(jsonify({'error': 'Invalid email or password'}), 401)
     
-    access_token = create_access_token(identity={'id': user.id, 'role': user.role})
+    user_data = {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'role': user.role,
+        'companies': [{'id': company.id, 'name': company.name} for company in user.companies]
+    }
+    company_ids = [company.id for company in user.companies]
+    remember_membership(user.id, user.role, company_ids)
+    
+    # Upgrade hashes made with an older work factor while we have the plaintext
+    if user.password_needs_rehash():
+        user.password_hash = data.get('password')
+        db.session.commit()
+    
+    access_token = create_access_token(identity={'id': user.id, 'role': user.role},
+                                       additional_claims=membership_claims(company_ids))
     
     return jsonify({
         'message': 'Login successful',
         'access_token': access_token,
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'role': user.role,
-            'companies': [{'id': company.id, 'name': company.name} for company in user.companies]
-        }
+        'user': user_data
     })
 
 # Company routes
 @app.route('/api/companies', methods=['GET'])
 @jwt_required()
+@etag(company_list_scopes)
+@response_cache.cached('companies', company_list_scopes)
+@query_budget(4)
 def get_companies():
-    companies = Company.query.all()
-    return jsonify([company.to_dict() for company in companies])
+    companies = Company.query.options(*COMPANY_LOADERS).all()
+    return jsonify(company_serializer.many(companies))
 
 @app.route('/api/companies', methods=['POST'])
 def register_company():
@@ -93,24 +130,30 @@ def register_company():
     db.session.add(new_company)
     db.session.add(admin_user)
     db.session.commit()
+    invalidate_membership(admin_user.id)
+    response_cache.invalidate('companies')
     
     return jsonify({
         'message': 'Company registered successfully',
-        'company': new_company.to_dict()
+        'company': company_serializer(new_company)
     }), 201
 
 @app.route('/api/companies/<int:id>', methods=['GET'])
 @jwt_required()
+@etag(company_scopes)
+@query_budget(4)
 def get_company(id):
-    company = Company.query.get(id)
+    company = db.session.get(Company, id, options=COMPANY_LOADERS)
     if not company:
         return make_response(jsonify({'error': 'Company not found'}), 404)
     
-    return jsonify(company.to_dict())
+    return jsonify(company_serializer(company))
 
 # User routes
 @app.route('/api/users', methods=['GET'])
 @jwt_required()
+@etag(user_scopes)
+@query_budget(12)
 def get_users():
     current_user = get_jwt_identity()
     
@@ -118,8 +161,8 @@ def get_users():
     if current_user.get('role') != 'admin':
         return make_response(jsonify({'error': 'Unauthorized'}), 403)
     
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    users = User.query.options(*USER_LOADERS).all()
+    return jsonify(user_serializer.many(users))
 
 @app.route('/api/users', methods=['POST'])
 @jwt_required()
@@ -170,18 +213,23 @@ def create_user():
     # Save to database
     db.session.add(new_user)
     db.session.commit()
+    invalidate_membership(new_user.id)
+    response_cache.invalidate('companies', 'vehicles')
     
     return jsonify({
         'message': 'User created successfully',
-        'user': new_user.to_dict()
+        'user': user_serializer(new_user)
     }), 201
 
 # Vehicle routes
 @app.route('/api/vehicles', methods=['GET'])
 @jwt_required()
+@etag(vehicle_scopes)
+@response_cache.cached('vehicles', vehicle_scopes)
+@query_budget(4)
 def get_vehicles():
-    vehicles = Vehicle.query.all()
-    return jsonify([vehicle.to_dict() for vehicle in vehicles])
+    vehicles = Vehicle.query.options(*VEHICLE_LOADERS).all()
+    return jsonify(vehicle_serializer.many(vehicles))
 
 @app.route('/api/vehicles', methods=['POST'])
 @jwt_required()
@@ -218,10 +266,11 @@ def create_vehicle():
     # Save to database
     db.session.add(new_vehicle)
     db.session.commit()
+    response_cache.invalidate('vehicles')
     
     return jsonify({
         'message': 'Vehicle created successfully',
-        'vehicle': new_vehicle.to_dict()
+        'vehicle': vehicle_serializer(new_vehicle)
     }), 201
 
 @app.route('/api/vehicles/<int:id>', methods=['PUT'])
@@ -251,29 +300,154 @@ def update_vehicle(id):
     
     # Save to database
     db.session.commit()
+    response_cache.invalidate('vehicles')
     
     return jsonify({
         'message': 'Vehicle updated successfully',
-        'vehicle': vehicle.to_dict()
+        'vehicle': vehicle_serializer(vehicle)
     })
 
 # Trip routes - Full CRUD operations
 @app.route('/api/trips', methods=['GET'])
 @jwt_required()
+@etag(trip_list_scopes)
+@query_budget(4)
 def get_trips():
     current_user = get_jwt_identity()
     user_id = current_user.get('id')
     role = current_user.get('role')
     
+    # Occurrences of recurring schedules that have not been written as trips yet
+    if request.args.get('upcoming', '').lower() in ['1', 'true', 'yes']:
+        return get_upcoming_trips(user_id, role)
+    
+    # Delta sync: trips changed and ids removed since the client's token
+    if 'since' in request.args:
+        limit = request.args.get('limit', app.config['TRIPS_MAX_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['TRIPS_MAX_PAGE_SIZE']))
+        try:
+            trips, deleted, next_token, has_more = sync_changes(request.args['since'], user_id, role, limit)
+        except InvalidCursor:
+            return make_response(jsonify({'error': 'Invalid sync token'}), 400)
+        except SyncTokenExpired:
+            return make_response(jsonify({'error': 'Sync token expired, reload the full list'}), 410)
+        response = jsonify({
+            'changed': trip_serializer.many(trips),
+            'deleted': deleted,
+            'next': next_token,
+            'has_more': has_more,
+        })
+        response.headers['X-Sync-Token'] = next_token
+        return response
+    
+    # Token to poll ?since= with once the full list is loaded
+    sync_token = initial_sync_token()
+    
     # Filter trips based on user role
-    if role == 'admin':
-        trips = Trip.query.all()
-    elif role == 'driver':
-        trips = Trip.query.filter_by(driver_id=user_id).all()
-    else:  # employee
-        trips = Trip.query.filter_by(passenger_id=user_id).all()
+    query = Trip.query.options(*TRIP_LOADERS)
+    if role == 'driver':
+        query = query.filter_by(driver_id=user_id)
+    elif role != 'admin':  # employee
+        query = query.filter_by(passenger_id=user_id)
+    
+    # Server-side filters
+    if request.args.get('status'):
+        query = query.filter(Trip.status.in_(request.args['status'].split(',')))
+    
+    for field in ['company_id', 'driver_id', 'passenger_id', 'vehicle_id']:
+        if field in request.args:
+            value = request.args.get(field, type=int)
+            if value is None:
+                return make_response(jsonify({'error': f'Invalid {field}'}), 400)
+            query = query.filter(getattr(Trip, field) == value)
     
-    return jsonify([trip.to_dict() for trip in trips])
+    try:
+        if request.args.get('pickup_from'):
+            pickup_from = datetime.fromisoformat(request.args['pickup_from'].replace('Z', '+00:00')).replace(tzinfo=None)
+            query = query.filter(Trip.pickup_time >= pickup_from)
+        if request.args.get('pickup_to'):
+            pickup_to = datetime.fromisoformat(request.args['pickup_to'].replace('Z', '+00:00')).replace(tzinfo=None)
+            query = query.filter(Trip.pickup_time < pickup_to)
+    except ValueError:
+        return make_response(jsonify({'error': 'Invalid pickup time format'}), 400)
+    
+    # Keyset pagination on (pickup_time, id)
+    limit = request.args.get('limit', app.config['TRIPS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['TRIPS_MAX_PAGE_SIZE']))
+    order = request.args.get('order', 'desc')
+    if order not in ['asc', 'desc']:
+        return make_response(jsonify({'error': 'Invalid order, expected asc or desc'}), 400)
+    
+    try:
+        trips, next_cursor = keyset_page(query, Trip.pickup_time, Trip.id, limit,
+                                         cursor=request.args.get('cursor'),
+                                         descending=(order == 'desc'))
+    except InvalidCursor:
+        return make_response(jsonify({'error': 'Invalid cursor'}), 400)
+    
+    response = jsonify(trip_serializer.many(trips))
+    response.headers['X-Sync-Token'] = sync_token
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_trips", **args)}>; rel="next"'
+    
+    return response
+
+# EventSource can't send an Authorization header, so browsers open the
+# stream with a short-lived token in the query string. Only tokens with
+# this scope are accepted there, and they open nothing else
+STREAM_SCOPE = 'trip_stream'
+
+@jwt.token_verification_loader
+def verify_token_scope(jwt_header, jwt_data):
+    return jwt_data.get('scope') != STREAM_SCOPE or request.endpoint == 'stream_trips'
+
+@jwt.token_verification_failed_loader
+def token_scope_failed(jwt_header, jwt_data):
+    return make_response(jsonify({'error': 'Stream tokens can only open /api/trips/stream'}), 403)
+
+@app.route('/api/trips/stream/token', methods=['POST'])
+@jwt_required()
+def create_stream_token():
+    current_user = get_jwt_identity()
+    expires_in = app.config['TRIP_STREAM_TOKEN_SECONDS']
+    stream_token = create_access_token(identity={'id': current_user.get('id'), 'role': current_user.get('role')},
+                                       additional_claims={'scope': STREAM_SCOPE},
+                                       expires_delta=timedelta(seconds=expires_in))
+    
+    return jsonify({
+        'stream_token': stream_token,
+        'expires_in': expires_in
+    })
+
+@app.route('/api/trips/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_trips():
+    current_user = get_jwt_identity()
+    
+    # URLs end up in access logs and browser history: keep access tokens out of them
+    if get_jwt_request_location() == 'query_string' and get_jwt().get('scope') != STREAM_SCOPE:
+        return make_response(jsonify({'error': 'Use a token from POST /api/trips/stream/token in the query string'}), 401)
+    
+    # EventSource resends the last id it saw in a header when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return make_response(jsonify({'error': 'Invalid Last-Event-ID'}), 400)
+    
+    events = stream_trip_events(current_user.get('id'), current_user.get('role'), last_event_id,
+                                poll_seconds=app.config['TRIP_EVENTS_POLL_SECONDS'],
+                                heartbeat_seconds=app.config['TRIP_EVENTS_HEARTBEAT_SECONDS'],
+                                max_seconds=app.config['TRIP_EVENTS_MAX_STREAM_SECONDS'],
+                                batch_size=app.config['TRIP_EVENTS_BATCH_SIZE'])
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/trips', methods=['POST'])
 @jwt_required()
@@ -291,14 +465,14 @@ def create_trip():
             return make_response(jsonify({'error': f'Missing required field: {field}'}), 400)
     
     # Get user's company if not provided
+    membership = current_membership(current_user)
     company_id = data.get('company_id')
     if not company_id:
         # Get the user's first company
-        user = User.query.get(user_id)
-        if not user or not user.companies:
+        if not membership or not membership.company_ids:
             return make_response(jsonify({'error': 'User has no associated company'}), 400)
-        company_id = user.companies[0].id
-    else:
+        company_id = membership.company_ids[0]
+    elif not membership or company_id not in membership.company_ids:
         # Check if company exists
         company = Company.query.get(company_id)
         if not company:
@@ -323,21 +497,108 @@ def create_trip():
     
     # Save to database
     db.session.add(new_trip)
+    record_trip_event(new_trip, 'created')
     db.session.commit()
     
     return jsonify({
         'message': 'Trip created successfully',
-        'trip': new_trip.to_dict()
+        'trip': trip_serializer(new_trip)
     }), 201
 
+@app.route('/api/trips/bulk', methods=['POST'])
+@jwt_required()
+def create_trips_bulk():
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    try:
+        rows = parse_rows(request, app.config['TRIPS_BULK_MAX_ROWS'])
+    except BulkPayloadError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    
+    # Validate every row before writing anything
+    values, results = validate_rows(rows, user_id, role)
+    
+    failed = sum(1 for result in results if not result['ok'])
+    if failed:
+        return make_response(jsonify({
+            'error': f'{failed} of {len(rows)} trips failed validation',
+            'results': results
+        }), 400)
+    
+    if request.args.get('dry_run', '').lower() in ['1', 'true', 'yes']:
+        return jsonify({
+            'message': f'{len(rows)} trips are valid',
+            'dry_run': True,
+            'results': results
+        })
+    
+    # Insert in chunks inside a single transaction
+    ids = insert_trips(values, app.config['TRIPS_BULK_CHUNK_SIZE'])
+    record_trip_events([
+        {'trip_id': trip_id, 'passenger_id': value['passenger_id']}
+        for trip_id, value in zip(ids, values)
+    ], 'created')
+    db.session.commit()
+    
+    for result, trip_id in zip(results, ids):
+        result['id'] = trip_id
+    
+    return jsonify({
+        'message': f'{len(ids)} trips created successfully',
+        'results': results
+    }), 201
+
+@app.route('/api/trips', methods=['PATCH'])
+@jwt_required()
+def update_trips_bulk():
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    try:
+        rows = parse_rows(request, app.config['TRIPS_BULK_MAX_ROWS'])
+    except BulkPayloadError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    
+    # Every row is checked; one failure rolls back the whole batch
+    results = apply_updates(rows, user_id, role)
+    
+    failed = [result for result in results if not result['ok']]
+    if failed:
+        db.session.rollback()
+        code = 403 if any(result['error'] == 'Unauthorized' for result in failed) else 400
+        return make_response(jsonify({
+            'error': f'{len(failed)} of {len(rows)} trip updates failed',
+            'results': results
+        }), code)
+    
+    if request.args.get('dry_run', '').lower() in ['1', 'true', 'yes']:
+        db.session.rollback()
+        return jsonify({
+            'message': f'{len(rows)} trip updates are valid',
+            'dry_run': True,
+            'results': results
+        })
+    
+    db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(rows)} trips updated successfully',
+        'results': results
+    })
+
 @app.route('/api/trips/<int:id>', methods=['GET'])
 @jwt_required()
+@etag(trip_scopes)
+@query_budget(4)
 def get_trip(id):
     current_user = get_jwt_identity()
     user_id = current_user.get('id')
     role = current_user.get('role')
     
-    trip = Trip.query.get(id)
+    trip = db.session.get(Trip, id, options=TRIP_LOADERS)
     if not trip:
         return make_response(jsonify({'error': 'Trip not found'}), 404)
     
@@ -345,7 +606,70 @@ def get_trip(id):
     if role != 'admin' and trip.passenger_id != user_id and trip.driver_id != user_id:
         return make_response(jsonify({'error': 'Unauthorized'}), 403)
     
-    return jsonify(trip.to_dict())
+    return jsonify(trip_serializer(trip))
+
+@app.route('/api/trips/<int:id>/eta', methods=['GET'])
+@jwt_required()
+def get_trip_eta(id):
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    trip = db.session.get(Trip, id)
+    if not trip:
+        return make_response(jsonify({'error': 'Trip not found'}), 404)
+    
+    if role != 'admin' and trip.passenger_id != user_id and trip.driver_id != user_id:
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    if trip.pickup_lat is None or trip.dropoff_lat is None:
+        return make_response(jsonify({'error': 'Trip locations have no coordinates'}), 400)
+    
+    # Admins can score candidate drivers; otherwise the assigned one
+    driver_ids = [trip.driver_id] if trip.driver_id else []
+    if 'driver_ids' in request.args and role == 'admin':
+        try:
+            driver_ids = [int(value) for value in request.args['driver_ids'].split(',') if value]
+        except ValueError:
+            return make_response(jsonify({'error': 'Invalid driver_ids'}), 400)
+    locations = {location.driver_id: location for location in
+                 DriverLocation.query.filter(DriverLocation.driver_id.in_(driver_ids))} if driver_ids else {}
+    located = [driver_id for driver_id in driver_ids if driver_id in locations]
+    
+    # The trip itself and every driver-to-pickup leg in one batched lookup
+    pickup, dropoff = (trip.pickup_lat, trip.pickup_lng), (trip.dropoff_lat, trip.dropoff_lng)
+    origins = [pickup] + [(locations[d].latitude, locations[d].longitude) for d in located]
+    km, minutes = eta.matrix().estimate(origins, [dropoff] + [pickup] * len(located))
+    
+    def rounded(value, digits=1):
+        return round(float(value), digits) if np.isfinite(value) else None
+    
+    now = datetime.utcnow()
+    drivers = []
+    for driver_id in driver_ids:
+        if driver_id not in locations:
+            drivers.append({'driver_id': driver_id, 'km': None, 'minutes': None, 'arrives_at': None, 'on_time': None})
+            continue
+        i = located.index(driver_id) + 1
+        arrives_at = now + timedelta(minutes=float(minutes[i])) if np.isfinite(minutes[i]) else None
+        drivers.append({
+            'driver_id': driver_id,
+            'km': rounded(km[i]),
+            'minutes': rounded(minutes[i]),
+            'arrives_at': arrives_at.isoformat() if arrives_at else None,
+            'on_time': arrives_at <= trip.pickup_time if arrives_at else False,
+            'reported_at': locations[driver_id].reported_at.isoformat(),
+        })
+    
+    arrival = trip.pickup_time + timedelta(minutes=float(minutes[0])) if np.isfinite(minutes[0]) else None
+    return jsonify({
+        'trip_id': trip.id,
+        'km': rounded(km[0]),
+        'minutes': rounded(minutes[0]),
+        'pickup_time': trip.pickup_time.isoformat(),
+        'estimated_arrival': arrival.isoformat() if arrival else None,
+        'drivers': drivers,
+    })
 
 @app.route('/api/trips/<int:id>', methods=['PUT'])
 @jwt_required()
@@ -363,6 +687,9 @@ def update_trip(id):
         return make_response(jsonify({'error': 'Unauthorized'}), 403)
     
     data = request.get_json()
+    previous_driver_id = trip.driver_id
+    previous_vehicle_id = trip.vehicle_id
+    previous_pickup_time = trip.pickup_time
     
     # Update trip fields
     if 'pickup_location' in data and role in ['admin', 'employee'] and trip.status == 'pending':
@@ -373,21 +700,14 @@ def update_trip(id):
     
     if 'pickup_time' in data and role in ['admin', 'employee'] and trip.status == 'pending':
         try:
-            pickup_time = datetime.fromisoformat(data['pickup_time'].replace('Z', '+00:00'))
+            pickup_time = datetime.fromisoformat(data['pickup_time'].replace('Z', '+00:00')).replace(tzinfo=None)
             trip.pickup_time = pickup_time
         except ValueError:
             return make_response(jsonify({'error': 'Invalid pickup time format'}), 400)
     
     if 'status' in data:
         # Validate status transitions
-        valid_transitions = {
-            'pending': ['in_progress', 'cancelled'],
-            'in_progress': ['completed'],
-            'completed': [],
-            'cancelled': []
-        }
-        
-        if data['status'] not in valid_transitions[trip.status]:
+        if data['status'] not in TRIP_TRANSITIONS[trip.status]:
             return make_response(jsonify({'error': f'Invalid status transition from {trip.status} to {data["status"]}'}), 400)
         
         # Check if user has permission to change status
@@ -417,15 +737,27 @@ def update_trip(id):
             return make_response(jsonify({'error': 'Vehicle not found'}), 404)
         trip.vehicle_id = data['vehicle_id']
     
+    # Don't book a driver or vehicle over another of their trips
+    if trip.status in BOOKED and trip.pickup_time is not None:
+        moved = trip.pickup_time != previous_pickup_time
+        driver_id = trip.driver_id if moved or trip.driver_id != previous_driver_id else None
+        vehicle_id = trip.vehicle_id if moved or trip.vehicle_id != previous_vehicle_id else None
+        if driver_id or vehicle_id:
+            conflict = Bookings.around([trip], [driver_id], [vehicle_id]).conflict(
+                trip.id, trip.pickup_time, driver_id, vehicle_id)
+            if conflict:
+                return make_response(jsonify({'error': conflict}), 409)
+    
     if 'notes' in data:
         trip.notes = data['notes']
     
     # Save to database
+    record_trip_event(trip, 'updated', previous_driver_id=previous_driver_id)
     db.session.commit()
     
     return jsonify({
         'message': 'Trip updated successfully',
-        'trip': trip.to_dict()
+        'trip': trip_serializer(trip)
     })
 
 @app.route('/api/trips/<int:id>', methods=['DELETE'])
@@ -443,6 +775,7 @@ def delete_trip(id):
         return make_response(jsonify({'error': 'Trip not found'}), 404)
     
     # Delete trip
+    record_trip_event(trip, 'deleted')
     db.session.delete(trip)
     db.session.commit()
     
@@ -450,6 +783,328 @@ def delete_trip(id):
         'message': 'Trip deleted successfully'
     })
 
+def get_upcoming_trips(user_id, role):
+    query = TripSchedule.query.filter_by(active=True)
+    if role == 'driver':
+        return jsonify([])
+    elif role != 'admin':  # employee
+        query = query.filter_by(passenger_id=user_id)
+    
+    if 'company_id' in request.args:
+        company_id = request.args.get('company_id', type=int)
+        if company_id is None:
+            return make_response(jsonify({'error': 'Invalid company_id'}), 400)
+        query = query.filter_by(company_id=company_id)
+    
+    now = datetime.utcnow()
+    try:
+        start = now
+        if request.args.get('pickup_from'):
+            start = datetime.fromisoformat(request.args['pickup_from'].replace('Z', '+00:00')).replace(tzinfo=None)
+        end = start + timedelta(days=app.config['SCHEDULE_HORIZON_DAYS'])
+        if request.args.get('pickup_to'):
+            end = datetime.fromisoformat(request.args['pickup_to'].replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return make_response(jsonify({'error': 'Invalid pickup time format'}), 400)
+    
+    # Projections are computed, not stored, so bound how far ahead we look
+    end = min(end, start + timedelta(days=app.config['SCHEDULE_PROJECTION_MAX_DAYS']))
+    
+    limit = request.args.get('limit', app.config['TRIPS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['TRIPS_MAX_PAGE_SIZE']))
+    
+    # Keyset pagination on (pickup_time, schedule_id)
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'])
+        except InvalidCursor:
+            return make_response(jsonify({'error': 'Invalid cursor'}), 400)
+    
+    # Only schedules with unwritten occurrences somewhere in the window
+    query = query.filter(
+        TripSchedule.start_date <= end.date(),
+        or_(TripSchedule.end_date.is_(None), TripSchedule.end_date >= start.date()),
+        or_(TripSchedule.materialized_until.is_(None), TripSchedule.materialized_until < end)
+    )
+    page = list(islice(project(query.all(), start, end, after), limit + 1))
+    
+    response = jsonify([projected_trip(pickup_time, schedule) for pickup_time, schedule in page[:limit]])
+    if len(page) > limit:
+        pickup_time, schedule = page[limit - 1]
+        next_cursor = encode_cursor(pickup_time, schedule.id)
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_trips", **args)}>; rel="next"'
+    return response
+
+# Recurring schedule routes
+@app.route('/api/schedules', methods=['GET'])
+@jwt_required()
+def get_schedules():
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    if role == 'admin':
+        schedules = TripSchedule.query.all()
+    else:
+        schedules = TripSchedule.query.filter_by(passenger_id=user_id).all()
+    
+    return jsonify(schedule_serializer.many(schedules))
+
+@app.route('/api/schedules', methods=['POST'])
+@jwt_required()
+def create_schedule():
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    data = request.get_json()
+    
+    # Validate required fields
+    required_fields = ['pickup_location', 'dropoff_location', 'recurrence', 'pickup_time', 'start_date']
+    
+    for field in required_fields:
+        if field not in data:
+            return make_response(jsonify({'error': f'Missing required field: {field}'}), 400)
+    
+    try:
+        RecurrenceRule.parse(data['recurrence'])
+    except InvalidRecurrence as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    
+    try:
+        pickup_clock = time.fromisoformat(data['pickup_time'])
+        start_date = date.fromisoformat(data['start_date'])
+        end_date = date.fromisoformat(data['end_date']) if data.get('end_date') else None
+    except (ValueError, TypeError):
+        return make_response(jsonify({'error': 'Invalid pickup_time, start_date or end_date format'}), 400)
+    
+    if end_date and end_date < start_date:
+        return make_response(jsonify({'error': 'end_date must not be before start_date'}), 400)
+    
+    # Only admins can schedule rides for other passengers
+    passenger_id = data.get('passenger_id', user_id)
+    if passenger_id != user_id and role != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    passenger = User.query.get(passenger_id)
+    if not passenger:
+        return make_response(jsonify({'error': 'Passenger not found'}), 404)
+    
+    company_id = data.get('company_id')
+    if not company_id:
+        if not passenger.companies:
+            return make_response(jsonify({'error': 'User has no associated company'}), 400)
+        company_id = passenger.companies[0].id
+    elif not Company.query.get(company_id):
+        return make_response(jsonify({'error': 'Company not found'}), 404)
+    
+    schedule = TripSchedule(
+        pickup_location=data['pickup_location'],
+        dropoff_location=data['dropoff_location'],
+        recurrence=data['recurrence'].upper(),
+        pickup_clock=pickup_clock.replace(tzinfo=None),
+        start_date=start_date,
+        end_date=end_date,
+        notes=data.get('notes', ''),
+        passenger_id=passenger_id,
+        company_id=company_id
+    )
+    db.session.add(schedule)
+    db.session.flush()
+    
+    # Write the first horizon right away so the next rides are bookable
+    now = datetime.utcnow()
+    materialize([schedule], now, now + timedelta(days=app.config['SCHEDULE_HORIZON_DAYS']))
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Schedule created successfully',
+        'schedule': schedule_serializer(schedule)
+    }), 201
+
+@app.route('/api/schedules/<int:id>', methods=['DELETE'])
+@jwt_required()
+def delete_schedule(id):
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    schedule = TripSchedule.query.get(id)
+    if not schedule:
+        return make_response(jsonify({'error': 'Schedule not found'}), 404)
+    
+    if role != 'admin' and schedule.passenger_id != user_id:
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    # Stop future occurrences and cancel the ones already written but not started
+    schedule.active = False
+    trips = db.session.query(Trip.id, Trip.passenger_id, Trip.driver_id).filter(
+        Trip.schedule_id == schedule.id,
+        Trip.status == 'pending',
+        Trip.pickup_time > datetime.utcnow()
+    ).all()
+    cancelled = 0
+    if trips:
+        counted = stats.counted([trip.id for trip in trips])
+        cancelled = Trip.query.filter(
+            Trip.id.in_([trip.id for trip in trips]),
+            Trip.status == 'pending'
+        ).execution_options(stats_counted=True).update({'status': 'cancelled'}, synchronize_session=False)
+        stats.apply(removed=counted.values(), added=[dict(row, status='cancelled') for row in counted.values()])
+        # Dashboards watching the trip stream see the cancellations
+        record_trip_events([{'trip_id': trip.id, 'passenger_id': trip.passenger_id, 'driver_id': trip.driver_id}
+                            for trip in trips], 'updated')
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Schedule deactivated successfully',
+        'cancelled_trips': cancelled
+    })
+
+@app.route('/api/schedules/materialize', methods=['POST'])
+@jwt_required()
+def materialize_schedules():
+    current_user = get_jwt_identity()
+    
+    # Only admins can trigger materialization
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    created = materialize_due(horizon_days=app.config['SCHEDULE_HORIZON_DAYS'])
+    
+    return jsonify({
+        'message': 'Schedules materialized successfully',
+        'created_trips': created
+    })
+
+# Dispatch routes
+@app.route('/api/dispatch', methods=['POST'])
+@jwt_required()
+def dispatch_trips():
+    current_user = get_jwt_identity()
+    
+    # Only admins can dispatch trips
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        window_start, window_end = parse_window(data)
+    except (ValueError, AttributeError):
+        return make_response(jsonify({'error': 'Invalid pickup time format'}), 400)
+    
+    result = dispatch(window_start, window_end,
+                      trip_minutes=app.config['DISPATCH_TRIP_MINUTES'],
+                      wave_minutes=app.config['DISPATCH_WAVE_MINUTES'],
+                      dry_run=bool(data.get('dry_run')))
+    
+    return jsonify({
+        'message': f'Assigned {len(result["assigned"])} of '
+                   f'{len(result["assigned"]) + len(result["unassigned"])} pending trips',
+        **result
+    })
+
+def parse_window(data):
+    # Default to everything pending over the next day
+    window_start = datetime.utcnow()
+    if data.get('pickup_from'):
+        window_start = datetime.fromisoformat(data['pickup_from'].replace('Z', '+00:00')).replace(tzinfo=None)
+    window_end = window_start + timedelta(days=1)
+    if data.get('pickup_to'):
+        window_end = datetime.fromisoformat(data['pickup_to'].replace('Z', '+00:00')).replace(tzinfo=None)
+    return window_start, window_end
+
+# Ride pooling routes
+@app.route('/api/pooling', methods=['POST'])
+@jwt_required()
+def pool_trips():
+    current_user = get_jwt_identity()
+    
+    # Only admins can pool trips
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        window_start, window_end = parse_window(data)
+    except (ValueError, AttributeError):
+        return make_response(jsonify({'error': 'Invalid pickup time format'}), 400)
+    
+    max_seats = data.get('max_seats')
+    if max_seats is not None and (not isinstance(max_seats, int) or max_seats < 1):
+        return make_response(jsonify({'error': 'max_seats must be a positive integer'}), 400)
+    
+    result = pool(window_start, window_end,
+                  window_minutes=app.config['POOLING_WINDOW_MINUTES'],
+                  max_seats=max_seats,
+                  dry_run=bool(data.get('dry_run')))
+    
+    return jsonify({
+        'message': f'Pooled {result["vehicles_before"]} trips into {result["vehicles_after"]} vehicles',
+        **result
+    })
+
+@app.route('/api/rides', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_rides():
+    current_user = get_jwt_identity()
+    user_id = current_user.get('id')
+    role = current_user.get('role')
+    
+    query = SharedRide.query.options(*RIDE_LOADERS)
+    if role == 'driver':
+        query = query.filter_by(driver_id=user_id)
+    elif role != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    return jsonify(ride_serializer.many(query.order_by(SharedRide.pickup_time, SharedRide.id).all()))
+
+@app.route('/api/rides/<int:id>', methods=['GET'])
+@jwt_required()
+@query_budget(4)
+def get_ride(id):
+    current_user = get_jwt_identity()
+    
+    ride = db.session.get(SharedRide, id, options=RIDE_LOADERS)
+    if not ride:
+        return make_response(jsonify({'error': 'Ride not found'}), 404)
+    
+    # Drivers only see the manifests of rides they drive
+    if current_user.get('role') != 'admin' and ride.driver_id != current_user.get('id'):
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    return jsonify(ride_serializer(ride))
+
+@app.route('/api/rides/<int:id>', methods=['DELETE'])
+@jwt_required()
+def delete_ride(id):
+    current_user = get_jwt_identity()
+    
+    # Only admins can break up a shared ride
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    ride = db.session.get(SharedRide, id)
+    if not ride:
+        return make_response(jsonify({'error': 'Ride not found'}), 404)
+    
+    # The trips stay booked, each on its own again
+    trips = db.session.query(Trip.id, Trip.passenger_id, Trip.driver_id).filter(Trip.shared_ride_id == id).all()
+    if trips:
+        db.session.execute(update(Trip), [{'id': trip.id, 'shared_ride_id': None} for trip in trips])
+        record_trip_events([{'trip_id': trip.id, 'passenger_id': trip.passenger_id, 'driver_id': trip.driver_id}
+                            for trip in trips], 'updated')
+    db.session.delete(ride)
+    db.session.commit()
+    
+    return jsonify({'message': 'Ride dissolved successfully'})
+
 # Driver assignment routes
 @app.route('/api/drivers/assign', methods=['POST'])
 @jwt_required()
@@ -480,11 +1135,175 @@ def assign_driver():
     if vehicle not in driver.vehicles:
         driver.vehicles.append(vehicle)
         db.session.commit()
+        response_cache.invalidate('vehicles')
     
     return jsonify({
         'message': 'Driver assigned to vehicle successfully'
     })
 
+@app.route('/api/drivers/<int:id>/free-slots', methods=['GET'])
+@jwt_required()
+def get_driver_free_slots(id):
+    current_user = get_jwt_identity()
+    
+    # Admins, or drivers looking at their own day
+    if current_user.get('role') != 'admin' and current_user.get('id') != id:
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    driver = db.session.get(User, id)
+    if not driver or driver.role != 'driver':
+        return make_response(jsonify({'error': 'Driver not found'}), 404)
+    
+    try:
+        day = date.fromisoformat(request.args['date']) if 'date' in request.args else datetime.utcnow().date()
+    except ValueError:
+        return make_response(jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400)
+    try:
+        min_minutes = int(request.args.get('min_minutes', 0))
+        if min_minutes < 0:
+            raise ValueError(min_minutes)
+    except ValueError:
+        return make_response(jsonify({'error': 'Invalid min_minutes, expected a whole number of minutes'}), 400)
+    
+    booked, free = free_slots(id, day)
+    return jsonify({
+        'driver_id': id,
+        'date': day.isoformat(),
+        'trip_minutes': app.config['DISPATCH_TRIP_MINUTES'],
+        'booked': [{'trip_id': trip_id, 'start': start.isoformat(), 'end': end.isoformat()}
+                   for start, end, trip_id in booked],
+        'free': [{'start': start.isoformat(), 'end': end.isoformat(), 'minutes': int((end - start).total_seconds() // 60)}
+                 for start, end in free if end - start >= timedelta(minutes=min_minutes)],
+    })
+
+# Driver location routes
+def _requested_point(values):
+    # A place name from the gazetteer, or latitude and longitude
+    if values.get('location'):
+        point = locate(values['location'])
+        return (point, None) if point else (None, 'Unknown location')
+    try:
+        latitude, longitude = float(values['latitude']), float(values['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None, 'Expected latitude and longitude, or a location'
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, 'Coordinates out of range'
+    return (latitude, longitude), None
+
+@app.route('/api/drivers/location', methods=['PUT'])
+@jwt_required()
+def report_driver_location():
+    current_user = get_jwt_identity()
+    
+    # Drivers report their own position
+    if current_user.get('role') != 'driver':
+        return make_response(jsonify({'error': 'Only drivers can report a location'}), 403)
+    
+    data = request.get_json(silent=True) or {}
+    point, error = _requested_point(data)
+    if error:
+        return make_response(jsonify({'error': error}), 400)
+    available = data.get('available', True)
+    if not isinstance(available, bool):
+        return make_response(jsonify({'error': 'Invalid available, expected true or false'}), 400)
+    
+    location = geo.report(current_user.get('id'), point[0], point[1], available)
+    db.session.commit()
+    
+    return jsonify(dict(location, reported_at=location['reported_at'].isoformat()))
+
+@app.route('/api/drivers/nearest', methods=['GET'])
+@jwt_required()
+def get_nearest_drivers():
+    current_user = get_jwt_identity()
+    
+    # Only admins can look up drivers near a point
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    if 'trip_id' in request.args:
+        trip = db.session.get(Trip, request.args.get('trip_id', type=int) or 0)
+        if not trip:
+            return make_response(jsonify({'error': 'Trip not found'}), 404)
+        if trip.pickup_lat is None:
+            return make_response(jsonify({'error': 'Trip pickup location has no coordinates'}), 400)
+        point = (trip.pickup_lat, trip.pickup_lng)
+    else:
+        point, error = _requested_point(request.args)
+        if error:
+            return make_response(jsonify({'error': error}), 400)
+    
+    limit = request.args.get('limit', 5, type=int)
+    limit = max(1, min(limit, app.config['NEAREST_DRIVERS_MAX']))
+    radius_km = request.args.get('radius_km', app.config['NEAREST_DRIVERS_RADIUS_KM'], type=float)
+    
+    matches = geo.nearest_drivers(point[0], point[1], limit, radius_km)
+    names = dict(db.session.query(User.id, User.first_name + ' ' + User.last_name).filter(
+        User.id.in_([driver_id for _, driver_id, _ in matches])
+    ))
+    
+    return jsonify({
+        'latitude': point[0],
+        'longitude': point[1],
+        'drivers': [{
+            'driver_id': driver_id,
+            'name': names.get(driver_id),
+            'distance_km': round(distance, 3),
+            'reported_at': reported_at.isoformat(),
+        } for distance, driver_id, (_, reported_at) in matches]
+    })
+
+# Cache routes
+@app.route('/api/cache/stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    current_user = get_jwt_identity()
+    
+    # Only admins can see cache statistics
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    return jsonify(response_cache.stats())
+
+# Stats routes
+@app.route('/api/stats', methods=['GET'])
+@jwt_required()
+@query_budget(7)
+def get_stats():
+    current_user = get_jwt_identity()
+    
+    # Only admins can see fleet-wide statistics
+    if current_user.get('role') != 'admin':
+        return make_response(jsonify({'error': 'Unauthorized'}), 403)
+    
+    # Inclusive range of pickup days, the last STATS_DEFAULT_DAYS by default
+    try:
+        end = date.fromisoformat(request.args['to']) if 'to' in request.args else datetime.utcnow().date()
+        start = (date.fromisoformat(request.args['from']) if 'from' in request.args
+                 else end - timedelta(days=app.config['STATS_DEFAULT_DAYS'] - 1))
+    except ValueError:
+        return make_response(jsonify({'error': 'Invalid date, expected YYYY-MM-DD'}), 400)
+    if start > end:
+        return make_response(jsonify({'error': 'from must not be after to'}), 400)
+    
+    source = request.args.get('source', 'counters' if stats.enabled() else 'trips')
+    if source not in ['counters', 'trips']:
+        return make_response(jsonify({'error': 'Invalid source, expected counters or trips'}), 400)
+    if source == 'counters' and not stats.enabled():
+        return make_response(jsonify({'error': 'Stats counters are disabled'}), 400)
+    
+    return jsonify(stats.summarize(start, end, source))
+
+# Metrics routes
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Scraped by Prometheus without a user; METRICS_TOKEN can require a bearer token
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return make_response(jsonify({'error': 'Unauthorized'}), 401)
+
+    return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -494,6 +1313,12 @@ def not_found(error):
 def bad_request(error):
     return make_response(jsonify({'error': 'Bad request'}), 400)
 
+@app.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    response = make_response(jsonify({'error': 'Server busy, please retry'}), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
 @app.errorhandler(500)
 def internal_error(error):
     return make_response(jsonify({'error': 'Internal server error'}), 500)
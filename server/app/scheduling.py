@@ -0,0 +1,154 @@
+import heapq
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db, stats
+from app.models import Trip, TripSchedule
+from app.recurrence import RecurrenceRule
+from app.gazetteer import trip_coordinates
+
+
+def occurrences(schedule, after, until):
+    """Yield pickup datetimes of `schedule` in the half-open window (after, until]."""
+    rule = RecurrenceRule.parse(schedule.recurrence)
+    last_date = until.date()
+    if schedule.end_date:
+        last_date = min(last_date, schedule.end_date)
+
+    for day in rule.dates(schedule.start_date, after.date(), last_date):
+        pickup_time = datetime.combine(day, schedule.pickup_clock)
+        if after < pickup_time <= until:
+            yield pickup_time
+
+
+def _window_start(schedule, now):
+    # Never backfill occurrences that are already in the past
+    if schedule.materialized_until and schedule.materialized_until > now:
+        return schedule.materialized_until
+    return now
+
+
+def materialize(schedules, now, horizon_end):
+    """Write concrete trips for every occurrence up to `horizon_end`.
+
+    Each schedule's materialized_until watermark moves forward so a rerun
+    only looks at the new slice of the horizon. Occurrences that already
+    exist (a crashed or concurrent run) are skipped: read up front, and on
+    SQLite and PostgreSQL with ON CONFLICT DO NOTHING on the unique
+    (schedule_id, pickup_time) constraint for a run that races this one.
+    Returns the number of trips written; the caller commits.
+    """
+    pending = []
+    for schedule in schedules:
+        after = _window_start(schedule, now)
+        for pickup_time in occurrences(schedule, after, horizon_end):
+            pending.append((schedule, pickup_time))
+
+    if pending:
+        existing = set(
+            db.session.query(Trip.schedule_id, Trip.pickup_time).filter(
+                Trip.schedule_id.in_({schedule.id for schedule, _ in pending}),
+                Trip.pickup_time > now,
+                Trip.pickup_time <= horizon_end
+            )
+        )
+        created_at = datetime.utcnow()
+        values = [{
+            'pickup_location': schedule.pickup_location,
+            'dropoff_location': schedule.dropoff_location,
+            'pickup_time': pickup_time,
+            'status': 'pending',
+            'passenger_id': schedule.passenger_id,
+            'company_id': schedule.company_id,
+            'schedule_id': schedule.id,
+            'notes': schedule.notes or '',
+            'created_at': created_at,
+            **trip_coordinates(schedule.pickup_location, schedule.dropoff_location),
+        } for schedule, pickup_time in pending if (schedule.id, pickup_time) not in existing]
+        created = _insert_new(values) if values else 0
+    else:
+        created = 0
+
+    for schedule in schedules:
+        if not schedule.materialized_until or schedule.materialized_until < horizon_end:
+            schedule.materialized_until = horizon_end
+
+    return created
+
+
+def _insert_new(values):
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        db.session.execute(insert(Trip), values)
+        return len(values)
+    insert_ = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+    statement = insert_(Trip).on_conflict_do_nothing(index_elements=[Trip.schedule_id, Trip.pickup_time])
+    # Only the rows the database returns were written, so count those
+    created = db.session.execute(
+        statement.returning(*(getattr(Trip, key) for key in stats.COUNTED)).execution_options(stats_counted=True),
+        values
+    ).mappings().all()
+    stats.apply(added=created)
+    return len(created)
+
+
+def materialize_due(now=None, horizon_days=14, batch_size=500):
+    """Materialize every active schedule whose watermark is behind the horizon."""
+    now = now or datetime.utcnow()
+    horizon_end = now + timedelta(days=horizon_days)
+    created = 0
+
+    while True:
+        schedules = TripSchedule.query.filter(
+            TripSchedule.active.is_(True),
+            or_(TripSchedule.materialized_until.is_(None), TripSchedule.materialized_until < horizon_end)
+        ).order_by(TripSchedule.id).limit(batch_size).all()
+        if not schedules:
+            break
+        created += materialize(schedules, now, horizon_end)
+        db.session.commit()
+
+    return created
+
+
+def project(schedules, start, end, after=None):
+    """Yield (pickup_time, schedule) for upcoming occurrences in [start, end]
+    that have not been written as trips yet, in (pickup_time, schedule id) order.
+
+    Each schedule's occurrences are generated lazily and merged, so reading
+    one page costs about a page of work per schedule rather than the whole
+    window. `after` is a (pickup_time, schedule_id) key to resume past.
+    """
+    streams = []
+    for schedule in schedules:
+        since = max(start - timedelta(microseconds=1), schedule.materialized_until or start)
+        if after:
+            since = max(since, after[0] - timedelta(microseconds=1))
+        streams.append(_keyed(schedule, occurrences(schedule, since, end)))
+
+    for pickup_time, schedule_id, schedule in heapq.merge(*streams, key=lambda occurrence: occurrence[:2]):
+        if after and (pickup_time, schedule_id) <= after:
+            continue
+        yield pickup_time, schedule
+
+
+def _keyed(schedule, pickup_times):
+    for pickup_time in pickup_times:
+        yield pickup_time, schedule.id, schedule
+
+
+def projected_trip(pickup_time, schedule):
+    """An occurrence shaped like a serialized trip, with no id and status 'scheduled'."""
+    return {
+        'id': None,
+        'schedule_id': schedule.id,
+        'pickup_location': schedule.pickup_location,
+        'dropoff_location': schedule.dropoff_location,
+        'pickup_time': pickup_time.strftime(Trip.datetime_format),
+        'status': 'scheduled',
+        'passenger_id': schedule.passenger_id,
+        'company_id': schedule.company_id,
+        'notes': schedule.notes or '',
+    }
@@ -0,0 +1,139 @@
+import threading
+from datetime import date, datetime, time
+
+from sqlalchemy import inspect as sql_inspect
+from sqlalchemy.orm import ColumnProperty, RelationshipProperty
+from sqlalchemy_serializer import SerializerMixin
+from sqlalchemy_serializer.lib.schema import Schema, Tree
+from sqlalchemy_serializer.lib.serializable.datetime import format_dt
+from sqlalchemy_serializer.serializer import Serializer
+
+from app.models import User, Company, Vehicle, Trip, TripSchedule, SharedRide
+from app.timing import timed
+
+
+class CompiledSerializer:
+    """Drop-in replacement for SerializerMixin.to_dict() on hot endpoints.
+
+    `to_dict()` rebuilds its rule tree and walks the mapper for every row.
+    Here the same rules are resolved once per model and per nesting path
+    into a flat list of field plans, so serializing a row is a loop over
+    precomputed (key, converter) pairs. Nested plans are compiled the
+    first time a row actually reaches them, because the rule trees of
+    self-referencing models are unbounded and only the data ends them.
+    """
+
+    def __init__(self, model, tree=None):
+        self.model = model
+        self._tree = tree if tree is not None else Tree()
+        self._fields = None
+        self._lock = threading.Lock()
+
+    def __call__(self, obj):
+        with timed('serialize'):
+            return self.serialize(obj)
+
+    def many(self, objs):
+        with timed('serialize'):
+            return [self.serialize(obj) for obj in objs]
+
+    def serialize(self, obj):
+        fields = self._fields if self._fields is not None else self._compile()
+        state = obj.__dict__
+        res = {}
+        for key, convert in fields:
+            # Loaded attributes are read straight from the instance dict;
+            # anything else goes through the descriptor so lazy loads still happen
+            value = state[key] if key in state else getattr(obj, key)
+            res[key] = convert(value) if convert is not None else value
+        return res
+
+    def _compile(self):
+        with self._lock:
+            if self._fields is not None:
+                return self._fields
+
+            model = self.model
+            schema = Schema(self._tree)
+            schema.update(only=model.serialize_only, extend=model.serialize_rules)
+
+            attrs = {a.key: a for a in sql_inspect(model).attrs}
+            keys = schema.keys
+            if schema.is_greedy:
+                keys.update(attrs)
+
+            fields = []
+            for key in sorted(keys):
+                if not schema.is_included(key):
+                    continue
+                attr = attrs.get(key)
+                if isinstance(attr, RelationshipProperty):
+                    nested = CompiledSerializer(attr.mapper.class_, schema.fork(key)._tree)
+                    convert = _many(nested) if attr.uselist else _optional(nested)
+                elif isinstance(attr, ColumnProperty):
+                    convert = _column_converter(model, attr, schema, key)
+                else:
+                    convert = _fallback(model, schema, key)
+                fields.append((key, convert))
+
+            self._fields = fields
+            return fields
+
+
+def _many(nested):
+    def convert(values):
+        return [nested.serialize(value) for value in values]
+    return convert
+
+
+def _optional(nested):
+    def convert(value):
+        return nested.serialize(value) if value is not None else None
+    return convert
+
+
+def _column_converter(model, attr, schema, key):
+    try:
+        python_type = attr.columns[0].type.python_type
+    except NotImplementedError:
+        python_type = None
+
+    if python_type in (int, str, float, bool):
+        return None
+
+    # Datetimes only bypass the library when no timezone conversion is configured
+    fmt = {
+        datetime: model.datetime_format,
+        date: model.date_format,
+        time: model.time_format,
+    }.get(python_type)
+    if fmt is not None and (python_type is not datetime or model.get_tzinfo is SerializerMixin.get_tzinfo):
+        def convert(value):
+            return format_dt(dt=value, tpl=fmt) if value is not None else None
+        return convert
+
+    return _fallback(model, schema, key)
+
+
+def _fallback(model, schema, key):
+    # Anything we don't special-case is handed to the library's own serializer
+    def convert(value):
+        serializer = Serializer(
+            date_format=model.date_format,
+            datetime_format=model.datetime_format,
+            time_format=model.time_format,
+            decimal_format=model.decimal_format,
+            tzinfo=model.get_tzinfo(model),
+            serialize_types=model.serialize_types
+        )
+        serializer.schema = schema
+        return serializer.fork(key=key, value=value)
+    return convert
+
+
+user_serializer = CompiledSerializer(User)
+company_serializer = CompiledSerializer(Company)
+vehicle_serializer = CompiledSerializer(Vehicle)
+trip_serializer = CompiledSerializer(Trip)
+schedule_serializer = CompiledSerializer(TripSchedule)
+ride_serializer = CompiledSerializer(SharedRide)
@@ -0,0 +1,293 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import and_, case, delete, distinct, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import app, db
+from app.models import User, Company, Vehicle, Trip, TripStat
+
+# Dashboard figures, all computed with GROUP BY in the database. Trip
+# counts, daily volumes and completion times come either straight from
+# the trips table or, with STATS_COUNTERS on, from trip_stats: one row of
+# running totals per company, pickup day and status, kept in the same
+# transaction as every trip write.
+#
+# ORM writes are counted at flush from the attribute history. Bulk
+# statements are counted from their parameter rows: inserts add each row,
+# updates by primary key swap each trip's current values for the new ones.
+# Statements that name their rows with a WHERE clause, or may skip rows
+# (ON CONFLICT DO NOTHING), count themselves with counted() and apply();
+# any other bulk trip statement raises rather than drifting silently.
+
+STATUSES = ['pending', 'in_progress', 'completed', 'cancelled']
+# Trip columns the counters depend on
+COUNTED = ['company_id', 'pickup_time', 'status', 'completed_at']
+MEASURES = ['trips', 'completed_trips', 'completion_seconds']
+
+_enabled = False
+
+
+def seconds_between(start, end):
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract('epoch', end - start)
+
+
+def _trip_columns():
+    completed = and_(Trip.status == 'completed', Trip.completed_at.isnot(None))
+    return {
+        'company_id': Trip.company_id,
+        'day': func.date(Trip.pickup_time),
+        'status': Trip.status,
+        'trips': func.count(),
+        'completed_trips': func.sum(case((completed, 1), else_=0)),
+        'completion_seconds': func.sum(case((completed, seconds_between(Trip.pickup_time, Trip.completed_at)),
+                                            else_=0)),
+    }
+
+
+def _counter_columns():
+    return {
+        'company_id': TripStat.company_id,
+        'day': TripStat.day,
+        'status': TripStat.status,
+        'trips': func.sum(TripStat.trips),
+        'completed_trips': func.sum(TripStat.completed_trips),
+        'completion_seconds': func.sum(TripStat.completion_seconds),
+    }
+
+
+def _window(start, end):
+    # Trips whose pickup falls on a day from `start` to `end`, inclusive
+    return [Trip.pickup_time >= datetime.combine(start, time.min),
+            Trip.pickup_time < datetime.combine(end + timedelta(days=1), time.min)]
+
+
+def _grouped(columns, where, *keys):
+    query = select(*(columns[name].label(name) for name in list(keys) + MEASURES)).where(*where)
+    return db.session.execute(query.group_by(*(columns[key] for key in keys))).all()
+
+
+def _breakdown(rows, key):
+    result = {}
+    for row in rows:
+        if not row.trips or row.status is None:
+            continue
+        entry = result.setdefault(key(row), dict.fromkeys(['total'] + STATUSES, 0))
+        entry[row.status] = entry.get(row.status, 0) + row.trips
+        entry['total'] += row.trips
+    return result
+
+
+def _usage(where, drivers, vehicles, days):
+    # Drivers and vehicles in one pass over the window
+    completed = and_(Trip.status == 'completed', Trip.completed_at.isnot(None))
+    busy = seconds_between(Trip.pickup_time, Trip.completed_at)
+    columns = []
+    for column in (Trip.driver_id, Trip.vehicle_id):
+        columns += [func.count(distinct(column)), func.count(column),
+                    func.sum(case((and_(completed, column.isnot(None)), busy), else_=0))]
+    row = db.session.execute(select(*columns).where(*where)).one()
+
+    usage = []
+    for total, (active, trips, seconds) in [(drivers, row[:3]), (vehicles, row[3:])]:
+        seconds = seconds or 0
+        usage.append({
+            'total': total,
+            'active': active,
+            'trips': trips,
+            'busy_hours': round(seconds / 3600, 1),
+            # Share of the window spent on completed trips
+            'utilization': round(seconds / (total * days * 86400), 4) if total else 0,
+        })
+    return usage
+
+
+def summarize(start, end, source='trips'):
+    """Trip counts, daily volumes, completion time and fleet utilization for a range of pickup days."""
+    if source == 'counters':
+        columns, where = _counter_columns(), [TripStat.day >= start, TripStat.day <= end]
+    else:
+        columns, where = _trip_columns(), _window(start, end)
+
+    by_status = _grouped(columns, where, 'status')
+    by_company = _breakdown(_grouped(columns, where, 'company_id', 'status'), lambda row: row.company_id)
+    by_day = _breakdown(_grouped(columns, where, 'day', 'status'), lambda row: str(row.day))
+
+    names = dict(db.session.execute(select(Company.id, Company.name).where(Company.id.in_(by_company))).all())
+    completed = sum(row.completed_trips or 0 for row in by_status)
+    completion_seconds = sum(row.completion_seconds or 0 for row in by_status)
+
+    drivers = db.session.scalar(select(func.count()).select_from(User).where(User.role == 'driver'))
+    vehicles = {status or 'unknown': count for status, count in
+                db.session.execute(select(Vehicle.status, func.count()).group_by(Vehicle.status))}
+    driver_usage, vehicle_usage = _usage(_window(start, end), drivers, sum(vehicles.values()), (end - start).days + 1)
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'source': source,
+        'trips': _breakdown(by_status, lambda row: 'all').get('all', dict.fromkeys(['total'] + STATUSES, 0)),
+        'by_company': [dict(counts, company_id=company_id, company=names.get(company_id))
+                       for company_id, counts in sorted(by_company.items())],
+        'per_day': [dict(counts, date=day) for day, counts in sorted(by_day.items())],
+        'completion': {
+            'completed': completed,
+            'average_minutes': round(completion_seconds / completed / 60, 1) if completed else None,
+        },
+        'drivers': driver_usage,
+        'vehicles': dict(vehicle_usage, by_status=vehicles),
+    }
+
+
+def rebuild():
+    """Recount every counter from the trips table, in the current transaction."""
+    columns = _trip_columns()
+    table = TripStat.__table__
+    db.session.execute(delete(table))
+    db.session.execute(insert(table).from_select(
+        list(columns),
+        select(*columns.values())
+        .where(Trip.company_id.isnot(None), Trip.pickup_time.isnot(None), Trip.status.isnot(None))
+        .group_by(columns['company_id'], columns['day'], columns['status'])
+    ))
+
+
+def _add(deltas, values, sign):
+    company_id, pickup_time, status, completed_at = values
+    if company_id is None or pickup_time is None or status is None:
+        return
+    entry = deltas.setdefault((company_id, pickup_time.date(), status), [0, 0, 0.0])
+    entry[0] += sign
+    if status == 'completed' and completed_at is not None:
+        entry[1] += sign
+        entry[2] += sign * (completed_at - pickup_time).total_seconds()
+
+
+def _apply(deltas):
+    rows = [dict(zip(['company_id', 'day', 'status'] + MEASURES, key + tuple(measures)))
+            for key, measures in sorted(deltas.items()) if any(measures)]
+    if not rows:
+        return
+    table = TripStat.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert_ = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        for start in range(0, len(rows), 500):
+            statement = insert_(table).values(rows[start:start + 500])
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.company_id, table.c.day, table.c.status],
+                set_={name: table.c[name] + statement.excluded[name] for name in MEASURES}
+            ))
+        return
+
+    for row in rows:
+        key = and_(table.c.company_id == row['company_id'], table.c.day == row['day'],
+                   table.c.status == row['status'])
+        updated = db.session.execute(
+            update(table).where(key).values({name: table.c[name] + row[name] for name in MEASURES})
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(table).values(row))
+
+
+def _values(trip, committed):
+    state = inspect(trip)
+    values = []
+    for key in COUNTED:
+        history = state.attrs[key].history
+        values.append(history.deleted[0] if committed and history.deleted else getattr(trip, key))
+    return tuple(values)
+
+
+def _count_flushed(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Trip):
+            _add(deltas, _values(obj, committed=False), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Trip):
+            _add(deltas, _values(obj, committed=True), -1)
+    for obj in session.dirty:
+        if isinstance(obj, Trip) and any(inspect(obj).attrs[key].history.has_changes() for key in COUNTED):
+            _add(deltas, _values(obj, committed=True), -1)
+            _add(deltas, _values(obj, committed=False), 1)
+    _apply(deltas)
+
+
+def _counted_values(row):
+    # COUNTED values of a trip row dict, with the column default for a missing status
+    return (row.get('company_id'), row.get('pickup_time'),
+            row.get('status', Trip.__table__.c.status.default.arg), row.get('completed_at'))
+
+
+def counted(ids):
+    """COUNTED values of the trips `ids` by id, to pass to apply() around a bulk write."""
+    if not _enabled or not ids:
+        return {}
+    rows = db.session.execute(
+        select(Trip.id, *(Trip.__table__.c[key] for key in COUNTED)).where(Trip.id.in_(ids))
+    ).mappings()
+    return {row['id']: {key: row[key] for key in COUNTED} for row in rows}
+
+
+def apply(removed=(), added=()):
+    """Move trips out of (`removed`) and into (`added`) the counters.
+
+    Both are row dicts holding the COUNTED keys. Bulk statements that the
+    do_orm_execute hook can't count from their parameter rows call this
+    and run with execution_options(stats_counted=True). A no-op while the
+    counters are off.
+    """
+    if not _enabled:
+        return
+    deltas = {}
+    for rows, sign in [(removed, -1), (added, 1)]:
+        for row in rows:
+            _add(deltas, _counted_values(row), sign)
+    _apply(deltas)
+
+
+def _count_bulk(orm_execute_state):
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.bind_mapper.class_ is not Trip:
+        return
+    if orm_execute_state.execution_options.get('stats_counted'):
+        return
+
+    rows = orm_execute_state.parameters or []
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not rows or orm_execute_state.is_delete:
+        # A WHERE clause or .values() names the rows and values: only the caller knows them
+        raise RuntimeError('Bulk trip statements without parameter rows must call stats.apply() '
+                           'and run with execution_options(stats_counted=True)')
+
+    if orm_execute_state.is_insert:
+        apply(added=rows)
+    elif orm_execute_state.is_update:
+        # By primary key, one parameter set per row
+        rows = [row for row in rows if set(COUNTED) & row.keys()]
+        current = counted([row['id'] for row in rows])
+        apply(removed=[current[row['id']] for row in rows if row['id'] in current],
+              added=[dict(current[row['id']], **row) for row in rows if row['id'] in current])
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    """Keep trip_stats up to date from here on; run rebuild() once to backfill it."""
+    global _enabled
+    if _enabled:
+        return
+    event.listen(db.session, 'after_flush', _count_flushed)
+    event.listen(db.session, 'do_orm_execute', _count_bulk)
+    _enabled = True
+
+
+if app.config['STATS_COUNTERS']:
+    enable()
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, inspect, or_
+
+from app import app, db
+from app.models import Trip, TripTombstone
+from app.loaders import TRIP_LOADERS
+from app.pagination import encode_cursor, decode_cursor
+
+# Delta sync for trip lists. A client keeps the token from its last
+# response and asks for what happened after it: trips whose updated_at
+# moved past the token, and the ids of trips that left its view, from
+# tombstones. Tokens are (updated_at, id) keys, so each poll is an index
+# range scan over the changes alone.
+#
+# updated_at is stamped when a write flushes but only becomes visible when
+# it commits, so a slow transaction can land behind a token already handed
+# out. The last token of a poll therefore never moves past now minus
+# SYNC_SETTLE_SECONDS: newer rows come again in the next response, and
+# clients apply changes idempotently.
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def _settled():
+    return datetime.utcnow() - timedelta(seconds=app.config['SYNC_SETTLE_SECONDS'])
+
+
+def initial_token():
+    """Token for a client that is loading the full list now."""
+    return encode_cursor(_settled(), 0)
+
+
+def _scoped(query, model, user_id, role):
+    if role == 'driver':
+        return query.filter(model.driver_id == user_id)
+    if role != 'admin':  # employee
+        return query.filter(model.passenger_id == user_id)
+    return query
+
+
+def changes(since, user_id, role, limit):
+    """Trips changed and trip ids removed after `since`, in the caller's view.
+
+    Returns (trips, deleted_ids, next_token, has_more). Raises
+    InvalidCursor for a malformed token and SyncTokenExpired once it is
+    older than the tombstones kept.
+    """
+    last_time, last_id = decode_cursor(since)
+    if last_time < datetime.utcnow() - timedelta(days=app.config['SYNC_TOMBSTONE_RETENTION_DAYS']):
+        raise SyncTokenExpired('Sync token expired')
+    settled = _settled()
+
+    # The leading >= bounds the index range; the plain OR of the keyset
+    # comparison scans the whole index once the token is a bound parameter
+    query = _scoped(Trip.query.options(*TRIP_LOADERS), Trip, user_id, role).filter(
+        Trip.updated_at >= last_time,
+        or_(Trip.updated_at > last_time, Trip.id > last_id)
+    )
+    trips = query.order_by(Trip.updated_at, Trip.id).limit(limit + 1).all()
+
+    removed = _scoped(TripTombstone.query, TripTombstone, user_id, role).filter(TripTombstone.removed_at > last_time)
+    if role != 'driver':
+        # Only drivers lose trips to reassignment
+        removed = removed.filter(TripTombstone.reason == 'deleted')
+
+    has_more = len(trips) > limit
+    if has_more:
+        # Page through the backlog exactly; tombstones up to the same point
+        trips = trips[:limit]
+        next_token = encode_cursor(trips[-1].updated_at, trips[-1].id)
+        removed = removed.filter(TripTombstone.removed_at <= trips[-1].updated_at)
+    elif settled > last_time:
+        next_token = encode_cursor(settled, 0)
+    else:
+        next_token = since
+
+    changed = {trip.id for trip in trips}
+    deleted = sorted({tombstone.trip_id for tombstone in removed} - changed)
+    return trips, deleted, next_token, has_more
+
+
+def prune(older_than):
+    """Delete tombstones recorded before `older_than`; returns how many went."""
+    deleted = TripTombstone.query.filter(TripTombstone.removed_at < older_than).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_tombstones(session, flush_context):
+    # One executemany per flush for deleted trips and drivers' lost trips
+    removed_at = datetime.utcnow()
+    rows = []
+    for trip in session.deleted:
+        if isinstance(trip, Trip):
+            rows.append({'trip_id': trip.id, 'reason': 'deleted', 'passenger_id': trip.passenger_id,
+                         'driver_id': trip.driver_id, 'removed_at': removed_at})
+    for trip in session.dirty:
+        if isinstance(trip, Trip):
+            history = inspect(trip).attrs.driver_id.history
+            previous = history.deleted[0] if history.deleted else None
+            if previous is not None and previous != trip.driver_id:
+                rows.append({'trip_id': trip.id, 'reason': 'reassigned', 'passenger_id': None,
+                             'driver_id': previous, 'removed_at': removed_at})
+    if rows:
+        session.execute(insert(TripTombstone), rows)
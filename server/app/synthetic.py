@@ -0,0 +1,270 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import bcrypt
+from sqlalchemy import func, insert, select
+
+from app.models import User, Company, Vehicle, Trip, user_company, driver_vehicle
+from app.gazetteer import locate
+
+# Same pools as seed.py
+FIRST_NAMES = [
+    "Wangari", "Njeri", "Muthoni", "Wambui", "Akinyi",
+    "Otieno", "Kipchoge", "Mutua", "Kamau", "Ochieng",
+    "Wanjiru", "Mwangi", "Nyambura", "Kimani", "Auma"
+]
+LAST_NAMES = [
+    "Kariuki", "Odhiambo", "Wekesa", "Njoroge", "Omondi",
+    "Maina", "Wafula", "Onyango", "Kamau", "Githinji",
+    "Mwangi", "Ndungu", "Kimani", "Korir", "Kinyua"
+]
+NAIROBI_LOCATIONS = [
+    "Westlands, Nairobi", "Kilimani, Nairobi", "Karen, Nairobi",
+    "Lavington, Nairobi", "Upperhill, Nairobi", "CBD, Nairobi",
+    "Parklands, Nairobi", "South B, Nairobi", "South C, Nairobi",
+    "Eastleigh, Nairobi", "Gigiri, Nairobi", "Kileleshwa, Nairobi"
+]
+OTHER_CITIES = [
+    "Mombasa CBD", "Nyali, Mombasa", "Diani, Kwale",
+    "Kisumu CBD", "Milimani, Kisumu", "Nakuru CBD",
+    "Eldoret CBD", "Thika Town", "Machakos Town",
+    "Kitengela", "Athi River", "Ongata Rongai"
+]
+VEHICLE_MODELS = [
+    ("Toyota Prado", "sedan", 4), ("Nissan X-Trail", "sedan", 4), ("Toyota Corolla", "sedan", 4),
+    ("Toyota Hiace", "van", 7), ("Nissan Urvan", "van", 8),
+    ("Isuzu NQR", "bus", 15), ("Toyota Coaster", "bus", 12),
+]
+PASSWORD = 'password123'
+BCRYPT_ALPHABET = './ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+
+
+class Layout:
+    """Id ranges of every kind of row a generation run inserts.
+
+    Each company gets one admin; a twelfth of the users drive, two drivers
+    per vehicle, and the rest are employees spread over the companies.
+    Ids continue after `offsets` (the highest ids already in each table),
+    so appending never collides with existing rows.
+    """
+
+    def __init__(self, companies, users, trips, offsets=None):
+        offsets = offsets or {}
+        self.drivers = max(users // 12, 1)
+        self.admins = companies
+        self.employees = max(users - self.drivers - self.admins, 1)
+        self.vehicles = max(self.drivers // 2, 1)
+
+        self.company_ids = _ids(offsets.get('companies', 0), companies)
+        self.employee_ids = _ids(offsets.get('users', 0), self.employees)
+        self.driver_ids = _ids(self.employee_ids.stop - 1, self.drivers)
+        self.admin_ids = _ids(self.driver_ids.stop - 1, self.admins)
+        self.vehicle_ids = _ids(offsets.get('vehicles', 0), self.vehicles)
+        self.trip_ids = _ids(offsets.get('trips', 0), trips)
+
+    def company_of(self, user_id):
+        if user_id in self.admin_ids:
+            return self.company_ids[user_id - self.admin_ids.start]
+        return self.company_ids[(user_id - self.employee_ids.start) % len(self.company_ids)]
+
+    def role_of(self, user_id):
+        if user_id in self.employee_ids:
+            return 'employee'
+        return 'driver' if user_id in self.driver_ids else 'admin'
+
+    def email(self, user_id):
+        role = self.role_of(user_id)
+        domain = 'cabrix' if role == 'driver' else f'company{self.company_of(user_id)}'
+        return f'{role}{user_id}@{domain}.co.ke'
+
+
+def _ids(after, count):
+    return range(after + 1, after + count + 1)
+
+
+def offsets(conn):
+    """Highest id in each table a run inserts into."""
+    return {name: conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+            for name, model in [('companies', Company), ('users', User), ('vehicles', Vehicle), ('trips', Trip)]}
+
+
+def password_hash(rng, rounds):
+    # bcrypt salts come from os.urandom; draw one from the seed instead so
+    # the same inputs give byte-identical rows. Computed once per run.
+    salt = ''.join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + rng.choice('.Oeu')
+    return bcrypt.hashpw(PASSWORD.encode(), f'$2b${rounds:02d}${salt}'.encode()).decode()
+
+
+class _Writer:
+    """Chunked executemany of row tuples in `columns` order.
+
+    On SQLite the rows go straight to the driver: SQLAlchemy's per-row
+    parameter processing costs more than SQLite's insert itself. Values
+    must then already be in bind form, which value() gives for the few
+    distinct datetimes a run uses. Other databases go through insert(),
+    whose insertmanyvalues batching they need.
+    """
+
+    def __init__(self, conn, chunk_size):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.raw = conn.dialect.name == 'sqlite'
+
+    def processor(self, column):
+        processor = column.type.bind_processor(self.conn.dialect) if self.raw else None
+        return processor or (lambda value: value)
+
+    def value(self, column, value):
+        return self.processor(column)(value)
+
+    def insert(self, table, columns, rows):
+        if self.raw:
+            compiled = insert(table).compile(dialect=self.conn.dialect, column_keys=columns)
+            order = [columns.index(key) for key in compiled.positiontup]
+            if order != list(range(len(columns))):
+                rows = (tuple(row[i] for i in order) for row in rows)
+            statement = str(compiled)
+            execute = lambda batch: self.conn.exec_driver_sql(statement, batch)
+        else:
+            execute = lambda batch: self.conn.execute(insert(table), [dict(zip(columns, row)) for row in batch])
+
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.chunk_size:
+                execute(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            execute(batch)
+            count += len(batch)
+        return count
+
+
+def generate(conn, layout, seed=42, start=datetime(2025, 1, 1), days=365, rounds=12, chunk_size=10000,
+             rebuild_indexes=True):
+    """Insert the rows described by `layout` on `conn` in chunked executemany.
+
+    Every value is drawn from random.Random(seed) in a fixed order, so the
+    same layout and seed always produce the same rows. Trips are spread
+    over `days` centred on `start`: earlier ones are completed or
+    cancelled, those in the hour after `start` in progress and the rest
+    pending. With `rebuild_indexes` the trip indexes are dropped for the
+    load and built again afterwards, which is much faster than updating
+    them row by row. The caller owns the transaction. Returns rows
+    inserted per table.
+    """
+    rng = random.Random(seed)
+    writer = _Writer(conn, chunk_size)
+    pw_hash = password_hash(rng, rounds)
+    joined = writer.value(User.__table__.c.created_at, start - timedelta(days=30))
+
+    companies = writer.insert(Company.__table__, COMPANY_COLUMNS, ((
+        company_id, f'Company {company_id}', f'{company_id} Waiyaki Way, Nairobi',
+        f'info@company{company_id}.co.ke', '+254 722 000000', joined
+    ) for company_id in layout.company_ids))
+
+    def people():
+        choice, randint = rng.choice, rng.randint
+        for user_id in itertools.chain(layout.employee_ids, layout.driver_ids, layout.admin_ids):
+            role = layout.role_of(user_id)
+            yield (user_id, f'{role}{user_id}', layout.email(user_id), pw_hash,
+                   choice(FIRST_NAMES), choice(LAST_NAMES), role,
+                   f'+254 7{randint(10, 99)} {randint(100000, 999999)}', joined)
+
+    users = writer.insert(User.__table__, USER_COLUMNS, people())
+    writer.insert(user_company, ['user_id', 'company_id'], (
+        (user_id, layout.company_of(user_id))
+        for user_id in itertools.chain(layout.employee_ids, layout.admin_ids)
+    ))
+
+    def vehicles():
+        for vehicle_id in layout.vehicle_ids:
+            model, capacity_type, capacity = rng.choice(VEHICLE_MODELS)
+            letters = ''.join(chr(65 + (vehicle_id // 26 ** k) % 26) for k in (2, 1, 0))
+            yield (vehicle_id, f'K{letters} {vehicle_id % 1000:03d}', model, capacity_type, capacity, 'available')
+
+    vehicle_count = writer.insert(Vehicle.__table__, VEHICLE_COLUMNS, vehicles())
+    writer.insert(driver_vehicle, ['user_id', 'vehicle_id'], (
+        (driver_id, layout.vehicle_ids[n % len(layout.vehicle_ids)])
+        for n, driver_id in enumerate(layout.driver_ids)
+    ))
+
+    indexes = sorted(Trip.__table__.indexes, key=lambda index: index.name) if rebuild_indexes else []
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    trips = writer.insert(Trip.__table__, TRIP_COLUMNS, _trips(rng, writer, layout, start, days))
+    for index in indexes:
+        index.create(conn, checkfirst=True)
+    return {'companies': companies, 'users': users, 'vehicles': vehicle_count, 'trips': trips}
+
+
+COMPANY_COLUMNS = ['id', 'name', 'address', 'contact_email', 'contact_phone', 'registration_date']
+USER_COLUMNS = ['id', 'username', 'email', '_password_hash', 'first_name', 'last_name', 'role', 'phone',
+                'created_at']
+VEHICLE_COLUMNS = ['id', 'registration_number', 'model', 'capacity_type', 'capacity', 'status']
+TRIP_COLUMNS = ['id', 'pickup_location', 'dropoff_location', 'pickup_time', 'status', 'created_at',
+                'completed_at', 'passenger_id', 'driver_id', 'company_id', 'vehicle_id', 'updated_at',
+                'pickup_lat', 'pickup_lng', 'dropoff_lat', 'dropoff_lng']
+SLOT_MINUTES = 5
+
+
+def _trips(rng, writer, layout, start, days):
+    columns = Trip.__table__.c
+    slots = days * 24 * 60 // SLOT_MINUTES
+    # Slots before this one are over by `start`; the next hour is under way
+    past = slots // 2
+    under_way = past + 60 // SLOT_MINUTES
+    first = start - timedelta(minutes=past * SLOT_MINUTES)
+    times = [first + timedelta(minutes=slot * SLOT_MINUTES) for slot in range(slots)]
+    # Every datetime a trip can have, converted once rather than per row
+    to_pickup, to_created, to_completed = (writer.processor(columns[key])
+                                           for key in ('pickup_time', 'created_at', 'completed_at'))
+    pickup_times = [to_pickup(t) for t in times]
+    created = [to_created(t - timedelta(days=1)) for t in times]
+    completed = [to_completed(t + timedelta(hours=1)) for t in times]
+
+    # Trips come out in pickup order, with ids rising over time as they
+    # would: every index on pickup_time then grows at its right edge
+    r = rng.random
+    counts = [0] * slots
+    for _ in layout.trip_ids:
+        counts[int(r() * slots)] += 1
+
+    # Hot loop: integer indexes from one random() each, everything in locals
+    employees, drivers, vehicles = layout.employee_ids, layout.driver_ids, layout.vehicle_ids
+    n_employees, n_drivers, n_vehicles = len(employees), len(drivers), len(vehicles)
+    companies, n_companies = layout.company_ids, len(layout.company_ids)
+    # (name, latitude, longitude) of every place, coordinates from the gazetteer
+    places = [(name,) + locate(name) for name in NAIROBI_LOCATIONS + OTHER_CITIES]
+    nairobi, n_nairobi = places[:len(NAIROBI_LOCATIONS)], len(NAIROBI_LOCATIONS)
+    dropoffs, n_dropoffs = places, len(places)
+
+    trip_ids = iter(layout.trip_ids)
+    for slot, count in enumerate(counts):
+        pickup_time, created_at, completed_at = pickup_times[slot], created[slot], completed[slot]
+        for trip_id in itertools.islice(trip_ids, count):
+            passenger = int(r() * n_employees)
+            pickup, pickup_lat, pickup_lng = nairobi[int(r() * n_nairobi)]
+            dropoff, dropoff_lat, dropoff_lng = dropoffs[int(r() * n_dropoffs)]
+            if slot < past:
+                if r() < 0.85:
+                    yield (trip_id, pickup, dropoff, pickup_time, 'completed', created_at, completed_at,
+                           employees[passenger], drivers[int(r() * n_drivers)], companies[passenger % n_companies],
+                           vehicles[int(r() * n_vehicles)], completed_at,
+                           pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+                else:
+                    yield (trip_id, pickup, dropoff, pickup_time, 'cancelled', created_at, None,
+                           employees[passenger], None, companies[passenger % n_companies], None, created_at,
+                           pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+            elif slot < under_way:
+                yield (trip_id, pickup, dropoff, pickup_time, 'in_progress', created_at, None,
+                       employees[passenger], drivers[int(r() * n_drivers)], companies[passenger % n_companies],
+                       vehicles[int(r() * n_vehicles)], created_at,
+                       pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
+            else:
+                yield (trip_id, pickup, dropoff, pickup_time, 'pending', created_at, None,
+                       employees[passenger], None, companies[passenger % n_companies], None, created_at,
+                       pickup_lat, pickup_lng, dropoff_lat, dropoff_lng)
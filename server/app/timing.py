@@ -0,0 +1,149 @@
+import json
+import logging
+import time
+
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db
+
+logger = logging.getLogger('app.timing')
+
+# Server-Timing metric name and the count shown in its description
+SECTIONS = [
+    ('db', 'queries'),
+    ('lazy', 'loads'),
+    ('serialize', 'calls'),
+    ('bcrypt', 'calls'),
+    ('json', 'calls'),
+]
+
+_enabled = False
+
+
+class timed:
+    """Adds the time spent in the block to `name` on the current request.
+
+    Only the outermost block of a name counts, so nested serializers are
+    timed once. A no-op unless the middleware is enabled.
+    """
+
+    __slots__ = ('name', 'timings', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.timings = g.get('timings') if _enabled and has_request_context() else None
+
+    def __enter__(self):
+        timings = self.timings
+        if timings is not None:
+            if self.name in timings.open:
+                self.timings = None
+            else:
+                timings.open.add(self.name)
+                self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        timings = self.timings
+        if timings is not None:
+            timings.add(self.name, time.perf_counter() - self.started)
+            timings.open.discard(self.name)
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys((name for name, _ in SECTIONS), 0.0)
+        self.counts = dict.fromkeys(self.seconds, 0)
+        self.open = set()
+
+    def add(self, name, seconds):
+        self.seconds[name] += seconds
+        self.counts[name] += 1
+
+    def header(self, total):
+        metrics = [f'{name};dur={self.seconds[name] * 1000:.2f};desc="{self.counts[name]} {unit}"'
+                   for name, unit in SECTIONS if self.counts[name]]
+        return ', '.join(metrics + [f'total;dur={total * 1000:.2f}'])
+
+    def record(self, response, total):
+        line = {'method': request.method, 'path': request.path, 'status': response.status_code,
+                'total_ms': round(total * 1000, 2)}
+        for name, unit in SECTIONS:
+            line[f'{name}_ms'] = round(self.seconds[name] * 1000, 2)
+            line[f'{name}_{unit}'] = self.counts[name]
+        return line
+
+
+def _timings():
+    return g.get('timings') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _timings()
+    if timings is not None:
+        context._timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _timings()
+    if timings is None or not hasattr(context, '_timing_started'):
+        return
+    elapsed = time.perf_counter() - context._timing_started
+    timings.add('db', elapsed)
+    if context.execution_options.get('timing_lazy_load'):
+        timings.add('lazy', elapsed)
+
+
+def _mark_lazy_load(orm_execute_state):
+    # Tag lazy loads so the cursor events above can count them apart
+    if orm_execute_state.lazy_loaded_from is not None and _timings() is not None:
+        orm_execute_state.update_execution_options(timing_lazy_load=True)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timed('json'):
+            return super().dumps(obj, **kwargs)
+
+
+def _start():
+    g.timings = Timings()
+
+
+def _finish(response):
+    timings = g.pop('timings', None)
+    if timings is not None:
+        total = time.perf_counter() - timings.started
+        response.headers['Server-Timing'] = timings.header(total)
+        logger.info(json.dumps(timings.record(response, total)))
+    return response
+
+
+def enable():
+    """Install the middleware: SQL events, JSON timing and the request hooks.
+
+    Nothing is registered until this runs, so with SERVER_TIMING off the
+    only cost left is the flag check in `timed`.
+    """
+    global _enabled
+    if _enabled:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(db.session, 'do_orm_execute', _mark_lazy_load)
+    app.json = TimedJSONProvider(app)
+    # Straight into the hook lists: enable() may run after the first request
+    app.before_request_funcs.setdefault(None, []).insert(0, _start)
+    app.after_request_funcs.setdefault(None, []).append(_finish)
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+    _enabled = True
+
+
+if app.config['SERVER_TIMING']:
+    enable()
@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func, insert, or_
+
+from app import db
+from app.models import Trip, TripEvent
+from app.loaders import TRIP_LOADERS
+from app.serializers import trip_serializer
+
+# Wakes the streams in this process as soon as a change commits; streams
+# served by other workers pick it up on their next poll of trip_events
+_changed = threading.Condition()
+# Set when the server shuts down, so open streams end instead of holding it up
+_stopping = threading.Event()
+
+
+def record(trip, action, previous_driver_id=None):
+    """Log a change to `trip` in the caller's transaction."""
+    if trip.id is None:
+        db.session.flush()
+    db.session.add(TripEvent(
+        trip_id=trip.id,
+        action=action,
+        passenger_id=trip.passenger_id,
+        driver_id=trip.driver_id,
+        previous_driver_id=previous_driver_id if previous_driver_id != trip.driver_id else None
+    ))
+    db.session.info['trip_events'] = True
+
+
+def record_many(rows, action):
+    """Log the same change for many trips at once.
+
+    `rows` are dicts with trip_id, passenger_id and driver_id (and
+    optionally previous_driver_id). Written with one executemany INSERT in
+    the caller's transaction.
+    """
+    if not rows:
+        return
+    created_at = datetime.utcnow()
+    # render_nulls keeps rows with and without a previous driver in one batch
+    db.session.execute(insert(TripEvent).execution_options(render_nulls=True), [{
+        'trip_id': row['trip_id'],
+        'action': action,
+        'passenger_id': row.get('passenger_id'),
+        'driver_id': row.get('driver_id'),
+        'previous_driver_id': row.get('previous_driver_id'),
+        'created_at': created_at,
+    } for row in rows])
+    db.session.info['trip_events'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_streams(session):
+    if session.info.pop('trip_events', False):
+        with _changed:
+            _changed.notify_all()
+
+
+def stop_streams():
+    _stopping.set()
+    with _changed:
+        _changed.notify_all()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('trip_events', None)
+
+
+def prune(older_than):
+    """Delete events logged before `older_than`; returns how many went."""
+    deleted = TripEvent.query.filter(TripEvent.created_at < older_than).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def _scoped(query, user_id, role):
+    # Same rows get_trips shows, plus trips that just moved away from a driver
+    if role == 'driver':
+        return query.filter(or_(TripEvent.driver_id == user_id, TripEvent.previous_driver_id == user_id))
+    if role != 'admin':
+        return query.filter(TripEvent.passenger_id == user_id)
+    return query
+
+
+def _visible(trip, user_id, role):
+    if role == 'admin':
+        return True
+    if role == 'driver':
+        return trip.driver_id == user_id
+    return trip.passenger_id == user_id
+
+
+def _message(event_id, name, data):
+    return f'id: {event_id}\nevent: {name}\ndata: {json.dumps(data, sort_keys=True)}\n\n'
+
+
+def fetch(after_id, user_id, role, limit):
+    """Render the user's events newer than `after_id` as SSE messages.
+
+    Created and updated events carry the trip as it is now, serialized like
+    a get_trips row, so clients can upsert it. A trip that is gone or has
+    left the user's view is sent as trip.deleted. Returns (messages, last_id).
+    """
+    events = _scoped(TripEvent.query.filter(TripEvent.id > after_id), user_id, role).order_by(
+        TripEvent.id
+    ).limit(limit).all()
+    if not events:
+        return [], after_id
+
+    live_ids = {e.trip_id for e in events if e.action != 'deleted'}
+    trips = {}
+    if live_ids:
+        trips = {trip.id: trip for trip in Trip.query.options(*TRIP_LOADERS).filter(Trip.id.in_(live_ids))}
+
+    messages = []
+    for e in events:
+        trip = trips.get(e.trip_id)
+        if trip is not None and _visible(trip, user_id, role):
+            messages.append(_message(e.id, f'trip.{e.action}', trip_serializer(trip)))
+        else:
+            messages.append(_message(e.id, 'trip.deleted', {'id': e.trip_id}))
+    return messages, events[-1].id
+
+
+def stream(user_id, role, last_event_id, poll_seconds=2, heartbeat_seconds=15, max_seconds=300, batch_size=500):
+    """Yield SSE messages for trip changes the user may see.
+
+    Without a Last-Event-ID the stream starts at the newest event. If the
+    client's position has already been pruned (or is from another
+    database), a `reset` event tells it to refetch /api/trips. The stream
+    closes after `max_seconds`, or when the server shuts down; clients
+    reconnect with their last id and a fresh stream token, which also
+    re-checks who they are.
+    """
+    started = time.monotonic()
+    yield f'retry: {poll_seconds * 1000}\n\n'
+
+    latest = db.session.query(func.max(TripEvent.id)).scalar() or 0
+    if last_event_id is None:
+        cursor = latest
+    else:
+        cursor = last_event_id
+        oldest = db.session.query(func.min(TripEvent.id)).scalar()
+        if cursor > latest or (oldest is not None and cursor < oldest - 1):
+            yield _message(latest, 'reset', {})
+            cursor = latest
+    db.session.rollback()
+
+    last_write = time.monotonic()
+    while time.monotonic() - started < max_seconds and not _stopping.is_set():
+        messages, cursor = fetch(cursor, user_id, role, batch_size)
+        # End the read transaction so the next poll sees newer commits
+        db.session.rollback()
+        if messages:
+            yield ''.join(messages)
+            last_write = time.monotonic()
+            if len(messages) == batch_size:
+                continue
+        elif time.monotonic() - last_write >= heartbeat_seconds:
+            yield ': keep-alive\n\n'
+            last_write = time.monotonic()
+
+        with _changed:
+            _changed.wait(poll_seconds)
@@ -0,0 +1,255 @@
+import hashlib
+import random
+from functools import wraps
+
+from flask import g, request, make_response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import case, event, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import app, db
+from app.models import User, Company, Vehicle, Trip, TripSchedule, ChangeVersion
+from app.membership import cached_role
+
+# Every write bumps a counter per table it touches, plus per-tenant trip
+# counters, in the same transaction as the write. Conditional GETs hash the
+# counters that cover their payload into an ETag, so an unchanged poll is
+# answered from one indexed SELECT without loading or serializing rows.
+#
+# Tenant counters are exact for ORM writes. Bulk statements whose rows
+# aren't known bump ALL_TENANTS instead, which every tenant ETag includes.
+
+ALL_TENANTS = 'trips:*'
+# Written together with every bump so that recreating the database (seed.py)
+# never repeats the ETags handed out before
+EPOCH = 'epoch'
+
+SCOPES = {
+    User: 'users',
+    Company: 'companies',
+    Vehicle: 'vehicles',
+    Trip: 'trips',
+    TripSchedule: 'schedules',
+}
+
+# Writes to these attributes never show up in a response
+IGNORED_ATTRIBUTES = {'_password_hash'}
+
+
+def passenger_scope(user_id):
+    return f'trips:passenger:{user_id}'
+
+
+def driver_scope(user_id):
+    return f'trips:driver:{user_id}'
+
+
+def company_scope(company_id):
+    return f'trips:company:{company_id}'
+
+
+def bump(scopes):
+    """Increment `scopes` in the current transaction, creating missing counters."""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    table = ChangeVersion.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        for start in range(0, len(scopes), 500):
+            rows = [{'scope': scope, 'version': 1} for scope in scopes[start:start + 500]]
+            rows.append({'scope': EPOCH, 'version': random.getrandbits(31)})
+            statement = insert(table).values(rows)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.scope],
+                set_={'version': case((table.c.scope == EPOCH, table.c.version), else_=table.c.version + 1)}
+            ))
+        return
+
+    db.session.execute(update(table).where(table.c.scope.in_(scopes)).values(version=table.c.version + 1))
+    existing = set(db.session.scalars(select(table.c.scope).where(table.c.scope.in_(scopes + [EPOCH]))))
+    missing = [{'scope': scope, 'version': 1} for scope in scopes if scope not in existing]
+    if EPOCH not in existing:
+        missing.append({'scope': EPOCH, 'version': random.getrandbits(31)})
+    if missing:
+        db.session.execute(table.insert(), missing)
+
+
+def _changed_keys(obj):
+    state = inspect(obj)
+    return {attr.key for attr in state.attrs if attr.history.has_changes()}
+
+
+def _trip_scopes(values, scopes):
+    passenger_id, driver_id, company_id = values
+    if passenger_id is not None:
+        scopes.add(passenger_scope(passenger_id))
+        # A passenger who is also a driver shows up nested in other tenants' trips
+        scopes.add(driver_scope(passenger_id))
+    if driver_id is not None:
+        scopes.add(driver_scope(driver_id))
+        scopes.add(passenger_scope(driver_id))
+    if company_id is not None:
+        scopes.add(company_scope(company_id))
+
+
+def _trip_values(trip, use_history):
+    values = []
+    for key in ('passenger_id', 'driver_id', 'company_id'):
+        if use_history:
+            history = inspect(trip).attrs[key].history
+            old = history.deleted[0] if history.deleted else getattr(trip, key)
+            values.append(old)
+        else:
+            values.append(getattr(trip, key))
+    return tuple(values)
+
+
+def _riders_who_drive(passenger_ids):
+    # Drivers' own rides are nested in every trip they drive, whoever books
+    # it. Roles come from the token or the membership cache, never a query;
+    # a passenger neither knows about counts as a driver
+    return any(cached_role(passenger_id) in ('driver', None) for passenger_id in passenger_ids)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_flushed(session, flush_context):
+    scopes = set()
+    passenger_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        scope = SCOPES.get(type(obj))
+        if scope is None:
+            continue
+        if obj in session.dirty and not (_changed_keys(obj) - IGNORED_ATTRIBUTES):
+            continue
+        scopes.add(scope)
+        if isinstance(obj, Trip):
+            current = _trip_values(obj, use_history=False)
+            _trip_scopes(current, scopes)
+            passenger_ids.add(current[0])
+            if obj in session.dirty:
+                _trip_scopes(_trip_values(obj, use_history=True), scopes)
+
+    if _riders_who_drive(passenger_ids - {None}):
+        scopes.add(ALL_TENANTS)
+    bump(scopes)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _bump_bulk(orm_execute_state):
+    # Core-style INSERT/UPDATE/DELETE through the session skip the flush
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    scope = SCOPES.get(model)
+    if scope is None:
+        return
+
+    scopes = {scope}
+    if model is Trip:
+        rows = orm_execute_state.parameters
+        if isinstance(rows, dict):
+            rows = [rows]
+        # Inserts name every tenant column; updates and deletes don't say what they had
+        if orm_execute_state.is_insert and rows and all(
+            'passenger_id' in row and 'company_id' in row for row in rows
+        ):
+            for row in rows:
+                _trip_scopes((row['passenger_id'], row.get('driver_id'), row['company_id']), scopes)
+            if _riders_who_drive({row['passenger_id'] for row in rows}):
+                scopes.add(ALL_TENANTS)
+        else:
+            scopes.add(ALL_TENANTS)
+    bump(scopes)
+
+
+@app.before_request
+def _forget_versions():
+    # g outlives the request when an app context was already pushed (CLI, tests)
+    g.pop('change_versions', None)
+
+
+def read_versions(scopes):
+    """Current counters for `scopes` (and the epoch), read once per request."""
+    scopes = set(scopes) | {EPOCH}
+    cached = g.setdefault('change_versions', {})
+    missing = scopes - cached.keys()
+    if missing:
+        table = ChangeVersion.__table__
+        found = dict(db.session.execute(
+            select(table.c.scope, table.c.version).where(table.c.scope.in_(missing))
+        ).all())
+        cached.update({scope: found.get(scope, 0) for scope in missing})
+    return {scope: cached[scope] for scope in scopes}
+
+
+def digest(prefix, versions):
+    value = hashlib.blake2b(prefix.encode(), digest_size=16)
+    for scope in sorted(versions):
+        value.update(f'|{scope}={versions[scope]}'.encode())
+    return value.hexdigest()
+
+
+def etag(scopes_for):
+    """Answer If-None-Match with a 304 from the change counters alone.
+
+    `scopes_for(user_id, role, **view_args)` lists the counters covering
+    the view's payload. The ETag hashes them with the URL and the caller,
+    and it is only attached to 200 responses. Counters are read before
+    the view runs, so a write that lands in between makes the next poll
+    miss the ETag instead of serving stale data.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            current_user = get_jwt_identity()
+            scopes = scopes_for(current_user.get('id'), current_user.get('role'), **kwargs)
+            value = digest(f'{request.full_path}|{current_user.get("id")}|{current_user.get("role")}',
+                           read_versions(scopes))
+
+            if request.if_none_match.contains(value):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(value)
+            # Let browsers keep the body but always revalidate it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
+
+
+def trip_list_scopes(user_id, role, **kwargs):
+    scopes = ['users', 'companies', 'vehicles']
+    if request.args.get('upcoming', '').lower() in ['1', 'true', 'yes']:
+        scopes.append('schedules')
+    if role == 'admin':
+        return scopes + ['trips']
+    if role == 'driver':
+        return scopes + [driver_scope(user_id), ALL_TENANTS]
+    return scopes + [passenger_scope(user_id), ALL_TENANTS]
+
+
+def trip_scopes(user_id, role, **kwargs):
+    return ['trips', 'users', 'companies', 'vehicles']
+
+
+def user_scopes(user_id, role, **kwargs):
+    return ['users', 'companies', 'vehicles', 'trips']
+
+
+def vehicle_scopes(user_id, role, **kwargs):
+    return ['vehicles', 'users', 'trips']
+
+
+def company_list_scopes(user_id, role, **kwargs):
+    return ['companies', 'users', 'trips']
+
+
+def company_scopes(user_id, role, id=None, **kwargs):
+    return ['companies', 'users', company_scope(id), ALL_TENANTS]
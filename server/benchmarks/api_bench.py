@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""End-to-end latency of the API under a weighted mix of requests.
+
+Generates a dataset of the given scale into a SQLite file (see
+app/synthetic.py), then
+drives logins, trip reads and writes, vehicles and users from concurrent
+clients, either through the Flask test client or against a running
+server (--url). Prints one JSON line per route, plus a total, with
+throughput and p50/p95/p99 latency, tagged with the current commit so
+runs can be compared; --output appends the same lines to a file.
+
+The unpaginated list routes serialize every nested trip. /api/vehicles
+grows with the trip count; /api/users nests each company's trips under
+every member, so it grows with users x trips and one call takes minutes
+at the default scale. It is off in the default mix; turn it on with
+--mix users=1 on small datasets.
+
+Usage (from server/):
+    python -m benchmarks.api_bench --companies 20 --users 2000 --trips 20000
+    python -m benchmarks.api_bench --mix trips_employee=50 create_trip=50 --concurrency 16
+    python -m benchmarks.api_bench --companies 100 --users 200 --trips 2000 --mix users=1
+    python -m benchmarks.api_bench --companies 1000 --users 100000 --trips 5000000 \\
+        --db /tmp/api_bench.db --mix vehicles=0
+
+Against a local server (same JWT_SECRET_KEY), build the database first:
+    python -m benchmarks.api_bench --db /tmp/api_bench.db --requests 0
+    DATABASE_URI=sqlite:////tmp/api_bench.db python run.py &
+    python -m benchmarks.api_bench --db /tmp/api_bench.db --skip-build --url http://127.0.0.1:5555
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+
+from app import app, db, database, synthetic
+from app.synthetic import Layout, NAIROBI_LOCATIONS, PASSWORD
+
+MIX = {
+    'login': 2,
+    'trips_admin': 10,
+    'trips_employee': 25,
+    'trips_driver': 15,
+    'trip_detail': 10,
+    'create_trip': 15,
+    'update_trip': 15,
+    'vehicles': 1,
+    'users': 0,
+}
+
+
+def build(engine, layout, seed=42):
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # One real hash at the configured cost, shared by every user
+        synthetic.generate(conn, layout, seed=seed, rounds=app.config['BCRYPT_LOG_ROUNDS'])
+
+
+class TestClientTarget:
+    def __init__(self, path):
+        settings = dict(app.config, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SQLALCHEMY_ENGINE_OPTIONS=None)
+        database.configure(settings)
+        with app.app_context():
+            # Point the app at the benchmark database instead of cabrix.db
+            db._app_engines[app][None] = create_engine(settings['SQLALCHEMY_DATABASE_URI'],
+                                                       **settings['SQLALCHEMY_ENGINE_OPTIONS'])
+        self._local = threading.local()
+
+    def request(self, method, path, headers, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = app.test_client()
+        response = client.open(path, method=method, headers=headers, json=body)
+        return response.status_code
+
+
+class HTTPTarget:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, headers, body):
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                headers = dict(headers, **{'Content-Type': 'application/json'}) if body is not None else headers
+                conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+                    self._local.conn = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                # Keep-alive connection dropped by the server: reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+
+class Workload:
+    """Turns a route name into a request, with tokens issued up front."""
+
+    def __init__(self, layout, tokens=50, seed=42):
+        self.layout = layout
+        rng = random.Random(seed)
+        with app.app_context():
+            def issue(role, ids):
+                ids = [rng.choice(ids) for _ in range(tokens)]
+                return [(user_id, {'Authorization': f'Bearer {create_access_token(identity={"id": user_id, "role": role})}'})
+                        for user_id in ids]
+            self.tokens = {
+                'admin': issue('admin', layout.admin_ids),
+                'employee': issue('employee', layout.employee_ids),
+                'driver': issue('driver', layout.driver_ids),
+            }
+
+    def build(self, route, rng):
+        """(expected status, method, path, headers, body) for one request of `route`."""
+        admin = rng.choice(self.tokens['admin'])[1]
+        if route == 'login':
+            email = self.layout.email(rng.choice(self.layout.employee_ids))
+            return 200, 'POST', '/api/login', {}, {'email': email, 'password': PASSWORD}
+        if route == 'trips_admin':
+            return 200, 'GET', '/api/trips', admin, None
+        if route == 'trips_employee':
+            return 200, 'GET', '/api/trips', rng.choice(self.tokens['employee'])[1], None
+        if route == 'trips_driver':
+            return 200, 'GET', '/api/trips', rng.choice(self.tokens['driver'])[1], None
+        if route == 'trip_detail':
+            return 200, 'GET', f'/api/trips/{rng.choice(self.layout.trip_ids)}', admin, None
+        if route == 'create_trip':
+            pickup_time = datetime(2026, 1, 1) + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            return 201, 'POST', '/api/trips', rng.choice(self.tokens['employee'])[1], {
+                'pickup_location': rng.choice(NAIROBI_LOCATIONS), 'dropoff_location': rng.choice(NAIROBI_LOCATIONS),
+                'pickup_time': pickup_time.isoformat(),
+            }
+        if route == 'update_trip':
+            return 200, 'PUT', f'/api/trips/{rng.choice(self.layout.trip_ids)}', admin, {
+                'notes': f'Gate {rng.randint(1, 9)}'
+            }
+        if route == 'vehicles':
+            return 200, 'GET', '/api/vehicles', admin, None
+        if route == 'users':
+            return 200, 'GET', '/api/users', admin, None
+        raise ValueError(f'Unknown route: {route}')
+
+
+def percentile(latencies, q):
+    return round(latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000, 2)
+
+
+def run(target, workload, mix, requests, concurrency, seed=42):
+    routes = [route for route, weight in mix.items() if weight > 0]
+    weights = [mix[route] for route in routes]
+    plan = random.Random(seed).choices(routes, weights, k=requests)
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    lock = threading.Lock()
+    position = iter(range(requests))
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            with lock:
+                n = next(position, None)
+            if n is None:
+                return
+            route = plan[n]
+            expected, method, path, headers, body = workload.build(route, rng)
+            started = time.perf_counter()
+            try:
+                ok = target.request(method, path, headers, body) == expected
+            except (http.client.HTTPException, OSError):
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies[route].append(elapsed)
+                else:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+def report(name, latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    row = {'route': name, 'requests': len(latencies) + errors, 'errors': errors,
+           'throughput_rps': round(len(latencies) / elapsed, 1)}
+    if latencies:
+        row.update(p50_ms=percentile(latencies, 0.50), p95_ms=percentile(latencies, 0.95),
+                   p99_ms=percentile(latencies, 0.99))
+    return row
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(values):
+    mix = dict(MIX)
+    for value in values or []:
+        route, _, weight = value.partition('=')
+        if route not in MIX:
+            raise SystemExit(f'Unknown route in --mix: {route} (one of {", ".join(MIX)})')
+        mix[route] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--trips', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite file to build or reuse (default: a temporary file)')
+    parser.add_argument('--skip-build', action='store_true', help='Reuse --db as built with the same scale')
+    parser.add_argument('--url', help='Drive a running server instead of the Flask test client')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', nargs='+', metavar='ROUTE=WEIGHT', help=f'Override weights of: {", ".join(MIX)}')
+    parser.add_argument('--output', help='Also append the JSON lines to this file')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    layout = Layout(args.companies, args.users, args.trips)
+    # The bench reports its own latencies; budgets would turn slow routes into errors
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.db or os.path.join(directory, 'api_bench.db')
+        if not args.skip_build:
+            if os.path.exists(path):
+                os.remove(path)
+            started = time.perf_counter()
+            engine = create_engine(f'sqlite:///{path}')
+            build(engine, layout, args.seed)
+            engine.dispose()
+            print(json.dumps({'built': path, 'companies': args.companies, 'users': args.users,
+                              'trips': args.trips, 'seconds': round(time.perf_counter() - started, 1)}), flush=True)
+        if not args.requests:
+            return
+
+        target = HTTPTarget(args.url) if args.url else TestClientTarget(path)
+        elapsed, latencies, errors = run(target, Workload(layout, seed=args.seed), mix, args.requests,
+                                         args.concurrency, args.seed)
+
+    meta = {'commit': current_commit(), 'target': args.url or 'test_client', 'concurrency': args.concurrency,
+            'trips': args.trips}
+    rows = [report(route, latencies[route], errors[route], elapsed) for route in latencies]
+    rows.append(report('total', [l for values in latencies.values() for l in values], sum(errors.values()), elapsed))
+    lines = [json.dumps(dict(meta, **row)) for row in rows]
+    print('\n'.join(lines))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""One PUT /api/trips/<id> per trip against a single PATCH /api/trips batch.
+
+Generates a dataset with app/synthetic.py, then reassigns batches of
+pending trips to another driver and vehicle (the shift change an admin
+makes) both ways through the Flask test client. Prints one JSON line per
+batch size with the wall time and SQL statements of each approach.
+
+Usage (from server/):
+    python -m benchmarks.batch_update_bench --trips 100000 --batches 10 100 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from app import app
+from app.synthetic import Layout
+from benchmarks.api_bench import TestClientTarget, Workload, build
+
+_statements = [0]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count(conn, cursor, statement, parameters, context, executemany):
+    _statements[0] += 1
+
+
+def measure(send):
+    _statements[0] = 0
+    started = time.perf_counter()
+    send()
+    return round((time.perf_counter() - started) * 1000, 1), _statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--trips', type=int, default=100000)
+    parser.add_argument('--batches', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+    layout = Layout(args.companies, args.users, args.trips)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'batch_update_bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        build(engine, layout, args.seed)
+        engine.dispose()
+
+        TestClientTarget(path)
+        client = app.test_client()
+        admin = Workload(layout, seed=args.seed).tokens['admin'][0][1]
+        rng = random.Random(args.seed)
+        trip_ids = rng.sample(layout.trip_ids, 2 * sum(args.batches))
+
+        for size in args.batches:
+            updates = []
+            for _ in range(2):
+                batch, trip_ids = trip_ids[:size], trip_ids[size:]
+                driver_id = rng.choice(layout.driver_ids)
+                vehicle_id = rng.choice(layout.vehicle_ids)
+                updates.append([{'id': trip_id, 'driver_id': driver_id, 'vehicle_id': vehicle_id,
+                                 'notes': 'Shift change'} for trip_id in batch])
+
+            def put():
+                for row in updates[0]:
+                    response = client.put(f'/api/trips/{row["id"]}', headers=admin, json=row)
+                    if response.status_code != 200:
+                        raise RuntimeError(f'PUT answered {response.status_code}')
+
+            def patch():
+                response = client.patch('/api/trips', headers=admin, json=updates[1])
+                if response.status_code != 200 or not all(r['ok'] for r in response.get_json()['results']):
+                    raise RuntimeError(f'PATCH answered {response.status_code}')
+
+            put_ms, put_statements = measure(put)
+            patch_ms, patch_statements = measure(patch)
+            print(json.dumps({'trips': size, 'put_ms': put_ms, 'put_statements': put_statements,
+                              'patch_ms': patch_ms, 'patch_statements': patch_statements,
+                              'speedup': round(put_ms / patch_ms, 1)}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Double-booking checks on the interval index against a scan of every booking.
+
+Books a driver's trips back to back with random gaps, then times
+Intervals.overlapping for random pickup windows against testing every
+booked window, for each number of bookings. Checks both find the same
+conflicts. Prints one JSON line per booking count.
+
+Usage (from server/):
+    python -m benchmarks.booking_bench --bookings 100 1000 10000 100000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.bookings import Intervals
+
+TRIP = timedelta(minutes=60)
+
+
+def schedule(rng, count):
+    windows = []
+    start = datetime(2027, 1, 1)
+    for trip_id in range(count):
+        start += TRIP + timedelta(minutes=rng.choice([0, 15, 30, 90, 600]))
+        windows.append((start, start + TRIP, trip_id))
+    return windows
+
+
+def linear(windows, start, end):
+    return [window for window in windows if window[0] < end and window[1] > start]
+
+
+def timed(lookup, queries):
+    latencies = []
+    results = []
+    for start in queries:
+        begun = time.perf_counter()
+        results.append(lookup(start, start + TRIP))
+        latencies.append(time.perf_counter() - begun)
+    latencies.sort()
+    return (round(statistics.median(latencies) * 1e6, 2),
+            round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 2), results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for count in args.bookings:
+        rng = random.Random(args.seed)
+        windows = schedule(rng, count)
+        intervals = Intervals()
+        started = time.perf_counter()
+        # In pickup order, as Bookings loads them
+        for window in windows:
+            intervals.add(*window)
+        built = time.perf_counter() - started
+        first, last = windows[0][0], windows[-1][1]
+        queries = [first + (last - first) * rng.random() for _ in range(args.queries)]
+
+        # The scan is slow enough at scale that a sample of queries does
+        scan_p50, scan_p99, expected = timed(
+            lambda start, end: linear(windows, start, end), queries[:max(20, args.queries * 1000 // count)])
+        p50, p99, results = timed(lambda start, end: intervals.overlapping(start, end), queries)
+        matches = all(got == want for got, want in zip(results, expected))
+        print(json.dumps({'bookings': count, 'build_ms': round(built * 1000, 1),
+                          'index_p50_us': p50, 'index_p99_us': p99,
+                          'scan_p50_us': scan_p50, 'scan_p99_us': scan_p99, 'same_results': matches}),
+              flush=True)
+
+
+if __name__ == '__main__':
+    main()
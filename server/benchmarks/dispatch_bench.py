@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Time the dispatcher on a synthetic day and compare it with first-fit.
+
+Usage (from server/):
+    python -m benchmarks.dispatch_bench --trips 10000 --drivers 1000
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.dispatch import BusyCalendar, plan
+
+
+def build(trips, drivers, vehicles, hours, seed=42):
+    rng = random.Random(seed)
+    day = datetime(2025, 3, 3, 6, 0)
+    trip_rows = [
+        (i, day + timedelta(minutes=rng.randint(0, hours * 60 - 1)), 1)
+        for i in range(1, trips + 1)
+    ]
+    capacities = {v: rng.choice([4, 4, 4, 7, 8, 12, 15]) for v in range(1, vehicles + 1)}
+    # Most drivers have a primary vehicle, some share a second one
+    driver_vehicles = {}
+    for d in range(1, drivers + 1):
+        linked = [(d - 1) % vehicles + 1]
+        if rng.random() < 0.3:
+            linked.append(rng.randint(1, vehicles))
+        driver_vehicles[d] = linked
+    return trip_rows, driver_vehicles, capacities
+
+
+def first_fit(trips, driver_vehicles, capacities, trip_minutes):
+    duration = timedelta(minutes=trip_minutes)
+    driver_busy = defaultdict(BusyCalendar)
+    vehicle_busy = defaultdict(BusyCalendar)
+    loads = defaultdict(int)
+    assigned = 0
+    for trip_id, pickup_time, seats in sorted(trips, key=lambda trip: trip[1]):
+        end = pickup_time + duration
+        for driver, vehicles in driver_vehicles.items():
+            if not driver_busy[driver].is_free(pickup_time, end):
+                continue
+            vehicle = next((v for v in vehicles
+                            if capacities[v] >= seats and vehicle_busy[v].is_free(pickup_time, end)), None)
+            if vehicle is None:
+                continue
+            driver_busy[driver].add(pickup_time, end)
+            vehicle_busy[vehicle].add(pickup_time, end)
+            loads[driver] += 1
+            assigned += 1
+            break
+    return assigned, loads
+
+
+def summarize(name, elapsed, assigned, total, loads):
+    busy = [count for count in loads.values() if count]
+    return {
+        'algorithm': name,
+        'seconds': round(elapsed, 2),
+        'assigned': assigned,
+        'unassigned': total - assigned,
+        'drivers_used': len(busy),
+        'max_trips_per_driver': max(busy, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trips', type=int, default=10000)
+    parser.add_argument('--drivers', type=int, default=1000)
+    parser.add_argument('--vehicles', type=int, default=800)
+    parser.add_argument('--hours', type=int, default=14)
+    parser.add_argument('--trip-minutes', type=int, default=60)
+    parser.add_argument('--wave-minutes', type=int, default=5)
+    args = parser.parse_args()
+
+    trips, driver_vehicles, capacities = build(args.trips, args.drivers, args.vehicles, args.hours)
+
+    started = time.perf_counter()
+    driver_busy = defaultdict(BusyCalendar)
+    assignments, unassigned = plan(trips, driver_vehicles, capacities, driver_busy, defaultdict(BusyCalendar),
+                                   trip_minutes=args.trip_minutes, wave_minutes=args.wave_minutes)
+    elapsed = time.perf_counter() - started
+    loads = defaultdict(int)
+    for driver, _ in assignments.values():
+        loads[driver] += 1
+    print(json.dumps(summarize('hungarian', elapsed, len(assignments), len(trips), loads)))
+
+    started = time.perf_counter()
+    assigned, loads = first_fit(trips, driver_vehicles, capacities, args.trip_minutes)
+    print(json.dumps(summarize('first_fit', time.perf_counter() - started, assigned, len(trips), loads)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""ETA lookups: batched NumPy scoring against one call per pair, and matrix load cost.
+
+Scores random origin/destination points around the gazetteer places with
+one Matrix.estimate call per batch, and the same pairs one call at a
+time. Then, for random road graphs of growing size, times solving the
+all-pairs matrix against memory-mapping the saved file, which is what a
+worker does at startup. Prints one JSON line per measurement.
+
+Usage (from server/):
+    python -m benchmarks.eta_bench --pairs 100 10000 100000 --nodes 250 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app import eta
+from app.gazetteer import PLACES
+
+
+def points(rng, count):
+    places = list(PLACES.values())
+    return [(lat + rng.gauss(0, 0.02), lng + rng.gauss(0, 0.02))
+            for lat, lng in (rng.choice(places) for _ in range(count))]
+
+
+def random_graph(rng, nodes):
+    # A ring so everything connects, plus a few random roads per place
+    minutes = np.full((nodes, nodes), np.inf)
+    km = np.full((nodes, nodes), np.inf)
+    np.fill_diagonal(minutes, 0)
+    np.fill_diagonal(km, 0)
+    for a in range(nodes):
+        for b in [(a + 1) % nodes] + [rng.randrange(nodes) for _ in range(3)]:
+            length = rng.uniform(1, 30)
+            minutes[a, b] = minutes[b, a] = length / rng.uniform(20, 80) * 60
+            km[a, b] = km[b, a] = length
+    return minutes, km
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--single', type=int, default=1000, help='Pairs scored one call at a time')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[250, 1000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    matrix = eta.matrix()
+
+    origins, destinations = points(rng, args.single), points(rng, args.single)
+    started = time.perf_counter()
+    for origin, destination in zip(origins, destinations):
+        matrix.estimate([origin], [destination])
+    single = (time.perf_counter() - started) / args.single
+    print(json.dumps({'measure': 'single', 'places': len(matrix.names), 'pairs': args.single,
+                      'us_per_pair': round(single * 1e6, 2)}), flush=True)
+
+    for count in args.pairs:
+        origins, destinations = points(rng, count), points(rng, count)
+        started = time.perf_counter()
+        km, minutes = matrix.estimate(origins, destinations)
+        elapsed = time.perf_counter() - started
+        print(json.dumps({'measure': 'batch', 'places': len(matrix.names), 'pairs': count,
+                          'ms': round(elapsed * 1000, 2), 'us_per_pair': round(elapsed / count * 1e6, 3),
+                          'speedup': round(single / (elapsed / count), 1)}), flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for nodes in args.nodes:
+            minutes, km = random_graph(rng, nodes)
+            started = time.perf_counter()
+            solved = eta.solve(minutes, km)
+            solve_seconds = time.perf_counter() - started
+            path = os.path.join(directory, f'graph-{nodes}.npy')
+            np.save(path, np.stack(solved).astype(np.float32))
+            started = time.perf_counter()
+            mapped = np.load(path, mmap_mode='r')
+            float(mapped[0, 0, nodes - 1])
+            map_seconds = time.perf_counter() - started
+            print(json.dumps({'measure': 'load', 'places': nodes, 'file_mb': round(os.path.getsize(path) / 2 ** 20, 1),
+                              'solve_ms': round(solve_seconds * 1000, 1), 'mmap_ms': round(map_seconds * 1000, 3)}),
+                  flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Unchanged-poll cost of the read endpoints with and without If-None-Match.
+
+Every poll goes through the Flask test client against an in-memory SQLite
+copy of the serializer benchmark's dataset. Prints one JSON line per route
+with the mean latency and SQL statements per request, for full responses
+and for 304 revalidations.
+
+Usage (from server/):
+    python -m benchmarks.etag_bench --rows 20000 --polls 50
+    python -m benchmarks.etag_bench --rows 20000 --polls 50 --response-cache memory
+"""
+
+import argparse
+import json
+import time
+
+from flask import g
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app import app, db
+from benchmarks.serializer_bench import build_dataset
+
+ROUTES = [
+    ('admin trips page', '/api/trips', 'admin'),
+    ('employee trips page', '/api/trips', 'employee'),
+    ('driver trips page', '/api/trips', 'driver'),
+    ('trip detail', '/api/trips/1', 'admin'),
+    ('vehicles', '/api/vehicles', 'admin'),
+    ('companies', '/api/companies', 'admin'),
+    ('company detail', '/api/companies/1', 'admin'),
+]
+
+
+def poll(client, url, headers, polls):
+    statements = 0
+    started = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+        statements += g.query_count
+    elapsed = time.perf_counter() - started
+    return response, elapsed / polls, statements / polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--polls', type=int, default=50)
+    parser.add_argument('--response-cache', default='none', choices=['none', 'memory', 'local'],
+                        help='Backend for the vehicles/companies response cache on full responses.')
+    args = parser.parse_args()
+
+    # Identities are dicts, as issued by /api/login
+    app.config['JWT_VERIFY_SUB'] = False
+    # Count statements on every request, without failing over budget
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+    app.config['RESPONSE_CACHE_BACKEND'] = args.response_cache
+
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    build_dataset(engine, args.rows)
+
+    with app.app_context():
+        # Point the app at the in-memory dataset instead of cabrix.db
+        db._app_engines[app][None] = engine
+        identities = {
+            'admin': {'id': 1, 'role': 'admin'},
+            'employee': {'id': 1, 'role': 'employee'},
+            'driver': {'id': args.rows // 20 + 1, 'role': 'driver'},
+        }
+        tokens = {role: create_access_token(identity=identity) for role, identity in identities.items()}
+
+    @app.before_request
+    def count_statements():
+        g.query_count = 0
+
+    with app.test_client() as client:
+        for name, url, role in ROUTES:
+            headers = {'Authorization': f'Bearer {tokens[role]}'}
+            response, full_s, full_queries = poll(client, url, headers, args.polls)
+            assert response.status_code == 200, response.get_json()
+            headers['If-None-Match'] = response.headers['ETag']
+            revalidated, cached_s, cached_queries = poll(client, url, headers, args.polls)
+            assert revalidated.status_code == 304
+            print(json.dumps({
+                'route': name,
+                'response_cache': args.response_cache,
+                'bytes': len(response.data),
+                'full_ms': round(full_s * 1000, 2),
+                'full_queries': full_queries,
+                'not_modified_ms': round(cached_s * 1000, 2),
+                'not_modified_queries': cached_queries,
+                'speedup': round(full_s / cached_s, 1),
+            }))
+
+
+if __name__ == '__main__':
+    main()
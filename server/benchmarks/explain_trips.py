@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Print EXPLAIN QUERY PLAN and timings for the trip listing queries,
+before and after the composite indexes on `trips`.
+
+Usage (from server/):
+    python -m benchmarks.explain_trips --trips 2000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from app import db
+from app.models import Trip
+
+# The statements get_trips and the dashboards issue, with representative binds
+QUERIES = {
+    'admin page': (
+        "SELECT id FROM trips WHERE pickup_time < :t OR (pickup_time = :t AND id < :id) "
+        "ORDER BY pickup_time DESC, id DESC LIMIT 51"
+    ),
+    'driver page': (
+        "SELECT id FROM trips WHERE driver_id = :driver "
+        "ORDER BY pickup_time DESC, id DESC LIMIT 51"
+    ),
+    'driver pending': (
+        "SELECT id FROM trips WHERE driver_id = :driver AND status = 'pending' "
+        "ORDER BY pickup_time DESC, id DESC LIMIT 51"
+    ),
+    'employee page': (
+        "SELECT id FROM trips WHERE passenger_id = :passenger "
+        "ORDER BY pickup_time DESC, id DESC LIMIT 51"
+    ),
+    'company by status': (
+        "SELECT status, count(*) FROM trips WHERE company_id = :company "
+        "AND pickup_time >= :since GROUP BY status"
+    ),
+}
+
+
+def populate(path, trips, seed=42):
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    for index in Trip.__table__.indexes:
+        index.drop(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    statuses = ['pending', 'in_progress', 'completed', 'cancelled']
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    def rows():
+        for i in range(1, trips + 1):
+            pickup_time = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            yield (i, 'Westlands, Nairobi', 'CBD, Nairobi', pickup_time.isoformat(' '),
+                   statuses[rng.randint(0, 3)], rng.randint(1, 100000), rng.randint(1, 5000),
+                   rng.randint(1, 1000))
+
+    conn.executemany(
+        'INSERT INTO trips (id, pickup_location, dropoff_location, pickup_time, status, '
+        'passenger_id, driver_id, company_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        rows()
+    )
+    conn.commit()
+    conn.execute('ANALYZE')
+    return conn
+
+
+def report(conn, label, binds):
+    print(f'\n=== {label} ===')
+    for name, sql in QUERIES.items():
+        plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', binds).fetchall()
+        started = time.perf_counter()
+        conn.execute(sql, binds).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f'{name}: {elapsed:.2f} ms')
+        for row in plan:
+            print(f'    {row[-1]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trips', type=int, default=2000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'explain.db')
+        started = time.perf_counter()
+        conn = populate(path, args.trips)
+        print(f'Loaded {args.trips} trips in {time.perf_counter() - started:.1f}s')
+
+        binds = {'t': '2024-07-01 00:00:00', 'id': args.trips // 2, 'driver': 42,
+                 'passenger': 4242, 'company': 7, 'since': '2024-06-01 00:00:00'}
+        report(conn, 'before', binds)
+
+        engine = create_engine(f'sqlite:///{path}')
+        for index in Trip.__table__.indexes:
+            index.create(engine)
+        engine.dispose()
+        conn.execute('ANALYZE')
+        report(conn, 'after', binds)
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Nearest-driver lookups on the grid index against a scan of every driver.
+
+Scatters drivers over Nairobi (and a share over the other towns in the
+gazetteer), a tenth of them unavailable, and times GridIndex.nearest for
+random pickup points against computing every distance, for each grid
+cell size. Checks both return the same drivers. Prints one JSON line per
+driver count and cell size.
+
+Usage (from server/):
+    python -m benchmarks.geo_bench --drivers 1000 10000 100000 --cells 0.005 0.01 0.05
+"""
+
+import argparse
+import heapq
+import json
+import random
+import statistics
+import time
+
+from app.geo import GridIndex, distance_km
+from app.gazetteer import PLACES
+
+# Greater Nairobi, where most pickups are
+NAIROBI = (-1.45, -1.15, 36.65, 37.05)
+
+
+def scatter(rng, drivers):
+    towns = [point for point in set(PLACES.values()) if not (NAIROBI[0] <= point[0] <= NAIROBI[1])]
+    points = []
+    for _ in range(drivers):
+        if rng.random() < 0.8:
+            points.append((rng.uniform(NAIROBI[0], NAIROBI[1]), rng.uniform(NAIROBI[2], NAIROBI[3])))
+        else:
+            lat, lng = rng.choice(towns)
+            points.append((lat + rng.gauss(0, 0.03), lng + rng.gauss(0, 0.03)))
+    return points
+
+
+def linear(points, available, lat, lng, k, max_km):
+    distances = ((distance_km(lat, lng, p[0], p[1]), key) for key, p in enumerate(points) if available[key])
+    return heapq.nsmallest(k, (d for d in distances if d[0] <= max_km))
+
+
+def timed(lookup, queries):
+    latencies = []
+    results = []
+    for lat, lng in queries:
+        started = time.perf_counter()
+        results.append(lookup(lat, lng))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return (round(statistics.median(latencies) * 1000, 4),
+            round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 4), results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drivers', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--cells', type=float, nargs='+', default=[0.005, 0.01, 0.05], help='Grid cell size in degrees')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--max-km', type=float, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for drivers in args.drivers:
+        rng = random.Random(args.seed)
+        points = scatter(rng, drivers)
+        available = [rng.random() >= 0.1 for _ in points]
+        queries = [(rng.uniform(NAIROBI[0], NAIROBI[1]), rng.uniform(NAIROBI[2], NAIROBI[3]))
+                   for _ in range(args.queries)]
+        # The scan is slow enough at scale that a sample of queries does
+        scan_queries = queries[:max(20, args.queries * 1000 // drivers)]
+        scan_p50, scan_p99, expected = timed(
+            lambda lat, lng: linear(points, available, lat, lng, args.k, args.max_km), scan_queries)
+
+        for cell in args.cells:
+            index = GridIndex(cell)
+            started = time.perf_counter()
+            for key, (lat, lng) in enumerate(points):
+                index.add(key, lat, lng, available[key])
+            built = time.perf_counter() - started
+            p50, p99, results = timed(
+                lambda lat, lng: index.nearest(lat, lng, args.k, args.max_km, lambda key, ok: ok), queries)
+            matches = all([key for _, key, _ in got] == [key for _, key in want]
+                          for got, want in zip(results, expected))
+            print(json.dumps({'drivers': drivers, 'cell_degrees': cell, 'k': args.k,
+                              'build_ms': round(built * 1000, 1), 'grid_p50_ms': p50, 'grid_p99_ms': p99,
+                              'scan_p50_ms': scan_p50, 'scan_p99_ms': scan_p99, 'same_results': matches}),
+                  flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Password verification throughput under concurrent logins, inline vs the
+bcrypt process pool, plus the cost of a rehash-on-login upgrade.
+
+Usage (from server/):
+    python -m benchmarks.login_bench --logins 200 --threads 16 --rounds 10 12
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app
+from app import passwords
+
+
+def run(logins, threads, rounds, pool_size):
+    app.config['BCRYPT_LOG_ROUNDS'] = rounds
+    app.config['BCRYPT_POOL_SIZE'] = pool_size
+    app.config['BCRYPT_MAX_PENDING'] = max(threads, 1)
+    passwords.shutdown()
+
+    pw_hash = passwords.hash_password('password123')
+    latencies = []
+
+    def login(_):
+        started = time.perf_counter()
+        assert passwords.check_password(pw_hash, 'password123')
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    passwords.shutdown()
+
+    latencies.sort()
+    return {
+        'rounds': rounds,
+        'pool_size': pool_size,
+        'threads': threads,
+        'logins_per_s': round(logins / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def rehash_cost(old_rounds, new_rounds):
+    app.config['BCRYPT_POOL_SIZE'] = 0
+    app.config['BCRYPT_LOG_ROUNDS'] = old_rounds
+    pw_hash = passwords.hash_password('password123')
+    app.config['BCRYPT_LOG_ROUNDS'] = new_rounds
+
+    started = time.perf_counter()
+    assert passwords.check_password(pw_hash, 'password123')
+    if passwords.needs_rehash(pw_hash):
+        pw_hash = passwords.hash_password('password123')
+    elapsed = time.perf_counter() - started
+    return {'rehash_from': old_rounds, 'rehash_to': new_rounds,
+            'login_with_rehash_ms': round(elapsed * 1000, 1),
+            'stored_rounds': passwords.hash_rounds(pw_hash)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 12])
+    parser.add_argument('--pool-size', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        for pool_size in (0, args.pool_size):
+            print(json.dumps(run(args.logins, args.threads, rounds, pool_size)))
+    print(json.dumps(rehash_cost(args.rounds[0], args.rounds[-1])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Measure how many vehicles ride pooling saves on a scaled-up seed workload.
+
+Trips use the seed data's companies and locations. Most of them are
+commutes into and out of a few office locations at the peaks, and the
+rest are spread over the day. Prints one JSON line per pooling window with
+the vehicle jobs and the peak number of vehicles on the road, before and
+after pooling.
+
+Usage (from server/):
+    python -m benchmarks.pooling_bench --employees 5000 --days 5 --windows 5 10 15
+"""
+
+import argparse
+import heapq
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.pooling import pack
+
+# From seed.py
+NAIROBI_LOCATIONS = [
+    "Westlands, Nairobi", "Kilimani, Nairobi", "Karen, Nairobi",
+    "Lavington, Nairobi", "Upperhill, Nairobi", "CBD, Nairobi",
+    "Parklands, Nairobi", "South B, Nairobi", "South C, Nairobi",
+    "Eastleigh, Nairobi", "Gigiri, Nairobi", "Kileleshwa, Nairobi"
+]
+OTHER_CITIES = [
+    "Mombasa CBD", "Nyali, Mombasa", "Diani, Kwale",
+    "Kisumu CBD", "Milimani, Kisumu", "Nakuru CBD",
+    "Eldoret CBD", "Thika Town", "Machakos Town",
+    "Kitengela", "Athi River", "Ongata Rongai"
+]
+# Seeded company offices
+OFFICES = {1: "Westlands, Nairobi", 2: "CBD, Nairobi", 3: "Upperhill, Nairobi"}
+
+
+def build(employees, days, peak_share, seed=42):
+    rng = random.Random(seed)
+    homes = {
+        employee: (employee % len(OFFICES) + 1, rng.choice(NAIROBI_LOCATIONS))
+        for employee in range(1, employees + 1)
+    }
+    trips = []
+    start = datetime(2025, 3, 3)
+    for day in range(days):
+        midnight = start + timedelta(days=day)
+        for employee, (company, home) in homes.items():
+            office = OFFICES[company]
+            if rng.random() < peak_share:
+                if home != office:
+                    morning = midnight + timedelta(hours=7, minutes=rng.randrange(0, 120, 5))
+                    evening = midnight + timedelta(hours=17, minutes=rng.randrange(0, 120, 5))
+                    trips.append((morning, (company, home, office)))
+                    trips.append((evening, (company, office, home)))
+            else:
+                pickup = midnight + timedelta(hours=6, minutes=rng.randrange(0, 16 * 60))
+                dropoff = rng.choice(NAIROBI_LOCATIONS + OTHER_CITIES)
+                if dropoff != office:
+                    trips.append((pickup, (company, office, dropoff)))
+    return [(trip_id, pickup_time, route) for trip_id, (pickup_time, route) in enumerate(trips, start=1)]
+
+
+def peak_vehicles(pickups, trip_minutes):
+    # Most jobs running at once, i.e. the fleet the day actually needs
+    duration = timedelta(minutes=trip_minutes)
+    running = []
+    peak = 0
+    for pickup_time in sorted(pickups):
+        while running and running[0] <= pickup_time:
+            heapq.heappop(running)
+        heapq.heappush(running, pickup_time + duration)
+        peak = max(peak, len(running))
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--peak-share', type=float, default=0.8)
+    parser.add_argument('--max-seats', type=int, default=15, help='Biggest seeded vehicle is a 15-seat bus.')
+    parser.add_argument('--trip-minutes', type=int, default=60)
+    parser.add_argument('--windows', type=int, nargs='+', default=[5, 10, 15])
+    args = parser.parse_args()
+
+    trips = build(args.employees, args.days, args.peak_share)
+    pickups = {trip_id: pickup_time for trip_id, pickup_time, _ in trips}
+    before_peak = peak_vehicles(pickups.values(), args.trip_minutes)
+
+    for window in args.windows:
+        started = time.perf_counter()
+        groups = pack(trips, window, args.max_seats)
+        elapsed = time.perf_counter() - started
+        after_peak = peak_vehicles((min(pickups[trip_id] for trip_id in group) for group in groups),
+                                   args.trip_minutes)
+        print(json.dumps({
+            'window_minutes': window,
+            'trips': len(trips),
+            'seconds': round(elapsed, 3),
+            'vehicle_jobs_before': len(trips),
+            'vehicle_jobs_after': len(groups),
+            'job_reduction_pct': round(100 * (1 - len(groups) / len(trips)), 1),
+            'peak_vehicles_before': before_peak,
+            'peak_vehicles_after': after_peak,
+            'peak_reduction_pct': round(100 * (1 - after_peak / before_peak), 1),
+        }))
+
+
+if __name__ == '__main__':
+    main()
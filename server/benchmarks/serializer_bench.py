@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compare SerializerMixin.to_dict() with the compiled serializers.
+
+Usage (from server/):
+    python -m benchmarks.serializer_bench --rows 10000 100000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, selectinload
+
+from app import db
+from app.models import User, Company, Vehicle, Trip
+from app.serializers import trip_serializer
+
+
+def build_dataset(engine, rows, seed=42):
+    rng = random.Random(seed)
+    db.metadata.create_all(engine)
+    now = datetime(2025, 1, 1)
+    n_companies = 20
+    n_employees = max(rows // 20, 10)
+    n_drivers = max(rows // 100, 5)
+    n_vehicles = max(n_drivers // 2, 3)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Company), [
+            {'id': i, 'name': f'Company {i}', 'address': f'{i} Waiyaki Way, Nairobi',
+             'contact_email': f'info@company{i}.co.ke', 'contact_phone': '+254 722 000000',
+             'registration_date': now}
+            for i in range(1, n_companies + 1)
+        ])
+        users = []
+        for i in range(1, n_employees + n_drivers + 1):
+            role = 'employee' if i <= n_employees else 'driver'
+            users.append({'id': i, 'username': f'user{i}', 'email': f'user{i}@cabrix.co.ke',
+                          '_password_hash': 'x' * 60, 'first_name': 'Wanjiru', 'last_name': 'Kamau',
+                          'role': role, 'phone': '+254 711 123456', 'created_at': now})
+        conn.execute(insert(User), users)
+        conn.execute(insert(Vehicle), [
+            {'id': i, 'registration_number': f'KDA {i:04d}', 'model': 'Toyota Hiace',
+             'capacity_type': 'van', 'capacity': 7, 'status': 'available'}
+            for i in range(1, n_vehicles + 1)
+        ])
+        statuses = ['pending', 'in_progress', 'completed', 'cancelled']
+        trips = []
+        for i in range(1, rows + 1):
+            status = statuses[i % 4]
+            pickup_time = now + timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            assigned = status in ['in_progress', 'completed']
+            trips.append({
+                'id': i, 'pickup_location': 'Westlands, Nairobi', 'dropoff_location': 'CBD, Nairobi',
+                'pickup_time': pickup_time, 'status': status, 'created_at': pickup_time - timedelta(hours=3),
+                'completed_at': pickup_time + timedelta(hours=1) if status == 'completed' else None,
+                'notes': f'Trip notes for trip {i}',
+                'passenger_id': rng.randint(1, n_employees),
+                'driver_id': rng.randint(n_employees + 1, n_employees + n_drivers) if assigned else None,
+                'company_id': rng.randint(1, n_companies),
+                'vehicle_id': rng.randint(1, n_vehicles) if assigned else None,
+            })
+        conn.execute(insert(Trip), trips)
+
+
+def load_trips(session):
+    # Preload every relationship either serializer touches so only CPU is measured
+    return session.query(Trip).options(
+        selectinload(Trip.passenger).selectinload(User.trips_as_driver),
+        selectinload(Trip.driver).selectinload(User.trips_as_passenger),
+        selectinload(Trip.company),
+        selectinload(Trip.vehicle),
+    ).all()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(rows):
+    engine = create_engine('sqlite://')
+    build_dataset(engine, rows)
+
+    with Session(engine) as session:
+        trips = load_trips(session)
+        legacy, legacy_time = timed(lambda: [trip.to_dict() for trip in trips])
+        compiled, compiled_time = timed(lambda: trip_serializer.many(trips))
+
+    identical = json.dumps(legacy, sort_keys=True) == json.dumps(compiled, sort_keys=True)
+    return {
+        'rows': rows,
+        'to_dict_s': round(legacy_time, 3),
+        'compiled_s': round(compiled_time, 3),
+        'speedup': round(legacy_time / compiled_time, 1),
+        'identical': identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(json.dumps(run(rows)))
+
+
+if __name__ == '__main__':
+    main()
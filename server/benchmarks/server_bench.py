@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Load test of the production server against Flask's debug server.
+
+Builds the serializer benchmark's dataset in a temporary SQLite file,
+starts each runner on it in turn (`python run.py --dev`, then
+`python run.py`) and drives the dashboards' reads (trip pages per role,
+a filtered page, trip and company detail) from concurrent client threads.
+The full vehicle and company lists are left out: at this scale each is
+megabytes of nested trips and would drown the rest (see etag_bench).
+Prints one JSON line per runner with requests per second and latency
+percentiles.
+
+Usage (from server/):
+    python -m benchmarks.server_bench --rows 20000 --requests 2000 --concurrency 16
+    python -m benchmarks.server_bench --runners gunicorn --workers 4 --threads 8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine
+
+from app import app
+from benchmarks.serializer_bench import build_dataset
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST, PORT = '127.0.0.1', 5555
+RUNNERS = {
+    'debug': [sys.executable, 'run.py', '--dev'],
+    'gunicorn': [sys.executable, 'run.py'],
+}
+PATHS = [
+    ('/api/trips', 'admin'),
+    ('/api/trips', 'employee'),
+    ('/api/trips', 'driver'),
+    ('/api/trips?status=pending&limit=20', 'admin'),
+    ('/api/trips/1', 'admin'),
+    ('/api/companies/1', 'admin'),
+]
+
+
+def request(path, headers):
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
+    try:
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def wait_until_ready(process, headers, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            if request(PATHS[0][0], headers[PATHS[0][1]]) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not come up')
+
+
+def load(headers, requests, concurrency):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            started = time.perf_counter()
+            try:
+                path, role = PATHS[n % len(PATHS)]
+                ok = request(path, headers[role]) == 200
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies), errors[0]
+
+
+def run(runner, path, args, headers):
+    env = dict(os.environ, DATABASE_URI=f'sqlite:///{path}', WEB_BIND=f'{HOST}:{PORT}',
+               RESPONSE_CACHE_BACKEND='none')
+    if args.workers:
+        env['WEB_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['WEB_THREADS'] = str(args.threads)
+    process = subprocess.Popen(RUNNERS[runner], cwd=SERVER_DIR, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(process, headers)
+        # Same warm start for both runners
+        load(headers, len(PATHS) * 4, 1)
+        elapsed, latencies, errors = load(headers, args.requests, args.concurrency)
+    finally:
+        # The debug server's reloader runs the app in a child process
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+    return {
+        'runner': runner,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--runners', nargs='+', default=list(RUNNERS), choices=list(RUNNERS))
+    parser.add_argument('--workers', type=int, help='WEB_WORKERS for gunicorn (default from config)')
+    parser.add_argument('--threads', type=int, help='WEB_THREADS for gunicorn (default from config)')
+    args = parser.parse_args()
+
+    identities = {
+        'admin': {'id': 1, 'role': 'admin'},
+        'employee': {'id': 1, 'role': 'employee'},
+        'driver': {'id': args.rows // 20 + 1, 'role': 'driver'},
+    }
+    with app.app_context():
+        headers = {role: {'Authorization': f'Bearer {create_access_token(identity=identity)}'}
+                   for role, identity in identities.items()}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        build_dataset(engine, args.rows)
+        engine.dispose()
+        for runner in args.runners:
+            print(json.dumps(run(runner, path, args, headers)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""GET /api/stats computed from the trips table against the trip_stats counters.
+
+Generates a dataset with app/synthetic.py, backfills the counters
+(timed, as `flask rebuild-stats` would) and requests the stats for
+windows of increasing length through the Flask test client, from each
+source in turn. Also times create_trip with and without the counter
+upkeep. Prints one JSON line per measurement.
+
+Usage (from server/):
+    python -m benchmarks.stats_bench --users 20000 --trips 1000000 --windows 30 365
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+
+from app import app, db, stats
+from app.synthetic import Layout
+from benchmarks.api_bench import TestClientTarget, Workload, build
+
+START = date(2025, 1, 1)
+
+
+def timed_requests(target, path, headers, repeat, method='GET', body_for=None):
+    latencies = []
+    for n in range(repeat):
+        started = time.perf_counter()
+        status = target.request(method, path, headers, body_for(n) if body_for else None)
+        latencies.append(time.perf_counter() - started)
+        if status not in (200, 201):
+            raise RuntimeError(f'{method} {path} answered {status}')
+    return round(statistics.median(latencies) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--trips', type=int, default=1000000)
+    parser.add_argument('--windows', type=int, nargs='+', default=[30, 365], help='Days of pickups per request')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+    layout = Layout(args.companies, args.users, args.trips)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stats_bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        build(engine, layout, args.seed)
+        engine.dispose()
+
+        target = TestClientTarget(path)
+        workload = Workload(layout, seed=args.seed)
+        admin = workload.tokens['admin'][0][1]
+        employee = workload.tokens['employee'][0][1]
+
+        def booking(n):
+            return {'pickup_location': 'Westlands, Nairobi', 'dropoff_location': 'CBD, Nairobi',
+                    'pickup_time': f'2026-02-01T{n % 24:02d}:{n % 60:02d}:00'}
+
+        create_off = timed_requests(target, '/api/trips', employee, args.repeat * 4, 'POST', booking)
+
+        stats.enable()
+        with app.app_context():
+            started = time.perf_counter()
+            stats.rebuild()
+            db.session.commit()
+            rebuilt = time.perf_counter() - started
+        print(json.dumps({'measure': 'rebuild', 'trips': args.trips, 'seconds': round(rebuilt, 2)}), flush=True)
+
+        create_on = timed_requests(target, '/api/trips', employee, args.repeat * 4, 'POST', booking)
+        print(json.dumps({'measure': 'create_trip', 'counters_off_ms': create_off, 'counters_on_ms': create_on}),
+              flush=True)
+
+        for days in args.windows:
+            end = START + timedelta(days=days // 2)
+            query = f'from={(end - timedelta(days=days - 1)).isoformat()}&to={end.isoformat()}'
+            row = {'measure': 'stats', 'trips': args.trips, 'window_days': days}
+            for source in ['trips', 'counters']:
+                row[f'{source}_ms'] = timed_requests(target, f'/api/stats?{query}&source={source}', admin,
+                                                     args.repeat)
+            print(json.dumps(row), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Reloading the trip list against polling GET /api/trips?since=<token>.
+
+For each table size, generates a dataset with app/synthetic.py, walks
+every page of one driver's trips (a full reload) and then polls with a
+sync token after a given number of trips changed since it, through the
+Flask test client. Prints one JSON line per measurement.
+
+Usage (from server/):
+    python -m benchmarks.sync_bench --trips 100000 1000000 --changes 0 10 100
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from app import app
+from app.synthetic import Layout
+from benchmarks.api_bench import TestClientTarget, Workload, build
+
+
+def median_ms(request, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1000, 2)
+
+
+def get(client, path, headers):
+    response = client.get(path, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} answered {response.status_code}')
+    return response
+
+
+def reload(client, headers):
+    rows, cursor = 0, None
+    while True:
+        response = get(client, '/api/trips' + (f'?cursor={cursor}' if cursor else ''), headers)
+        rows += len(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=100)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--trips', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--changes', type=int, nargs='+', default=[0, 10, 100], help='Trips updated before a poll')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+    # Every change is visible to the next poll
+    app.config['SYNC_SETTLE_SECONDS'] = 0
+    for trips in args.trips:
+        layout = Layout(args.companies, args.users, trips)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sync_bench.db')
+            engine = create_engine(f'sqlite:///{path}')
+            build(engine, layout, args.seed)
+            engine.dispose()
+
+            TestClientTarget(path)
+            client = app.test_client()
+            workload = Workload(layout, seed=args.seed)
+            admin = workload.tokens['admin'][0][1]
+            driver = workload.tokens['driver'][0][1]
+
+            rows = reload(client, driver)
+            row = {'measure': 'reload', 'trips': trips, 'driver_trips': rows,
+                   'ms': median_ms(lambda: reload(client, driver), args.repeat)}
+            print(json.dumps(row), flush=True)
+
+            rng = random.Random(args.seed)
+            for changes in args.changes:
+                token = get(client, '/api/trips?limit=1', admin).headers['X-Sync-Token']
+                for trip_id in rng.sample(layout.trip_ids, changes):
+                    client.put(f'/api/trips/{trip_id}', headers=admin, json={'notes': 'Gate 2'})
+                polled = len(get(client, f'/api/trips?since={token}', admin).get_json()['changed'])
+                row = {'measure': 'poll', 'trips': trips, 'changes': changes, 'changed': polled,
+                       'admin_ms': median_ms(lambda: get(client, f'/api/trips?since={token}', admin), args.repeat),
+                       'driver_ms': median_ms(lambda: get(client, f'/api/trips?since={token}', driver), args.repeat)}
+                print(json.dumps(row), flush=True)
+
+
+if __name__ == '__main__':
+    main()
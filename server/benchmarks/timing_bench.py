@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Overhead of the Server-Timing middleware (app/timing.py).
+
+Builds an api_bench dataset and replays the same read mix through the
+Flask test client twice: first with the middleware off, as shipped,
+then after timing.enable(). The log lines go to a null handler so the
+terminal's speed isn't measured. Also times the bare `timed()` block
+that stays on the hot paths when disabled. Prints one JSON line per
+mode.
+
+Usage (from server/):
+    python -m benchmarks.timing_bench --users 2000 --trips 20000 --requests 1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import timeit
+
+from sqlalchemy import create_engine
+
+from app import app, timing
+from app.synthetic import Layout
+from benchmarks.api_bench import TestClientTarget, Workload, build, run, report
+
+MIX = {'trips_admin': 1, 'trips_employee': 2, 'trips_driver': 1, 'trip_detail': 2}
+
+
+def block_ns(number=200000):
+    def block():
+        with timing.timed('serialize'):
+            pass
+    return round(timeit.timeit(block, number=number) / number * 1e9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--trips', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if timing._enabled:
+        raise SystemExit('Unset SERVER_TIMING: the disabled run has to come first')
+    app.config['ENFORCE_QUERY_BUDGETS'] = False
+    timing.logger.addHandler(logging.NullHandler())
+    layout = Layout(args.companies, args.users, args.trips)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'timing_bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        build(engine, layout, args.seed)
+        engine.dispose()
+
+        target = TestClientTarget(path)
+        workload = Workload(layout, seed=args.seed)
+        # Warm the mappers, serializer plans and SQLite page cache
+        run(target, workload, MIX, 50, 1, args.seed)
+        for mode in ['off', 'on']:
+            if mode == 'on':
+                timing.enable()
+            block = block_ns()
+            elapsed, latencies, errors = run(target, workload, MIX, args.requests, 1, args.seed)
+            row = report('total', [l for values in latencies.values() for l in values], sum(errors.values()),
+                         elapsed)
+            row.update(mode=mode, mean_ms=round(elapsed / args.requests * 1000, 3), timed_block_ns=block)
+            print(json.dumps(row), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Write throughput of a file-backed SQLite database under concurrent workers.
+
+Each writer is a separate process, like a worker of a preforking server,
+and commits one trip at a time the way create_trip does: insert the trip,
+log its event and bump the change counters. Optional reader processes
+poll a page of trips meanwhile. Compares SQLite's default rollback journal
+with the WAL settings from app/config.py, and prints one JSON line per
+mode and writer count.
+
+Usage (from server/):
+    python -m benchmarks.write_bench --writers 1 2 4 8 --readers 2 --seconds 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, database
+from app.models import User, Company, Trip, TripEvent, ChangeVersion
+
+MODES = {
+    # What the app ran with before: pysqlite's defaults
+    'rollback': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT_MS': 5000},
+    'wal': {
+        'SQLITE_JOURNAL_MODE': app.config['SQLITE_JOURNAL_MODE'],
+        'SQLITE_SYNCHRONOUS': app.config['SQLITE_SYNCHRONOUS'],
+        'SQLITE_BUSY_TIMEOUT_MS': app.config['SQLITE_BUSY_TIMEOUT_MS'],
+    },
+}
+PASSENGERS = 50
+
+
+def make_engine(path, mode):
+    settings = dict(app.config, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', **MODES[mode])
+    settings['SQLALCHEMY_ENGINE_OPTIONS'] = None
+    database.configure(settings)
+    return create_engine(settings['SQLALCHEMY_DATABASE_URI'], **settings['SQLALCHEMY_ENGINE_OPTIONS'])
+
+
+def build(path, mode):
+    engine = make_engine(path, mode)
+    db.metadata.create_all(engine)
+    now = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Company), [{'id': 1, 'name': 'Company 1', 'address': '1 Waiyaki Way, Nairobi',
+                                        'contact_email': 'info@company1.co.ke', 'contact_phone': '+254 722 000000',
+                                        'registration_date': now}])
+        conn.execute(insert(User), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@cabrix.co.ke', '_password_hash': 'x' * 60,
+             'first_name': 'Wanjiru', 'last_name': 'Kamau', 'role': 'employee', 'created_at': now}
+            for i in range(1, PASSENGERS + 1)
+        ])
+        conn.execute(insert(ChangeVersion), [{'scope': 'trips', 'version': 1}])
+    engine.dispose()
+
+
+def write(engine, worker, n):
+    passenger_id = (worker * 7 + n) % PASSENGERS + 1
+    pickup_time = datetime(2025, 1, 1) + timedelta(minutes=n)
+    with engine.begin() as conn:
+        trip_id = conn.execute(insert(Trip).returning(Trip.id), {
+            'pickup_location': 'Westlands, Nairobi', 'dropoff_location': 'CBD, Nairobi',
+            'pickup_time': pickup_time, 'status': 'pending', 'created_at': pickup_time,
+            'passenger_id': passenger_id, 'company_id': 1,
+        }).scalar_one()
+        conn.execute(insert(TripEvent), {'trip_id': trip_id, 'action': 'created', 'passenger_id': passenger_id,
+                                         'created_at': pickup_time})
+        conn.execute(update(ChangeVersion).where(ChangeVersion.scope == 'trips')
+                     .values(version=ChangeVersion.version + 1))
+
+
+def read(engine, worker, n):
+    passenger_id = (worker + n) % PASSENGERS + 1
+    with engine.connect() as conn:
+        conn.execute(select(Trip.id, Trip.pickup_time).where(Trip.passenger_id == passenger_id)
+                     .order_by(Trip.pickup_time.desc()).limit(50)).all()
+
+
+def worker(args):
+    path, mode, kind, index, start_at, seconds = args
+    engine = make_engine(path, mode)
+    operation = write if kind == 'writer' else read
+    latencies = []
+    locked = 0
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = start_at + seconds
+    n = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            operation(engine, index, n)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+        n += 1
+    engine.dispose()
+    return kind, latencies, locked
+
+
+def run(mode, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        build(path, mode)
+        start_at = time.time() + 1
+        jobs = [(path, mode, 'writer', i, start_at, seconds) for i in range(writers)]
+        jobs += [(path, mode, 'reader', i, start_at, seconds) for i in range(readers)]
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.map(worker, jobs)
+
+    writes = sorted(l for kind, latencies, _ in results if kind == 'writer' for l in latencies)
+    reads = sum(len(latencies) for kind, latencies, _ in results if kind == 'reader')
+    return {
+        'mode': mode,
+        'writers': writers,
+        'readers': readers,
+        'writes_per_s': round(len(writes) / seconds, 1),
+        'reads_per_s': round(reads / seconds, 1),
+        'locked_errors': sum(locked for _, _, locked in results),
+        'write_p50_ms': round(writes[len(writes) // 2] * 1000, 2) if writes else None,
+        'write_p99_ms': round(writes[int(len(writes) * 0.99) - 1] * 1000, 2) if writes else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        for writers in args.writers:
+            print(json.dumps(run(mode, writers, args.readers, args.seconds)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
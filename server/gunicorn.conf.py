@@ -0,0 +1,78 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py app:app
+
+Values come from the config class picked by FLASK_CONFIG (production by
+default here). The app is loaded and warmed up once in the master, then
+forked into WEB_WORKERS workers of WEB_THREADS threads each.
+"""
+
+import glob
+import os
+import shutil
+import signal
+import tempfile
+
+os.environ.setdefault('FLASK_CONFIG', 'production')
+# Workers write their metrics here and /metrics merges them; it has to be
+# set before the app (and prometheus_client) is imported
+metrics_tmpdir = None
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    metrics_tmpdir = os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='cabrix-metrics-')
+
+from app.config import config as configs
+
+settings = configs[os.environ['FLASK_CONFIG']]
+
+bind = settings.WEB_BIND
+workers = settings.WEB_WORKERS
+threads = settings.WEB_THREADS
+worker_class = 'gthread'
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+preload_app = True
+
+
+def on_starting(server):
+    # Samples left by a previous run would be merged into this one's
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+
+
+def when_ready(server):
+    # Mappers and serializer plans are built once and shared by every fork
+    from app.lifecycle import compile_plans
+    compile_plans()
+
+
+def post_fork(server, worker):
+    # Workers must not share the master's sockets; each opens its own first
+    from app.lifecycle import connect
+    connect()
+
+
+def post_worker_init(worker):
+    from app.trip_events import stop_streams
+
+    # On SIGTERM the worker stops accepting and waits for its requests;
+    # end the open trip streams so they don't run out the graceful timeout
+    def handle_exit(sig, frame):
+        stop_streams()
+        worker.handle_exit(sig, frame)
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.siginterrupt(signal.SIGTERM, False)
+
+
+def worker_exit(server, worker):
+    from app.lifecycle import close
+    close()
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if metrics_tmpdir:
+        shutil.rmtree(metrics_tmpdir, ignore_errors=True)
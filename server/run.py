@@ -1,6 +1,19 @@
 #!/usr/bin/env python3
+"""Start the API server.
 
-from app import app
+    python run.py          # preforking gunicorn server, see gunicorn.conf.py
+    python run.py --dev    # Flask's debug server with the reloader
+"""
+
+import os
+import sys
 
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
+    if '--dev' in sys.argv:
+        from app import app
+        app.run(port=5555, debug=True)
+    else:
+        from gunicorn.app.wsgiapp import run
+        here = os.path.dirname(os.path.abspath(__file__))
+        sys.argv = ['gunicorn', '--config', os.path.join(here, 'gunicorn.conf.py'), '--chdir', here, 'app:app']
+        run()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+# The app reads its settings at import: pick TestingConfig and point it at
+# a throwaway database first
+DB_DIR = tempfile.mkdtemp(prefix='cabrix-tests-')
+os.environ['FLASK_CONFIG'] = 'testing'
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(DB_DIR, 'test.db')
+
+import pytest
+
+from app import app as flask_app, db
+from app.models import User, Company, Vehicle, Trip
+
+PASSWORD = 'password123'
+
+
+def seed():
+    companies = [Company(name=f'Company {n}', address=f'{n} Kenyatta Avenue, Nairobi',
+                         contact_email=f'info@company{n}.co.ke', contact_phone=f'+254 700 00000{n}')
+                 for n in range(3)]
+    admin = User(username='admin', email='admin@cabrix.co.ke', first_name='Ada', last_name='Admin', role='admin')
+    drivers = [User(username=f'driver{n}', email=f'driver{n}@cabrix.co.ke', first_name='Dan',
+                    last_name=f'Driver{n}', role='driver') for n in range(3)]
+    vehicles = [Vehicle(registration_number=f'KDA 00{n}A', model='Toyota Noah', capacity_type='van', capacity=7)
+                for n in range(3)]
+    employees = []
+    for n, company in enumerate(companies):
+        for m in range(2):
+            employee = User(username=f'employee{n}{m}', email=f'employee{n}{m}@company{n}.co.ke',
+                            first_name='Eve', last_name=f'Employee{n}{m}', role='employee')
+            employee.companies.append(company)
+            employees.append(employee)
+    for user in [admin] + drivers + employees:
+        user.password_hash = PASSWORD
+    for driver, vehicle in zip(drivers, vehicles):
+        driver.vehicles.append(vehicle)
+
+    start = datetime(2026, 1, 5, 8)
+    trips = [Trip(pickup_location='Westlands, Nairobi', dropoff_location='Upper Hill, Nairobi',
+                  pickup_time=start + timedelta(hours=n), status=['pending', 'completed'][n % 2],
+                  passenger=employees[n % len(employees)], company=employees[n % len(employees)].companies[0],
+                  driver=drivers[n % 3] if n % 3 else None, vehicle=vehicles[n % 3] if n % 3 else None)
+             for n in range(30)]
+    db.session.add_all(companies + [admin] + drivers + vehicles + employees + trips)
+    db.session.commit()
+
+
+@pytest.fixture(scope='session')
+def app():
+    with flask_app.app_context():
+        db.create_all()
+        seed()
+    yield flask_app
+    with flask_app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def login(email):
+        response = client.post('/api/login', json={'email': email, 'password': PASSWORD})
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+    return login
+
+
+@pytest.fixture
+def user_id(app):
+    def user_id(email):
+        with app.app_context():
+            return User.query.filter_by(email=email).one().id
+    return user_id
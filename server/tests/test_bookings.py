@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.bookings import Bookings, free_slots
+from app.models import Trip, User, Vehicle
+
+ADMIN = 'admin@cabrix.co.ke'
+DRIVER = 'driver2@cabrix.co.ke'
+OTHER_DRIVER = 'driver0@cabrix.co.ke'
+DAY = date(2026, 7, 1)
+NINE = datetime(2026, 7, 1, 9)
+HOUR = timedelta(hours=1)
+
+
+def test_touching_windows_do_not_conflict(app):
+    with app.app_context():
+        bookings = Bookings()
+        bookings.book(1, NINE, driver_id=7, vehicle_id=3)
+
+        assert bookings.conflict(2, NINE + HOUR, driver_id=7, vehicle_id=3) is None
+        assert bookings.conflict(2, NINE - HOUR, driver_id=7, vehicle_id=3) is None
+
+
+def test_overlapping_windows_conflict(app):
+    with app.app_context():
+        bookings = Bookings()
+        bookings.book(1, NINE, driver_id=7, vehicle_id=3)
+
+        assert bookings.conflict(2, NINE + timedelta(minutes=59), driver_id=7) == \
+            f'Driver is already booked for trip 1 at {NINE.isoformat()}'
+        assert bookings.conflict(2, NINE - timedelta(minutes=30), vehicle_id=3) == \
+            f'Vehicle is already booked for trip 1 at {NINE.isoformat()}'
+        assert bookings.conflict(2, NINE + timedelta(minutes=30), driver_id=8, vehicle_id=4) is None
+
+
+def test_rebooking_a_trip_does_not_conflict_with_itself(app):
+    with app.app_context():
+        bookings = Bookings()
+        bookings.book(1, NINE, driver_id=7, vehicle_id=3)
+
+        assert bookings.conflict(1, NINE + timedelta(minutes=30), driver_id=7, vehicle_id=3) is None
+        bookings.book(1, NINE + timedelta(minutes=30), driver_id=7, vehicle_id=3, previous=(7, 3))
+
+        # Moved, not copied: the old window is free again
+        assert bookings.drivers[7].windows == [(NINE + timedelta(minutes=30), NINE + timedelta(minutes=90), 1)]
+        assert bookings.conflict(2, NINE - timedelta(minutes=45), driver_id=7, vehicle_id=3) is None
+
+
+def test_booking_frees_the_previous_driver_and_vehicle(app):
+    with app.app_context():
+        bookings = Bookings()
+        bookings.book(1, NINE, driver_id=7, vehicle_id=3)
+        bookings.book(1, NINE, driver_id=8, vehicle_id=4, previous=(7, 3))
+
+        assert bookings.conflict(2, NINE, driver_id=7, vehicle_id=3) is None
+        assert bookings.conflict(2, NINE, driver_id=8) is not None
+        assert bookings.conflict(2, NINE, vehicle_id=4) is not None
+
+
+def test_update_trip_rejects_overlaps_and_frees_the_previous_driver(app, client, login, user_id):
+    driver_id, other_driver_id = user_id(DRIVER), user_id(OTHER_DRIVER)
+    with app.app_context():
+        passenger = User.query.filter_by(role='employee').first()
+        vehicle = Vehicle.query.filter_by(registration_number='KDA 002A').one()
+        trips = [Trip(pickup_location='Karen, Nairobi', dropoff_location='Gigiri, Nairobi', pickup_time=pickup_time,
+                      status='pending', passenger_id=passenger.id, company_id=passenger.companies[0].id,
+                      driver_id=driver_id, vehicle_id=vehicle.id)
+                 for pickup_time in [NINE, NINE + HOUR]]
+        unassigned = Trip(pickup_location='Karen, Nairobi', dropoff_location='Gigiri, Nairobi',
+                          pickup_time=NINE + timedelta(minutes=30), status='pending',
+                          passenger_id=passenger.id, company_id=passenger.companies[0].id)
+        db.session.add_all(trips + [unassigned])
+        db.session.commit()
+        first_id, second_id, unassigned_id = trips[0].id, trips[1].id, unassigned.id
+
+        # Back to back trips leave no gap between them
+        booked, free = free_slots(driver_id, DAY)
+        assert [trip_id for _, _, trip_id in booked] == [first_id, second_id]
+        assert free == [(datetime(2026, 7, 1), NINE), (NINE + 2 * HOUR, datetime(2026, 7, 2))]
+
+    headers = login(ADMIN)
+    response = client.put(f'/api/trips/{unassigned_id}', headers=headers, json={'driver_id': driver_id})
+    assert response.status_code == 409
+    assert response.get_json()['error'] == f'Driver is already booked for trip {first_id} at {NINE.isoformat()}'
+
+    # Moving a trip within its own window is fine
+    response = client.put(f'/api/trips/{first_id}', headers=headers,
+                          json={'pickup_time': (NINE - timedelta(minutes=15)).isoformat()})
+    assert response.status_code == 200
+
+    response = client.put(f'/api/trips/{second_id}', headers=headers, json={'driver_id': other_driver_id})
+    assert response.status_code == 200
+    response = client.get(f'/api/drivers/{driver_id}/free-slots?date={DAY.isoformat()}', headers=headers)
+    assert [slot['trip_id'] for slot in response.get_json()['booked']] == [first_id]
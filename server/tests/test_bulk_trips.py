@@ -0,0 +1,112 @@
+import json
+
+from app import db
+from app.models import Trip
+
+ADMIN = 'admin@cabrix.co.ke'
+EMPLOYEE = 'employee00@company0.co.ke'
+COWORKER = 'employee01@company0.co.ke'
+OTHER = 'employee10@company1.co.ke'
+
+
+def trip_of(app, passenger_id, status):
+    with app.app_context():
+        return Trip.query.filter_by(passenger_id=passenger_id, status=status).order_by(Trip.id).first().id
+
+
+def notes_of(app, trip_id):
+    with app.app_context():
+        return db.session.get(Trip, trip_id).notes
+
+
+def trip_count(app):
+    with app.app_context():
+        return Trip.query.count()
+
+
+def test_illegal_transition_rejects_the_whole_batch(app, client, login, user_id):
+    pending = trip_of(app, user_id(EMPLOYEE), 'pending')
+    completed = trip_of(app, user_id(COWORKER), 'completed')
+    before = notes_of(app, pending)
+
+    response = client.patch('/api/trips', headers=login(ADMIN), json=[
+        {'id': pending, 'notes': 'Gate B'},
+        {'id': completed, 'status': 'in_progress'},
+    ])
+
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert results[0]['ok']
+    assert results[1] == {'index': 1, 'id': completed, 'ok': False,
+                          'error': 'Invalid status transition from completed to in_progress'}
+    assert notes_of(app, pending) == before
+
+
+def test_foreign_trips_are_forbidden(app, client, login, user_id):
+    own = trip_of(app, user_id(EMPLOYEE), 'pending')
+    foreign = trip_of(app, user_id(OTHER), 'pending')
+    before = notes_of(app, own)
+
+    response = client.patch('/api/trips', headers=login(EMPLOYEE), json=[
+        {'id': own, 'notes': 'Gate B'},
+        {'id': foreign, 'status': 'cancelled'},
+    ])
+
+    assert response.status_code == 403
+    assert response.get_json()['results'][1]['error'] == 'Unauthorized'
+    assert notes_of(app, own) == before
+    with app.app_context():
+        assert db.session.get(Trip, foreign).status == 'pending'
+
+
+def test_valid_batch_commits(app, client, login, user_id):
+    pending = trip_of(app, user_id(EMPLOYEE), 'pending')
+
+    response = client.patch('/api/trips', headers=login(EMPLOYEE), json=[{'id': pending, 'notes': 'Gate C'}])
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [{'index': 0, 'id': pending, 'ok': True, 'status': 'pending'}]
+    assert notes_of(app, pending) == 'Gate C'
+
+
+def rows(count):
+    return [{'pickup_location': 'Karen, Nairobi', 'dropoff_location': 'Westlands, Nairobi',
+             'pickup_time': f'2026-06-01T07:{minute:02d}:00'} for minute in range(count)]
+
+
+def test_bulk_insert_creates_every_row_in_chunks(app, client, login, monkeypatch):
+    monkeypatch.setitem(app.config, 'TRIPS_BULK_CHUNK_SIZE', 2)
+    before = trip_count(app)
+
+    response = client.post('/api/trips/bulk', headers=login(EMPLOYEE), json=rows(5))
+
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [result['index'] for result in results] == list(range(5))
+    assert len({result['id'] for result in results}) == 5
+    assert trip_count(app) == before + 5
+
+
+def test_bulk_insert_reads_ndjson(app, client, login):
+    before = trip_count(app)
+    body = '\n'.join(json.dumps(row) for row in rows(3)) + '\n'
+
+    response = client.post('/api/trips/bulk', headers=login(EMPLOYEE), data=body,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 201
+    assert len(response.get_json()['results']) == 3
+    assert trip_count(app) == before + 3
+
+
+def test_bulk_insert_writes_nothing_when_a_row_is_invalid(app, client, login, user_id):
+    before = trip_count(app)
+    batch = rows(3)
+    batch[2]['passenger_id'] = user_id(COWORKER)
+
+    response = client.post('/api/trips/bulk', headers=login(EMPLOYEE), json=batch)
+
+    assert response.status_code == 400
+    assert response.get_json()['results'][2] == {
+        'index': 2, 'ok': False, 'error': 'Only admins can book trips for other passengers'}
+    assert trip_count(app) == before
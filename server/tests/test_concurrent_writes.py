@@ -0,0 +1,71 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import db
+from app.models import Trip
+
+WRITERS = 8
+TRIPS_PER_WRITER = 25
+# Far below what WAL sustains here (~100 trips/s); a lock convoy drops well under it
+MIN_TRIPS_PER_SECOND = 20
+
+
+def test_database_runs_in_wal_mode(app):
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+
+def test_concurrent_writers_never_see_a_locked_database(app, login):
+    headers = login('employee00@company0.co.ke')
+    reader_headers = login('admin@cabrix.co.ke')
+    with app.app_context():
+        before = Trip.query.count()
+
+    errors = []
+    done = threading.Event()
+
+    def write(writer):
+        client = app.test_client()
+        for n in range(TRIPS_PER_WRITER):
+            try:
+                response = client.post('/api/trips', headers=headers, json={
+                    'pickup_location': 'Westlands, Nairobi',
+                    'dropoff_location': 'Upper Hill, Nairobi',
+                    'pickup_time': (datetime(2026, 3, 2, 8) + timedelta(minutes=writer * 100 + n)).isoformat(),
+                })
+                if response.status_code != 201:
+                    errors.append(f'writer {writer}: {response.status_code} {response.get_data(as_text=True)}')
+            except Exception as exc:
+                errors.append(f'writer {writer}: {exc}')
+
+    def read():
+        # Readers keep polling meanwhile, as dashboards do
+        client = app.test_client()
+        while not done.is_set():
+            try:
+                response = client.get('/api/trips?limit=20', headers=reader_headers)
+                if response.status_code != 200:
+                    errors.append(f'reader: {response.status_code}')
+            except Exception as exc:
+                errors.append(f'reader: {exc}')
+
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(WRITERS)]
+    reader = threading.Thread(target=read)
+    started = time.perf_counter()
+    reader.start()
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    reader.join()
+
+    assert not [error for error in errors if 'database is locked' in error]
+    assert not errors
+    with app.app_context():
+        assert Trip.query.count() - before == WRITERS * TRIPS_PER_WRITER
+    assert WRITERS * TRIPS_PER_WRITER / elapsed >= MIN_TRIPS_PER_SECOND
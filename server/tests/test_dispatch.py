@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.models import Trip, Vehicle
+
+ADMIN = 'admin@cabrix.co.ke'
+PASSENGER = 'employee01@company0.co.ke'
+START = datetime(2026, 5, 18, 9)
+
+
+def create_trips(client, headers, passenger_id, pickup_times):
+    response = client.post('/api/trips/bulk', headers=headers, json=[{
+        'pickup_location': 'Lavington, Nairobi',
+        'dropoff_location': 'Upper Hill, Nairobi',
+        'pickup_time': pickup_time.isoformat(),
+        'passenger_id': passenger_id,
+    } for pickup_time in pickup_times])
+    assert response.status_code == 201
+    return [result['id'] for result in response.get_json()['results']]
+
+
+def test_dispatch_keeps_a_vehicle_an_admin_already_assigned(app, client, login, user_id):
+    headers = login(ADMIN)
+    with app.app_context():
+        crews = {}
+        for registration in ['KDA 001A', 'KDA 002A']:
+            vehicle = Vehicle.query.filter_by(registration_number=registration).one()
+            [driver] = vehicle.drivers
+            crews[registration] = (driver.id, vehicle.id)
+    (driver_1, vehicle_1), (driver_2, vehicle_2) = crews['KDA 001A'], crews['KDA 002A']
+    busy, held, blocked, other = create_trips(client, headers, user_id(PASSENGER), [
+        START, START, START + timedelta(minutes=30), START + timedelta(minutes=5)])
+
+    # `held` and `blocked` already have a vehicle; the only driver of
+    # `blocked`'s vehicle is busy with `busy` by then
+    response = client.patch('/api/trips', headers=headers, json=[
+        {'id': busy, 'driver_id': driver_1},
+        {'id': held, 'vehicle_id': vehicle_2},
+        {'id': blocked, 'vehicle_id': vehicle_1},
+    ])
+    assert all(row['ok'] for row in response.get_json()['results'])
+
+    response = client.post('/api/dispatch', headers=headers, json={
+        'pickup_from': START.isoformat(), 'pickup_to': (START + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 200
+    result = response.get_json()
+    assigned = {row['trip_id']: (row['driver_id'], row['vehicle_id']) for row in result['assigned']}
+
+    assert assigned[held] == (driver_2, vehicle_2)
+    assert blocked in result['unassigned']
+    assert assigned[other][1] not in (vehicle_1, vehicle_2)
+    with app.app_context():
+        trips = {trip.id: trip for trip in Trip.query.filter(Trip.id.in_([held, blocked]))}
+        assert (trips[held].driver_id, trips[held].vehicle_id) == (driver_2, vehicle_2)
+        assert (trips[blocked].driver_id, trips[blocked].vehicle_id) == (None, vehicle_1)
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app.models import Trip, TripEvent
+
+ADMIN = 'admin@cabrix.co.ke'
+PASSENGER = 'employee20@company2.co.ke'
+START = datetime(2026, 4, 14, 7)
+
+
+def updated_events(app, trip_ids):
+    with app.app_context():
+        return TripEvent.query.filter(TripEvent.trip_id.in_(trip_ids), TripEvent.action == 'updated').count()
+
+
+def test_pooling_and_dissolving_a_ride_record_trip_events(app, client, login, user_id):
+    headers = login(ADMIN)
+    response = client.post('/api/trips/bulk', headers=headers, json=[{
+        'pickup_location': 'Kilimani, Nairobi',
+        'dropoff_location': 'Gigiri, Nairobi',
+        'pickup_time': (START + timedelta(minutes=3 * n)).isoformat(),
+        'passenger_id': user_id(PASSENGER),
+    } for n in range(3)])
+    assert response.status_code == 201
+    trip_ids = [result['id'] for result in response.get_json()['results']]
+
+    window = {'pickup_from': START.isoformat(), 'pickup_to': (START + timedelta(minutes=30)).isoformat()}
+    response = client.post('/api/pooling', headers=headers, json=window)
+    assert response.status_code == 200
+    [ride] = response.get_json()['rides']
+    assert ride['trip_ids'] == trip_ids
+    assert updated_events(app, trip_ids) == 3
+
+    assert client.delete(f'/api/rides/{ride["ride_id"]}', headers=headers).status_code == 200
+    assert updated_events(app, trip_ids) == 6
+    with app.app_context():
+        assert not Trip.query.filter(Trip.id.in_(trip_ids), Trip.shared_ride_id.isnot(None)).count()
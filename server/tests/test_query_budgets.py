@@ -0,0 +1,37 @@
+import pytest
+
+from app import routes
+from app.models import Company
+from app.query_budget import QueryBudgetExceeded
+
+
+@pytest.mark.parametrize('path', ['/api/trips', '/api/users', '/api/companies'])
+def test_list_routes_stay_within_budget(client, login, path):
+    response = client.get(path, headers=login('admin@cabrix.co.ke'))
+    assert response.status_code == 200
+    assert response.get_json()
+
+
+def test_company_detail_stays_within_budget(app, client, login):
+    with app.app_context():
+        company_id = Company.query.first().id
+    response = client.get(f'/api/companies/{company_id}', headers=login('admin@cabrix.co.ke'))
+    assert response.status_code == 200
+    assert response.get_json()['trips']
+
+
+def test_employee_trip_list_stays_within_budget(client, login):
+    response = client.get('/api/trips', headers=login('employee00@company0.co.ke'))
+    assert response.status_code == 200
+
+
+# The seeded trips, which spread over every driver, passenger and company
+SEEDED_TRIPS = '/api/trips?pickup_from=2026-01-05T00:00:00&pickup_to=2026-01-06T23:59:59'
+
+
+@pytest.mark.parametrize('path, loaders', [(SEEDED_TRIPS, 'TRIP_LOADERS'), ('/api/companies', 'COMPANY_LOADERS')])
+def test_lazy_loading_goes_over_budget(client, login, monkeypatch, path, loaders):
+    # Without the eager loaders every serialized relationship is one more SELECT per row
+    monkeypatch.setattr(routes, loaders, ())
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(path, headers=login('admin@cabrix.co.ke'))
@@ -0,0 +1,97 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app import db
+from app.models import Trip, TripSchedule, User
+from app.recurrence import InvalidRecurrence, RecurrenceRule
+from app.scheduling import _insert_new, materialize, occurrences
+
+MONDAY = date(2026, 8, 3)
+
+
+def test_parse_rejects_what_it_cannot_expand():
+    for text in ['', 'FREQ=MONTHLY', 'FREQ=DAILY;INTERVAL=0', 'FREQ=WEEKLY;BYDAY=MO,XX', 'FREQ=DAILY;COUNT=3']:
+        with pytest.raises(InvalidRecurrence):
+            RecurrenceRule.parse(text)
+
+
+def test_daily_steps_keep_the_clock_across_dst_dates():
+    # Pickup times are naive UTC, so the spring-forward dates in the US (8
+    # March) and Europe (29 March) are days like any other
+    schedule = TripSchedule(recurrence='FREQ=DAILY', pickup_clock=time(7, 30), start_date=date(2026, 3, 1))
+    pickups = list(occurrences(schedule, datetime(2026, 3, 1), datetime(2026, 3, 31, 23, 59)))
+
+    assert len(pickups) == 31
+    assert {pickup.time() for pickup in pickups} == {time(7, 30)}
+    assert {later - earlier for earlier, later in zip(pickups, pickups[1:])} == {timedelta(days=1)}
+
+
+def test_rules_skip_excluded_days():
+    weekdays = RecurrenceRule.parse('FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR')
+    assert list(weekdays.dates(MONDAY, MONDAY, MONDAY + timedelta(days=13))) == \
+        [MONDAY + timedelta(days=n) for n in [0, 1, 2, 3, 4, 7, 8, 9, 10, 11]]
+
+    every_other_day = RecurrenceRule.parse('FREQ=DAILY;INTERVAL=2')
+    # Anchored at the start date, not at the first day asked for
+    assert list(every_other_day.dates(MONDAY, MONDAY + timedelta(days=1), MONDAY + timedelta(days=6))) == \
+        [MONDAY + timedelta(days=n) for n in [2, 4, 6]]
+
+    fortnightly = RecurrenceRule.parse('FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR')
+    assert list(fortnightly.dates(MONDAY + timedelta(days=2), MONDAY, MONDAY + timedelta(days=20))) == \
+        [MONDAY + timedelta(days=n) for n in [4, 14, 18]]
+
+
+def test_occurrences_stop_at_the_end_date():
+    schedule = TripSchedule(recurrence='FREQ=DAILY', pickup_clock=time(7, 30), start_date=MONDAY,
+                            end_date=MONDAY + timedelta(days=2))
+    pickups = list(occurrences(schedule, datetime.combine(MONDAY, time.min), datetime(2026, 8, 31)))
+    assert pickups == [datetime.combine(MONDAY + timedelta(days=n), time(7, 30)) for n in range(3)]
+
+
+def schedule_trips(schedule_id):
+    return sorted(pickup_time for (pickup_time,) in
+                  db.session.query(Trip.pickup_time).filter(Trip.schedule_id == schedule_id))
+
+
+def test_materialize_is_idempotent_and_survives_overlapping_runs(app):
+    with app.app_context():
+        passenger = User.query.filter_by(role='employee').first()
+        schedule = TripSchedule(pickup_location='Karen, Nairobi', dropoff_location='Upper Hill, Nairobi',
+                                recurrence='FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR', pickup_clock=time(7, 30),
+                                start_date=MONDAY - timedelta(days=7), passenger_id=passenger.id,
+                                company_id=passenger.companies[0].id)
+        db.session.add(schedule)
+        db.session.commit()
+
+        # Tuesday 08:00: Monday's and Tuesday's pickups are past, so not backfilled
+        now = datetime.combine(MONDAY + timedelta(days=1), time(8))
+        horizon_end = now + timedelta(days=7)
+        assert materialize([schedule], now, horizon_end) == 5
+        db.session.commit()
+        expected = [datetime.combine(MONDAY + timedelta(days=n), time(7, 30)) for n in [2, 3, 4, 7, 8]]
+        assert schedule_trips(schedule.id) == expected
+        assert schedule.materialized_until == horizon_end
+
+        assert materialize([schedule], now, horizon_end) == 0
+        db.session.commit()
+
+        # A second run that read the watermark before the first one committed
+        schedule.materialized_until = None
+        assert materialize([schedule], now, horizon_end) == 0
+        db.session.commit()
+
+        # A later run only adds the new slice of the horizon
+        assert materialize([schedule], now + timedelta(days=1), horizon_end + timedelta(days=1)) == 1
+        db.session.commit()
+        expected.append(datetime.combine(MONDAY + timedelta(days=9), time(7, 30)))
+        assert schedule_trips(schedule.id) == expected
+
+        # A racing run inserting rows it didn't see is stopped by the unique constraint
+        rows = [{'pickup_location': schedule.pickup_location, 'dropoff_location': schedule.dropoff_location,
+                 'pickup_time': pickup_time, 'status': 'pending', 'passenger_id': schedule.passenger_id,
+                 'company_id': schedule.company_id, 'schedule_id': schedule.id}
+                for pickup_time in expected[-2:] + [expected[-1] + timedelta(days=1)]]
+        assert _insert_new(rows) == 1
+        db.session.commit()
+        assert len(schedule_trips(schedule.id)) == len(expected) + 1
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import db, stats
+from app.models import Trip, TripStat
+
+ADMIN = 'admin@cabrix.co.ke'
+PASSENGER = 'employee10@company1.co.ke'
+START = datetime(2026, 2, 10, 7)
+
+
+def counters():
+    rows = db.session.query(TripStat.company_id, TripStat.day, TripStat.status, TripStat.trips,
+                            TripStat.completed_trips, TripStat.completion_seconds)
+    return {(company_id, str(day), status): (trips, completed, pytest.approx(seconds, abs=1e-3))
+            for company_id, day, status, trips, completed, seconds in rows if trips or completed or seconds}
+
+
+def assert_counters_match_rebuild(app):
+    with app.app_context():
+        kept = counters()
+        stats.rebuild()
+        rebuilt = counters()
+        db.session.rollback()
+    assert kept == rebuilt
+
+
+def test_bulk_writes_keep_counters_equal_to_a_rebuild(app, client, login, user_id):
+    assert stats.enabled()
+    headers = login(ADMIN)
+    passenger_id = user_id(PASSENGER)
+
+    # Bulk insert: six trips on one route, five minutes apart
+    response = client.post('/api/trips/bulk', headers=headers, json=[{
+        'pickup_location': 'Westlands, Nairobi',
+        'dropoff_location': 'Upper Hill, Nairobi',
+        'pickup_time': (START + timedelta(minutes=5 * n)).isoformat(),
+        'passenger_id': passenger_id,
+    } for n in range(6)])
+    assert response.status_code == 201
+    ids = [result['id'] for result in response.get_json()['results']]
+    assert_counters_match_rebuild(app)
+
+    # Pooling, then dissolving one of the rides
+    response = client.post('/api/pooling', headers=headers, json={
+        'pickup_from': START.isoformat(), 'pickup_to': (START + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 200
+    rides = response.get_json()['rides']
+    assert rides
+    assert client.delete(f'/api/rides/{rides[0]["ride_id"]}', headers=headers).status_code == 200
+    assert_counters_match_rebuild(app)
+
+    # PATCH: start, complete and cancel some of them
+    response = client.patch('/api/trips', headers=headers, json=[
+        {'id': ids[0], 'status': 'in_progress'},
+        {'id': ids[1], 'status': 'in_progress'},
+        {'id': ids[0], 'status': 'completed'},
+        {'id': ids[2], 'status': 'cancelled'},
+    ])
+    assert response.status_code == 200
+    assert all(result['ok'] for result in response.get_json()['results'])
+    assert_counters_match_rebuild(app)
+
+    # Dispatch assigns drivers and vehicles by primary key
+    response = client.post('/api/dispatch', headers=headers, json={
+        'pickup_from': START.isoformat(), 'pickup_to': (START + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 200
+    assert_counters_match_rebuild(app)
+
+    # A schedule materializes its trips on creation and cancels them on delete
+    response = client.post('/api/schedules', headers=headers, json={
+        'pickup_location': 'Karen, Nairobi',
+        'dropoff_location': 'Upper Hill, Nairobi',
+        'recurrence': 'FREQ=DAILY',
+        'pickup_time': '07:30',
+        'start_date': (date.today() + timedelta(days=1)).isoformat(),
+        'passenger_id': passenger_id,
+    })
+    assert response.status_code == 201
+    schedule_id = response.get_json()['schedule']['id']
+    assert_counters_match_rebuild(app)
+
+    response = client.delete(f'/api/schedules/{schedule_id}', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['cancelled_trips'] > 0
+    assert_counters_match_rebuild(app)
+
+
+def test_uncounted_bulk_statements_raise(app, user_id):
+    # A .values() insert has no parameter rows to count from
+    with app.app_context():
+        statement = insert(Trip).values(pickup_location='Westlands, Nairobi', dropoff_location='Karen, Nairobi',
+                                        pickup_time=START, passenger_id=user_id(PASSENGER), company_id=1)
+        with pytest.raises(RuntimeError, match='stats.apply'):
+            db.session.execute(statement)
+        db.session.rollback()
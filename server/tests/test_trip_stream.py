@@ -0,0 +1,31 @@
+ADMIN = 'admin@cabrix.co.ke'
+
+
+def stream_token(client, headers):
+    response = client.post('/api/trips/stream/token', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['stream_token']
+
+
+def test_stream_token_opens_the_stream_from_the_query_string(client, login):
+    token = stream_token(client, login(ADMIN))
+    response = client.get(f'/api/trips/stream?jwt={token}', buffered=False)
+    try:
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+    finally:
+        response.close()
+
+
+def test_access_token_is_refused_in_the_query_string(client, login):
+    access_token = login(ADMIN)['Authorization'].split()[1]
+    response = client.get(f'/api/trips/stream?jwt={access_token}', buffered=False)
+    assert response.status_code == 401
+
+
+def test_stream_token_opens_nothing_else(client, login):
+    token = stream_token(client, login(ADMIN))
+    response = client.get('/api/trips', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
+    response = client.post('/api/trips/stream/token', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403